@@ -25,50 +25,68 @@ Revision History
 2023/01/05 CEH Initial Version
 2024/02/29 CEH Altered to intake Battery Voltage, handle restart better
 2024/03/11 CEH Rolled Back version
+2026/10/18 CEH SUB Controller.py stays warm and arms in process, no control.service restart or 5 s lockout
+2026/10/18 CEH One command session (arm_session.py), the button follows the SUB's acked state and shows the RTT
+2026/10/18 CEH Binary battery packets (battery_telemetry.py), smoothed voltage and a low voltage warning
+2026/10/18 CEH Status polls only printed when the state changes
 ####################################################################################
 '''
 import tkinter as tk
 import socket
 import threading
-import subprocess
+from arm_session import ArmSession
+import battery_telemetry
 
 # Server configuration
 server_ip = "192.168.2.3"
 client_ip = "192.168.2.2"
 server_port_tcp = 5640
 server_port_udp = 5650
-command_enable = ['sudo', 'systemctl', 'restart', 'control.service']
-command_disable = ['sudo', 'systemctl', 'restart', 'control.service']
+status_poll_ms = 1000  # a restarted Controller.py comes back disarmed, keep the button honest
+session = ArmSession(server_ip, server_port_tcp)
+busy = False
+last_state = None  # last state a status poll printed
 
 def send_message(message):
+    # Runs on a worker thread so a cold start on the SUB never freezes the window
+    global last_state
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as client_socket:
-            client_socket.connect((server_ip, server_port_tcp))
-            client_socket.sendall(message.encode('utf-8'))
-            print(f"Sent '{message}' message to the server")
-    except Exception as e:
+        state, switch_us, rtt_ms = session.request(message)
+        if message != "status" or state != last_state:
+            print(f"'{message}' acked: {state}, switch {switch_us} us, {rtt_ms:.1f} ms round trip")
+        last_state = state
+        window.after(0, show_state, state, f"{state}, {rtt_ms:.1f} ms round trip")
+    except (OSError, ValueError) as e:
         print(f"Error sending message: {e}")
+        window.after(0, show_state, None, f"no answer from the SUB: {e}")
+
+def request(message):
+    global busy
+    busy = True
+    if message != "status":
+        active_button.config(state=tk.DISABLED)  # until the ack says what the SUB did
+    threading.Thread(target=send_message, args=(message,), daemon=True).start()
+
+def show_state(state, text):
+    global busy
+    busy = False
+    state_label.config(text=f"SUB: {text}")
+    # The button offers the opposite of what the SUB says it is, until told otherwise keep it
+    if state == "armed":
+        active_button.config(text="Disable")
+    elif state in ("disarmed", "down"):
+        active_button.config(text="Enable")
+    active_button.config(state=tk.NORMAL)
 
 def toggle_button_state():
     current_state = active_button.cget("text").lower()  # Get the lowercase text
+    # "enable" arms, "disable" disarms, read_controller.py keeps serving either way
+    request(current_state)
 
-    if current_state == "enable":
-        # If currently enabled, send "enable"
-        send_message("enable")
-    else:
-        # If currently disabled, send "disable" and restart control.service
-        send_message("disable")
-        subprocess.run(command_disable, check=True)
-        print("The control.service has been restarted successfully.")
-
-    # Update the button state and disable it for 5 seconds
-    new_state = "Disable" if current_state == "enable" else "Enable"
-    active_button.config(text=new_state)
-    active_button.config(state=tk.DISABLED)
-    window.after(5000, enable_button)
-
-def enable_button():
-    active_button.config(state=tk.NORMAL)
+def poll_status():
+    if not busy:
+        request("status")
+    window.after(status_poll_ms, poll_status)
 
 # Create the main window
 window = tk.Tk()
@@ -78,6 +96,10 @@ window.title("Raspberry Pi Controller")
 active_button = tk.Button(window, text="Enable", command=toggle_button_state)
 active_button.pack(pady=20)
 
+# SUB state as last acknowledged, with the command round trip
+state_label = tk.Label(window, text="SUB: unknown")
+state_label.pack(pady=10)
+
 # Create a label to display battery voltage
 voltage_label = tk.Label(window, text="Battery Voltage: N/A")
 voltage_label.pack(pady=10)
@@ -90,18 +112,23 @@ udp_socket.bind((client_ip, server_port_udp))
 def receive_battery_voltage():
     while True:
         data, addr = udp_socket.recvfrom(1024)
-        print(f"Received raw data: {data}")
 
         try:
-            # Attempt to decode the data as a string
-            voltage_message = data.decode('utf-8')
+            sample = battery_telemetry.decode(data)
+        except ValueError:
+            # Controller.py still sends short text status messages ("Enable Received") here
+            try:
+                print(f"SUB status: {data.decode('utf-8')}")
+            except UnicodeDecodeError as e:
+                print(f"Error decoding data: {e}")
+            continue
 
-            # If successful, update the label with the received battery voltage
-            print(f"Decoded battery voltage: {voltage_message}")
-            voltage_label.config(text=f"Battery Voltage: {voltage_message}")
-
-        except UnicodeDecodeError as e:
-            print(f"Error decoding data: {e}")
+        try:
+            print(f"Battery voltage {sample.volts:.2f} V, smoothed {sample.smoothed:.2f} V, seq {sample.seq}")
+            if sample.flags & battery_telemetry.FLAG_LOW:
+                voltage_label.config(text=f"LOW BATTERY: {sample.smoothed:.2f} V", fg="red")
+            else:
+                voltage_label.config(text=f"Battery Voltage: {sample.smoothed:.2f} V", fg="black")
 
         except Exception as e:
             print(f"Unexpected error: {e}")
@@ -109,5 +136,7 @@ def receive_battery_voltage():
 battery_thread = threading.Thread(target=receive_battery_voltage, daemon=True)
 battery_thread.start()
 
+poll_status()
+
 # Run the Tkinter main loop
 window.mainloop()
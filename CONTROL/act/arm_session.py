@@ -0,0 +1,101 @@
+'''
+arm_session.py
+
+Long lived enable/disable session to Controller_enable.py on the SUB at 192.168.2.3:5640.
+One TCP connection carries every request, each a text line with a request id,
+
+    request  "<id> <enable|disable|status>\n"
+    ack      "<id> <armed|disarmed|down|error> <switch us>\n"
+
+and the ack is the SUB's actual state after the command, so the GUI shows the truth instead of
+guessing.  The connection is made on first use and remade once if it has dropped.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+
+
+####################################################################################
+'''
+import socket
+import threading
+import time
+
+
+class ArmSession:
+    '''Client side of the command session, request() is safe to call from any thread.'''
+
+    def __init__(self, host="192.168.2.3", port=5640, timeout=10.0):
+        # timeout covers a cold start of Controller.py on the SUB, a warm switch is milliseconds
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.buffer = b""
+        self.next_id = 1
+        self.lock = threading.Lock()
+        self.last_rtt_ms = None
+
+    def _connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = b""
+
+    def _read_ack(self, request_id):
+        while True:
+            newline = self.buffer.find(b"\n")
+            if newline >= 0:
+                line, self.buffer = self.buffer[:newline], self.buffer[newline + 1:]
+                ack_id, state, switch_us = line.decode('utf-8').split()
+                if int(ack_id) == request_id:
+                    return state, int(switch_us)
+                continue   # ack for a request that already timed out
+            data = self.sock.recv(1024)
+            if not data:
+                raise ConnectionError("command session closed by the SUB")
+            self.buffer += data
+
+    def request(self, command):
+        '''Send command, return (state, switch_us, rtt_ms).  Raises OSError if the SUB is unreachable.'''
+        with self.lock:
+            for attempt in (1, 2):
+                if self.sock is None:
+                    self._connect()
+                request_id = self.next_id
+                self.next_id += 1
+                start = time.perf_counter()
+                try:
+                    self.sock.sendall(f"{request_id} {command}\n".encode('utf-8'))
+                    state, switch_us = self._read_ack(request_id)
+                except socket.timeout:
+                    self.close()
+                    raise   # the SUB took the request but never answered, do not send it again
+                except OSError:
+                    self.close()
+                    if attempt == 2:
+                        raise
+                    continue   # stale connection from before a SUB restart, try a fresh one
+                self.last_rtt_ms = (time.perf_counter() - start) * 1000
+                return state, switch_us, self.last_rtt_ms
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
@@ -0,0 +1,207 @@
+'''
+ctl_broadcast.py
+
+Fan-out of the control tick to any number of port 5800 subscribers.  The gamepad is read once
+and the tick loop hands each batch to every subscriber's bounded queue, a sender thread per
+subscriber drains it.  publish() never blocks, so a slow recorder or HUD can only fall behind
+itself: when its queue is full the oldest batch is dropped and the next send carries the full
+axis state so it catches up on the latest values.
+
+Each subscriber has its own frame sequence, heartbeat and latency histograms.  The heartbeat is
+only enforced on a subscriber that takes part in it: the SUB pings from the moment it connects
+and is dropped after heartbeat_timeout of silence, a passive recorder or HUD that never sends
+anything is only dropped when it closes or stops reading for passive_timeout.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH Heartbeat enforced per subscriber, passive consumers that never ping are kept
+
+
+####################################################################################
+'''
+import socket
+import threading
+import time
+from collections import deque
+import ctl_frame
+from heartbeat import Heartbeat
+from latency import LatencyRecorder
+
+
+class Subscriber:
+    def __init__(self, sock, addr, heartbeat, queue_depth, snapshot):
+        self.sock = sock
+        self.addr = addr
+        self.heartbeat = heartbeat
+        self.snapshot = snapshot
+        self.encoder = ctl_frame.FrameEncoder()
+        self.send_lock = threading.Lock()
+        self.queue = deque(maxlen=queue_depth)
+        self.wake = threading.Event()
+        self.closed = False
+        self.needs_state = True   # first send carries the full axis state
+        self.active = False       # sent us a heartbeat frame, from then on it has to keep doing so
+        self.batches = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.last_ping = 0.0
+        self.latency = LatencyRecorder(["evdev_to_send", "queue_wait"])
+
+    @property
+    def name(self):
+        return f"{self.addr[0]}:{self.addr[1]}"
+
+    def offer(self, events, queued):
+        '''Called from the tick thread, never blocks.'''
+        if len(self.queue) == self.queue.maxlen:
+            # deque drops the oldest batch on append, resend the axis state so nothing stays stale
+            self.dropped += 1
+            self.needs_state = True
+        self.queue.append((events, queued))
+        self.max_depth = max(self.max_depth, len(self.queue))
+        self.wake.set()
+
+    def send_loop(self):
+        while not self.closed:
+            self.wake.wait(self.heartbeat.check_interval)
+            self.wake.clear()
+            now = time.monotonic()
+            if self.active and self.heartbeat.check(now):
+                raise ConnectionError(f"no heartbeat for {self.heartbeat.last_detection_ms:.1f} ms")
+            batch = []
+            waits = []
+            while self.queue:
+                events, queued = self.queue.popleft()
+                if self.needs_state:
+                    # After the queued events so the current axis values are the ones that stick
+                    self.needs_state = False
+                    events = events + self.snapshot()
+                batch.extend(self.encoder.encode(*event) for event in events)
+                batch.append(self.encoder.encode(ctl_frame.EV_TICK, 0, len(events)))
+                waits.append((events, queued))
+            if now - self.last_ping >= self.heartbeat.period:
+                self.last_ping = now
+                batch.append(self.encoder.encode(*self.heartbeat.ping()))
+            if not batch:
+                continue
+            with self.send_lock:
+                self.sock.sendall(b"".join(batch))
+            sent_us = ctl_frame.timestamp_us()
+            sent = time.monotonic()
+            for events, queued in waits:
+                self.batches += 1
+                self.latency.record("queue_wait", (sent - queued) * 1000000)
+                for event in events:
+                    self.latency.record("evdev_to_send", sent_us - event[3])
+
+    def receive_loop(self):
+        # Frames coming back are heartbeats, answer PINGs and time our own PONGs
+        decoder = ctl_frame.FrameDecoder()
+        try:
+            while not self.closed:
+                try:
+                    data = self.sock.recv(4096)
+                except socket.timeout:
+                    continue   # silence is for send_loop's heartbeat check to judge
+                if not data:
+                    break
+                self.heartbeat.received()
+                if not self.active:
+                    # Takes part in the heartbeat, a stall past its timeout now means the link is gone
+                    self.active = True
+                    self.sock.settimeout(self.heartbeat.timeout)
+                for frame in decoder.feed(data):
+                    if frame.type == ctl_frame.EV_PING:
+                        with self.send_lock:
+                            self.sock.sendall(self.encoder.encode(*self.heartbeat.pong_for(frame)))
+                    elif frame.type == ctl_frame.EV_PONG:
+                        self.heartbeat.on_pong(frame)
+        except OSError:
+            pass
+        self.close()
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def summary(self):
+        heartbeat = f"heartbeat {self.heartbeat.summary()}" if self.active else "passive, no heartbeat"
+        return (f"{self.name} batches {self.batches}, dropped {self.dropped}, "
+                f"queue max {self.max_depth}/{self.queue.maxlen}; {heartbeat}")
+
+
+class Broadcaster:
+    def __init__(self, scheduler, heartbeat_period=0.1, heartbeat_timeout=0.3, queue_depth=4, passive_timeout=5.0):
+        self.scheduler = scheduler
+        self.heartbeat_period = heartbeat_period
+        self.heartbeat_timeout = heartbeat_timeout
+        self.passive_timeout = passive_timeout
+        self.queue_depth = queue_depth
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def publish(self, events):
+        '''Tick loop emit callback, hands the batch to every subscriber.'''
+        queued = time.monotonic()
+        for subscriber in self.subscribers:
+            subscriber.offer(events, queued)
+
+    def add(self, sock, addr):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # A consumer that stops reading this long is as good as gone, the heartbeat timeout once it pings
+        sock.settimeout(self.passive_timeout)
+        subscriber = Subscriber(sock, addr, Heartbeat(self.heartbeat_period, self.heartbeat_timeout),
+                                self.queue_depth, self.scheduler.snapshot)
+        threading.Thread(target=subscriber.receive_loop, daemon=True).start()
+        threading.Thread(target=self._serve, args=(subscriber,), daemon=True).start()
+        with self.lock:
+            # Replace rather than mutate so publish() can iterate without taking the lock
+            self.subscribers = self.subscribers + [subscriber]
+        print(f"Subscriber {subscriber.name} connected, {len(self.subscribers)} total")
+        return subscriber
+
+    def _serve(self, subscriber):
+        try:
+            subscriber.send_loop()
+        except OSError as e:
+            print(f"Subscriber {subscriber.name} disconnected: {e}")
+        finally:
+            subscriber.close()
+            subscriber.sock.close()
+            print(f"Subscriber {subscriber.summary()}")
+            print(f"Latency {subscriber.name} (ms):\n{subscriber.latency.summary()}")
+            with self.lock:
+                self.subscribers = [s for s in self.subscribers if s is not subscriber]
+
+    def accept_loop(self, server_socket):
+        while True:
+            sock, addr = server_socket.accept()
+            self.add(sock, addr)
+
+    def summary(self):
+        subscribers = self.subscribers
+        if not subscribers:
+            return "no subscribers"
+        return "\n".join(s.summary() for s in subscribers)
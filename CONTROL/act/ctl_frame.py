@@ -0,0 +1,127 @@
+'''
+ctl_frame.py
+
+Binary control frame used on the port 5800 control stream between read_controller.py (Control)
+and Controller.py (SUB).  An identical copy lives in SUB/Comms/ctl_frame.py, keep them in sync.
+
+Every frame is a fixed 20 bytes, little endian:
+    magic (B) 0xC5, type (B), code (H), value (i), sequence (I), timestamp in microseconds (Q)
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version, replaces the "AXIS 1 -32768\n" text lines
+2026/10/18 CEH Added TICK frame for the fixed rate control scheduler
+2026/10/18 CEH Added PING/PONG heartbeat frames
+2026/10/18 CEH FrameDecoder.reset_stream() for a decoder reused across reconnects
+
+
+####################################################################################
+'''
+import struct
+import time
+from collections import namedtuple
+
+FRAME_MAGIC = 0xC5
+FRAME_FORMAT = '<BBHiIQ'
+_frame = struct.Struct(FRAME_FORMAT)
+FRAME_SIZE = _frame.size
+
+# Frame types
+EV_AXIS = 1
+EV_BUTTON = 2
+EV_TICK = 3      # end of one control tick, value is the number of frames in the tick
+EV_PING = 4      # heartbeat, value is the heartbeat count, timestamp is the sender's monotonic clock
+EV_PONG = 5      # heartbeat reply, echoes the PING value and timestamp
+
+# evdev codes used by the Logitech F310 map, copied from evdev.ecodes so the SUB does not need evdev
+ABS_X = 0        # left stick left/right
+ABS_Y = 1        # left stick up/down
+ABS_RX = 3       # right stick left/right
+ABS_RY = 4       # right stick up/down
+BTN_WEST = 308   # Y
+BTN_TL = 310     # left bumper
+BTN_TR = 311     # right bumper
+BTN_THUMBL = 317 # left stick press
+
+ControlFrame = namedtuple('ControlFrame', ['type', 'code', 'value', 'seq', 'timestamp'])
+
+
+def timestamp_us():
+    return time.time_ns() // 1000
+
+
+class FrameEncoder:
+    '''Packs control frames with a running sequence number.'''
+
+    def __init__(self):
+        self.seq = 0
+
+    def encode(self, frame_type, code, value, timestamp=None):
+        if timestamp is None:
+            timestamp = timestamp_us()
+        frame = _frame.pack(FRAME_MAGIC, frame_type, code, value, self.seq, timestamp)
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        return frame
+
+
+class FrameDecoder:
+    '''Streaming decoder, feed it whatever recv() returned and get back every whole frame.
+
+    Partial frames are held until the rest arrives and several frames coalesced into one
+    segment are all returned.  If the stream loses alignment the decoder skips ahead to the
+    next magic byte and counts it in resyncs.
+    '''
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0
+        self.resyncs = 0
+        self.lost = 0
+        self.next_seq = None
+
+    def reset_stream(self):
+        '''New connection: drop any partial frame and restart sequence tracking, keep the counts.'''
+        self.buffer = bytearray()
+        self.next_seq = None
+
+    def feed(self, data):
+        buf = self.buffer
+        buf += data
+        frames = []
+        offset = 0
+        end = len(buf) - FRAME_SIZE
+        while offset <= end:
+            if buf[offset] != FRAME_MAGIC:
+                next_magic = buf.find(FRAME_MAGIC, offset + 1)
+                self.resyncs += 1
+                if next_magic < 0:
+                    offset = len(buf)
+                    break
+                offset = next_magic
+                continue
+            frame = ControlFrame._make(_frame.unpack_from(buf, offset)[1:])
+            offset += FRAME_SIZE
+            if self.next_seq is not None and frame.seq != self.next_seq:
+                self.lost += (frame.seq - self.next_seq) & 0xFFFFFFFF
+            self.next_seq = (frame.seq + 1) & 0xFFFFFFFF
+            frames.append(frame)
+        del buf[:offset]
+        self.frames += len(frames)
+        return frames
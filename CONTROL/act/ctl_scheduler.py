@@ -0,0 +1,126 @@
+'''
+ctl_scheduler.py
+
+Fixed rate, latest value wins control tick for read_controller.py.  The gamepad reader thread
+drops every evdev event in here and the tick loop sends one consolidated batch per period:
+the latest value of each axis that changed, every button transition, then a TICK frame.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH snapshot() of axis state for fan-out subscribers, replaces resync()
+
+
+####################################################################################
+'''
+import threading
+import time
+import ctl_frame
+
+
+class TickStats:
+    '''Per tick and running totals for the control scheduler.'''
+
+    def __init__(self):
+        self.ticks = 0
+        self.events_in = 0
+        self.events_out = 0
+        self.merged = 0
+        self.overruns = 0
+        self.last_events_in = 0
+        self.last_events_out = 0
+        self.last_late_ms = 0.0
+        self.max_late_ms = 0.0
+        self.last_emit_ms = 0.0
+        self.max_emit_ms = 0.0
+
+    def record(self, events_in, events_out, late, emit_time):
+        self.ticks += 1
+        self.last_events_in = events_in
+        self.last_events_out = events_out
+        self.events_out += events_out
+        self.last_late_ms = late * 1000
+        self.max_late_ms = max(self.max_late_ms, self.last_late_ms)
+        self.last_emit_ms = emit_time * 1000
+        self.max_emit_ms = max(self.max_emit_ms, self.last_emit_ms)
+
+    def summary(self):
+        return (f"ticks {self.ticks}, events in {self.events_in}, out {self.events_out}, "
+                f"merged {self.merged}, overruns {self.overruns}, "
+                f"late max {self.max_late_ms:.2f} ms, emit max {self.max_emit_ms:.2f} ms")
+
+
+class ControlScheduler:
+    def __init__(self, rate_hz=50):
+        self.period = 1.0 / rate_hz
+        self.lock = threading.Lock()
+        self.axes = {}            # code -> (value, timestamp), latest seen
+        self.buttons = {}         # code -> latest state
+        self.dirty = set()        # axes changed since the last tick
+        self.button_events = []   # every button transition, presses are never merged away
+        self.pending_in = 0
+        self.stats = TickStats()
+        self.stop = False
+
+    def update(self, event_type, code, value, timestamp):
+        with self.lock:
+            self.stats.events_in += 1
+            self.pending_in += 1
+            if event_type == ctl_frame.EV_AXIS:
+                if code in self.dirty:
+                    self.stats.merged += 1
+                self.axes[code] = (value, timestamp)
+                self.dirty.add(code)
+            else:
+                self.buttons[code] = value
+                self.button_events.append((event_type, code, value, timestamp))
+
+    def snapshot(self):
+        # Full axis state for a subscriber that just joined or fell behind, buttons are edges only
+        with self.lock:
+            return [(ctl_frame.EV_AXIS, code) + state for code, state in self.axes.items()]
+
+    def tick(self):
+        with self.lock:
+            events = [(ctl_frame.EV_AXIS, code) + self.axes[code] for code in self.dirty]
+            events += self.button_events
+            events_in = self.pending_in
+            self.dirty = set()
+            self.button_events = []
+            self.pending_in = 0
+        return events, events_in
+
+    def run(self, emit):
+        '''Call emit(events) once per period until stop is set or emit raises.'''
+        next_tick = time.monotonic()
+        while not self.stop:
+            now = time.monotonic()
+            if now < next_tick:
+                time.sleep(next_tick - now)
+                now = time.monotonic()
+            late = now - next_tick
+            events, events_in = self.tick()
+            emit(events)
+            self.stats.record(events_in, len(events), late, time.monotonic() - now)
+            next_tick += self.period
+            if time.monotonic() > next_tick:
+                # Fell a full period behind, skip ahead instead of bursting to catch up
+                self.stats.overruns += 1
+                next_tick = time.monotonic() + self.period
@@ -0,0 +1,89 @@
+'''
+ctl_session.py
+
+Compact binary log of a gamepad session for record and replay.  read_controller.py --record
+writes every evdev event the reader thread sees, replay_controller.py plays it back over the
+port 5800 protocol.
+
+File layout, little endian:
+    header  magic b"CVGP", version (H), tick period the session was recorded at in
+            microseconds (I), wall clock start in microseconds (Q)
+    events  type (B), code (H), value (i), microseconds since start (Q), 15 bytes each,
+            type is ctl_frame.EV_AXIS or EV_BUTTON
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH Version 2 header stores the tick period in us, a fractional --rate survives; version 1 still read
+
+
+####################################################################################
+'''
+import struct
+import threading
+import ctl_frame
+
+MAGIC = b"CVGP"
+VERSION = 2
+HEADER = struct.Struct("<4sHIQ")
+HEADER_V1 = struct.Struct("<4sHHQ")   # tick rate in whole Hz
+EVENT = struct.Struct("<BHiQ")
+
+
+class SessionWriter:
+    def __init__(self, path, rate_hz=50):
+        self.path = path
+        self.lock = threading.Lock()   # the reader thread records while main may close
+        self.file = open(path, "wb")
+        self.start_us = ctl_frame.timestamp_us()
+        self.file.write(HEADER.pack(MAGIC, VERSION, round(1000000 / rate_hz), self.start_us))
+        self.events = 0
+
+    def record(self, event_type, code, value, timestamp_us):
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(EVENT.pack(event_type, code, value, max(timestamp_us - self.start_us, 0)))
+            self.events += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_session(path):
+    '''Return (period_us, start_us, events) with events as (type, code, value, offset_us) tuples.'''
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version = struct.unpack_from("<4sH", data) if len(data) >= 6 else (None, None)
+    header = {VERSION: HEADER, 1: HEADER_V1}.get(version)
+    if magic != MAGIC or header is None:
+        raise ValueError(f"{path} is not a version 1 or {VERSION} gamepad session")
+    if len(data) < header.size:
+        raise ValueError(f"{path} is too short for a session header")
+    _, _, period_us, start_us = header.unpack_from(data)
+    if version == 1:
+        period_us = 1000000 // period_us   # recorded as a rate
+    body = memoryview(data)[header.size:]
+    # A session cut off mid write keeps every whole event
+    body = body[:len(body) - len(body) % EVENT.size]
+    return period_us, start_us, list(EVENT.iter_unpack(body))
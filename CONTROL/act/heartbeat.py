@@ -0,0 +1,128 @@
+'''
+heartbeat.py
+
+Bidirectional heartbeat for the port 5800 control link.  Each side sends a PING frame every
+period and answers the other side's PINGs with a PONG echoing the sender's timestamp, giving
+both ends a round trip time.  The PONG also carries how far the responder's clock was ahead of
+the PING timestamp, which gives each side an estimate of the other's clock offset so stage
+latencies that cross the tether can be measured.  Any received frame counts as proof of life, when nothing has
+arrived for timeout seconds the link is declared lost.
+
+Worst case detection after the last frame is timeout + check_interval, at which point
+Controller.py commands neutral on all thrusters and read_controller.py drops the client.
+
+An identical copy lives in SUB/Comms/heartbeat.py, keep them in sync.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version, replaces the one way b"PING" in Controller.is_server_alive
+2026/10/18 CEH Wall clock timestamps and clock offset estimate for end to end latency
+
+
+####################################################################################
+'''
+import time
+import ctl_frame
+
+INT32_MAX = 0x7FFFFFFF
+OFFSET_ALPHA = 0.1  # EWMA weight for new clock offset samples
+
+
+class Heartbeat:
+    '''Heartbeat state for one end of the link, no sockets in here so both sides can share it.'''
+
+    def __init__(self, period=0.1, timeout=0.3):
+        if timeout <= period:
+            raise ValueError(f"heartbeat timeout ({timeout}) must be longer than the period ({period})")
+        self.period = period
+        self.timeout = timeout
+        self.check_interval = period / 2
+        self.count = 0
+        self.last_rx = time.monotonic()
+        self.lost = False
+        self.rtt_ms = None
+        self.rtt_min_ms = None
+        self.rtt_max_ms = 0.0
+        self.pongs = 0
+        self.link_losses = 0
+        self.last_detection_ms = None
+        self.max_detection_ms = 0.0
+        self.offset_us = None   # peer clock minus our clock
+
+    @property
+    def bound_ms(self):
+        '''Guaranteed worst case from the last received frame to declaring the link lost.'''
+        return (self.timeout + self.check_interval) * 1000
+
+    def ping(self):
+        '''Frame fields (type, code, value, timestamp) for the next PING.'''
+        self.count += 1
+        return (ctl_frame.EV_PING, 0, self.count & INT32_MAX, ctl_frame.timestamp_us())
+
+    @staticmethod
+    def pong_for(frame):
+        # value: how far our clock is ahead of the PING timestamp, clamped to int32 (about 35 min)
+        ahead = ctl_frame.timestamp_us() - frame.timestamp
+        return (ctl_frame.EV_PONG, 0, max(-INT32_MAX, min(INT32_MAX, ahead)), frame.timestamp)
+
+    def received(self, now=None):
+        self.last_rx = time.monotonic() if now is None else now
+        self.lost = False
+
+    def on_pong(self, frame):
+        rtt = (ctl_frame.timestamp_us() - frame.timestamp) / 1000
+        self.rtt_ms = rtt
+        self.rtt_min_ms = rtt if self.rtt_min_ms is None else min(self.rtt_min_ms, rtt)
+        self.rtt_max_ms = max(self.rtt_max_ms, rtt)
+        self.pongs += 1
+        # Only trust offset samples from quick round trips, a slow one has an unknown split
+        if abs(frame.value) < INT32_MAX and rtt <= 2 * self.rtt_min_ms + 1:
+            sample = frame.value - rtt * 500
+            if self.offset_us is None:
+                self.offset_us = sample
+            else:
+                self.offset_us += OFFSET_ALPHA * (sample - self.offset_us)
+        return rtt
+
+    def to_local_us(self, peer_timestamp):
+        '''Convert a timestamp from the peer's clock to ours, None until an offset is known.'''
+        if self.offset_us is None:
+            return None
+        return peer_timestamp - self.offset_us
+
+    def check(self, now=None):
+        '''Return True once, on the check that first finds the link silent past the timeout.'''
+        if now is None:
+            now = time.monotonic()
+        silent = now - self.last_rx
+        if self.lost or silent <= self.timeout:
+            return False
+        self.lost = True
+        self.link_losses += 1
+        self.last_detection_ms = silent * 1000
+        self.max_detection_ms = max(self.max_detection_ms, self.last_detection_ms)
+        return True
+
+    def summary(self):
+        rtt = "n/a" if self.rtt_ms is None else f"{self.rtt_ms:.2f} ms (min {self.rtt_min_ms:.2f}, max {self.rtt_max_ms:.2f})"
+        detection = "n/a" if self.last_detection_ms is None else f"{self.last_detection_ms:.1f} ms (max {self.max_detection_ms:.1f})"
+        offset = "n/a" if self.offset_us is None else f"{self.offset_us / 1000:.2f} ms"
+        return (f"rtt {rtt}, clock offset {offset}, pongs {self.pongs}, link losses {self.link_losses}, "
+                f"detection {detection}, bound {self.bound_ms:.1f} ms")
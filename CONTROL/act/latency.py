@@ -0,0 +1,125 @@
+'''
+latency.py
+
+HDR style latency histograms for the control path.  Values are recorded in microseconds into
+log-linear buckets (exact below 32 us, then 16 buckets per power of two, about 6% resolution),
+so recording is a couple of integer ops and memory is fixed no matter how many samples arrive.
+
+An identical copy lives in SUB/Comms/latency.py, keep them in sync.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+
+
+####################################################################################
+'''
+import json
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS      # 32 exact buckets for 0..31 us
+HALF_BUCKETS = SUB_BUCKETS // 2         # 16 buckets per power of two above that
+MAX_SHIFT = 40                          # covers about 400 days in us, far past anything useful
+NUM_BUCKETS = SUB_BUCKETS + MAX_SHIFT * HALF_BUCKETS
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def bucket_index(value):
+    if value < SUB_BUCKETS:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    if shift > MAX_SHIFT:
+        return NUM_BUCKETS - 1
+    return SUB_BUCKETS + (shift - 1) * HALF_BUCKETS + ((value >> shift) - HALF_BUCKETS)
+
+
+def bucket_value(index):
+    '''Upper edge of a bucket, so percentiles never under report.'''
+    if index < SUB_BUCKETS:
+        return index
+    shift = (index - SUB_BUCKETS) // HALF_BUCKETS + 1
+    top = (index - SUB_BUCKETS) % HALF_BUCKETS + HALF_BUCKETS
+    return ((top + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    def __init__(self, name):
+        self.name = name
+        self.counts = [0] * NUM_BUCKETS
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.sum = 0
+
+    def record(self, value_us):
+        value_us = max(int(value_us), 0)  # clock offset error can push a cross host stage below zero
+        self.counts[bucket_index(value_us)] += 1
+        self.total += 1
+        self.sum += value_us
+        if self.min is None or value_us < self.min:
+            self.min = value_us
+        if value_us > self.max:
+            self.max = value_us
+
+    def percentile(self, pct):
+        if self.total == 0:
+            return None
+        target = max(1, int(self.total * pct / 100.0 + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+    def reset(self):
+        self.__init__(self.name)
+
+    def as_dict(self):
+        stats = {"name": self.name, "count": self.total}
+        if self.total:
+            stats.update({"min_us": self.min, "mean_us": self.sum / self.total, "max_us": self.max})
+            for pct in PERCENTILES:
+                stats[f"p{pct}_us"] = self.percentile(pct)
+        return stats
+
+    def summary(self):
+        if self.total == 0:
+            return f"{self.name:18s} no samples"
+        pcts = "  ".join(f"p{pct} {self.percentile(pct) / 1000:8.3f}" for pct in PERCENTILES)
+        return (f"{self.name:18s} n {self.total:8d}  min {self.min / 1000:8.3f}  {pcts}  "
+                f"max {self.max / 1000:8.3f} ms")
+
+
+class LatencyRecorder:
+    '''A named set of histograms, one per stage of the control path.'''
+
+    def __init__(self, stages):
+        self.stages = {name: LatencyHistogram(name) for name in stages}
+
+    def record(self, stage, value_us):
+        self.stages[stage].record(value_us)
+
+    def summary(self):
+        return "\n".join(h.summary() for h in self.stages.values())
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump([h.as_dict() for h in self.stages.values()], f, indent=2)
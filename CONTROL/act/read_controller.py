@@ -1,7 +1,8 @@
 '''
 read_controller.py
 
-Intakes Game Controller output and streams to ROV over port 5800
+Intakes Game Controller output and streams to ROV over port 5800.  Any number of clients can
+subscribe, a recorder or HUD alongside the SUB, each one gets every control tick.
 
 Copyright (c) 2023
 Created by Christopher Holm
@@ -23,42 +24,96 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Revision History
 #####################################################################################
 2023/12/01 CEH Initial Version
+2026/10/18 CEH Send fixed length binary frames (ctl_frame.py) instead of text lines
+2026/10/18 CEH Fixed rate latest value wins control tick (ctl_scheduler.py) instead of a send per event
+2026/10/18 CEH Bidirectional heartbeat with the SUB (heartbeat.py), drop the client when it goes quiet
+2026/10/18 CEH Gamepad event to send latency histogram (latency.py), kill -USR1 prints it
+2026/10/18 CEH Fan out to any number of subscribers (ctl_broadcast.py), the SUB can reconnect any time
+2026/10/18 CEH --record writes a gamepad session log (ctl_session.py) for replay_controller.py
 
 
 ####################################################################################
 '''
 #!/usr/bin/python
+import argparse
+import signal
 import socket
+import threading
+import time
 import get_controller as getctl
-from evdev import InputDevice, categorize, ecodes
+import ctl_frame
+from ctl_broadcast import Broadcaster
+from ctl_scheduler import ControlScheduler
+from ctl_session import SessionWriter
+from evdev import InputDevice, ecodes
 
 path = getctl.path   
 device = InputDevice(path)
+stats_interval = 5.0  # seconds between tick statistics printouts
+broadcaster = None
 
-def send_event(client_socket, event_type, event_code, event_value):
-    message = f"{event_type} {event_code} {event_value}\n"
-    client_socket.sendall(message.encode())
+def print_latency(signum=None, frame=None):
+    # Each subscriber keeps its own histograms, the SUB measures the rest of the path
+    for subscriber in broadcaster.subscribers:
+        print(f"Latency {subscriber.name} (ms):\n{subscriber.latency.summary()}")
+
+def read_gamepad(scheduler, recorder=None):
+    # Process events from the Gamepad, the tick loop decides what actually gets sent
+    for event in device.read_loop():
+        timestamp = event.sec * 1000000 + event.usec  # evdev event time in microseconds
+        if event.type == ecodes.EV_KEY:
+            event_type = ctl_frame.EV_BUTTON
+        elif event.type == ecodes.EV_ABS:
+            event_type = ctl_frame.EV_AXIS
+        else:
+            continue
+        scheduler.update(event_type, event.code, event.value, timestamp)
+        if recorder is not None:
+            recorder.record(event_type, event.code, event.value, timestamp)
+
+def make_reporter(scheduler, broadcaster):
+    last_report = [time.monotonic()]
+
+    def publish(events):
+        broadcaster.publish(events)
+        now = time.monotonic()
+        if now - last_report[0] >= stats_interval:
+            last_report[0] = now
+            print(f"Control tick: {scheduler.stats.summary()}")
+            print(f"Subscribers: {broadcaster.summary()}")
+
+    return publish
     
 def main():
+    parser = argparse.ArgumentParser(description="Stream gamepad control ticks to the ROV")
+    parser.add_argument("--rate", type=float, default=50.0, help="control tick rate in Hz")
+    parser.add_argument("--heartbeat", type=float, default=0.1, help="heartbeat period in seconds")
+    parser.add_argument("--heartbeat-timeout", type=float, default=0.3, help="declare the link lost after this many seconds of silence")
+    parser.add_argument("--queue-depth", type=int, default=4, help="ticks buffered per subscriber before the oldest is dropped")
+    parser.add_argument("--record", metavar="PATH", help="also write every gamepad event to a session log for replay_controller.py")
+    args = parser.parse_args()
+
+    global broadcaster
+    signal.signal(signal.SIGUSR1, print_latency)
+    scheduler = ControlScheduler(args.rate)
+    broadcaster = Broadcaster(scheduler, args.heartbeat, args.heartbeat_timeout, args.queue_depth)
+    recorder = SessionWriter(args.record, args.rate) if args.record else None
+    threading.Thread(target=read_gamepad, args=(scheduler, recorder), daemon=True).start()
+
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     server_socket.bind(("192.168.2.2",5800))  # Change the port as needed
     server_socket.listen()
+    threading.Thread(target=broadcaster.accept_loop, args=(server_socket,), daemon=True).start()
 
-    print("TCP server listening on port 5800")
-    while True:
-        client_socket, _ = server_socket.accept()
-        
-        # Process events from the Gamepad
-        for event in device.read_loop():
-            if event.type == ecodes.EV_KEY:
-                # Handle button events
-                key_event = categorize(event)
-                send_event(client_socket, "BUTTON", key_event.keycode, key_event.keystate)
-                
-            elif event.type == ecodes.EV_ABS:
-                # Handle axis events
-                abs_event = categorize(event)
-                send_event(client_socket, "AXIS", abs_event.event.code, abs_event.event.value)
+    print(f"TCP server listening on port 5800, control tick {args.rate} Hz")
+    # The tick keeps running with no subscribers so a reconnecting SUB gets fresh state immediately
+    try:
+        scheduler.run(make_reporter(scheduler, broadcaster))
+    finally:
+        if recorder is not None:
+            recorder.close()
+            print(f"Recorded {recorder.events} gamepad events to {recorder.path}")
 
 
 if __name__ == "__main__":
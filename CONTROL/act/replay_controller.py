@@ -0,0 +1,152 @@
+'''
+replay_controller.py
+
+Plays a recorded gamepad session (read_controller.py --record) back to the SUB over the same
+port 5800 protocol, so Controller.py can be exercised without a pilot or a gamepad.  Events
+are regrouped into control ticks at the recorded rate and go through the same latest value wins
+scheduler and subscriber fan-out as the live stream, with fresh timestamps so the SUB side
+latency histograms stay meaningful.
+
+    --speed 1    real time, the way the pilot flew it
+    --speed N    N times faster, the tick rate scales with it
+    --speed 0    as fast as the subscribers drain, empty ticks are skipped and the queues
+                 apply backpressure instead of dropping
+
+    python3 replay_controller.py session.bin --host 127.0.0.1 --speed 0 --loops 10
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH Ticks regrouped on the recorded tick period, not a whole number rate
+
+
+####################################################################################
+'''
+#!/usr/bin/python
+import argparse
+import socket
+import threading
+import time
+import ctl_frame
+from ctl_broadcast import Broadcaster
+from ctl_scheduler import ControlScheduler
+from ctl_session import read_session
+
+
+def group_ticks(events, period_us):
+    '''Split the session into the control ticks it would have been sent in.'''
+    ticks = []
+    for event_type, code, value, offset_us in events:
+        index = offset_us // period_us
+        while len(ticks) <= index:
+            ticks.append([])
+        ticks[index].append((event_type, code, value))
+    return ticks
+
+
+def wait_for_room(broadcaster):
+    # Max speed: hold the next tick until every subscriber has queue space, never drop
+    while any(len(s.queue) >= s.queue.maxlen for s in broadcaster.subscribers):
+        time.sleep(0.0002)
+
+
+def replay(ticks, scheduler, broadcaster, period, speed):
+    start = time.monotonic()
+    sent = 0
+    for index, tick in enumerate(ticks):
+        if speed > 0:
+            due = start + index * period / speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        elif not tick:
+            continue
+        else:
+            wait_for_room(broadcaster)
+        now_us = ctl_frame.timestamp_us()
+        for event_type, code, value in tick:
+            scheduler.update(event_type, code, value, now_us)
+        events, events_in = scheduler.tick()
+        broadcaster.publish(events)
+        scheduler.stats.record(events_in, len(events), 0.0, 0.0)
+        sent += 1
+    return sent, time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded gamepad session over port 5800")
+    parser.add_argument("session", help="session log written by read_controller.py --record")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed, 0 for as fast as possible")
+    parser.add_argument("--loops", type=int, default=1, help="play the session this many times")
+    parser.add_argument("--host", default="192.168.2.2", help="address to listen on")
+    parser.add_argument("--port", type=int, default=5800)
+    parser.add_argument("--subscribers", type=int, default=1, help="wait for this many clients before playing")
+    parser.add_argument("--heartbeat", type=float, default=0.1, help="heartbeat period in seconds")
+    parser.add_argument("--heartbeat-timeout", type=float, default=0.3, help="declare the link lost after this many seconds of silence")
+    parser.add_argument("--queue-depth", type=int, default=4, help="ticks buffered per subscriber before the oldest is dropped")
+    args = parser.parse_args()
+
+    period_us, start_us, events = read_session(args.session)
+    ticks = group_ticks(events, period_us)
+    period = period_us / 1e6
+    rate_hz = 1e6 / period_us
+    print(f"Session {args.session}: {len(events)} events, {len(ticks)} ticks at {rate_hz:g} Hz, "
+          f"{len(ticks) * period:.1f} s recorded {time.strftime('%Y/%m/%d %H:%M:%S', time.localtime(start_us / 1e6))}")
+
+    scheduler = ControlScheduler(rate_hz)
+    broadcaster = Broadcaster(scheduler, args.heartbeat, args.heartbeat_timeout, args.queue_depth)
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.bind((args.host, args.port))
+    server_socket.listen()
+    threading.Thread(target=broadcaster.accept_loop, args=(server_socket,), daemon=True).start()
+
+    print(f"Waiting for {args.subscribers} subscriber(s) on {args.host}:{args.port}")
+    while len(broadcaster.subscribers) < args.subscribers:
+        time.sleep(0.05)
+
+    total_ticks = 0
+    total_time = 0.0
+    for loop in range(args.loops):
+        sent, elapsed = replay(ticks, scheduler, broadcaster, period, args.speed)
+        total_ticks += sent
+        total_time += elapsed
+        print(f"Loop {loop + 1}: {sent} ticks in {elapsed:.3f} s, {sent / elapsed:.0f} ticks/s")
+
+    # Let the subscribers drain and exchange a last heartbeat before the link drops
+    deadline = time.monotonic() + 1.0
+    while any(s.queue for s in broadcaster.subscribers) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(args.heartbeat * 2)
+
+    stats = scheduler.stats
+    print(f"Replayed {stats.events_in} events as {stats.events_out} ({stats.merged} merged) in "
+          f"{total_ticks} ticks over {total_time:.3f} s: {stats.events_in / total_time:.0f} events/s, "
+          f"{total_ticks / total_time:.0f} ticks/s")
+    # Closing each subscriber prints its drops, heartbeat and latency summary
+    for subscriber in broadcaster.subscribers:
+        subscriber.close()
+    deadline = time.monotonic() + 1.0
+    while broadcaster.subscribers and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,19 +25,26 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Revision History
 #####################################################################################
 2024/02/12 CEH Initial Version
+2026/10/18 CEH Enable/disable over one acked command session (act/arm_session.py)
+2026/10/18 CEH Sensor streams read as telemetry.py packets, plotted at the SUB's sample times
 
 
 ####################################################################################
 '''
+import os
+import sys
 import socket
 import tkinter as tk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
-import struct
-import time
 import cv2
 from PIL import Image, ImageTk
 import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "act"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sensors"))
+from arm_session import ArmSession
+import telemetry
 
 class SensorGraphApp:
     def __init__(self, root, imu_socket, ext_pressure_socket, int_pressure_socket, video_socket, enable_socket, battery_socket):
@@ -72,11 +79,15 @@ class SensorGraphApp:
         self.video_socket = video_socket
         self.enable_socket = enable_socket
 
-        # Lists for storing data
-        self.time_series = []
+        # Lists for storing data, each stream keeps its own sample times
+        self.imu_time = []
+        self.ext_pressure_time = []
+        self.int_pressure_time = []
         self.imu_data = []
         self.ext_pressure_data = []
         self.int_pressure_data = []
+        self.readers = {}       # telemetry.TelemetryReader per stream
+        self.start_us = None    # first sample time on the SUB, time zero on every graph
 
         # Create OpenCV VideoCapture
         self.video_capture = cv2.VideoCapture()
@@ -95,30 +106,35 @@ class SensorGraphApp:
 
     def update_graphs(self):
         # Update IMU data
-        self.update_sensor_data(self.ax_imu, self.imu_socket, self.time_series, self.imu_data, 'IMU')
+        self.update_sensor_data(self.ax_imu, self.imu_socket, self.imu_time, self.imu_data, 'IMU')
 
         # Update external pressure data
-        self.update_sensor_data(self.ax_ext_pressure, self.ext_pressure_socket, self.time_series, self.ext_pressure_data, 'Ext Pressure')
+        self.update_sensor_data(self.ax_ext_pressure, self.ext_pressure_socket, self.ext_pressure_time, self.ext_pressure_data, 'Ext Pressure')
 
         # Update internal pressure data
-        self.update_sensor_data(self.ax_int_pressure, self.int_pressure_socket, self.time_series, self.int_pressure_data, 'Int Pressure')
+        self.update_sensor_data(self.ax_int_pressure, self.int_pressure_socket, self.int_pressure_time, self.int_pressure_data, 'Int Pressure')
 
         # Call this method periodically to update the graphs
         self.canvas.draw()
         self.root.after(1000, self.update_graphs)  # 1000 milliseconds (1 second) update interval
 
     def update_sensor_data(self, ax, sensor_socket, time_series, data, sensor_name):
+        reader = self.readers.setdefault(sensor_name, telemetry.TelemetryReader())
         try:
-            sensor_data = sensor_socket.recv(24)
+            # Everything that arrived since the last update, without waiting for more
+            sensor_data = sensor_socket.recv(65536, socket.MSG_DONTWAIT)
             if not sensor_data:
                 return
 
-            sensor_values = struct.unpack('ffffff', sensor_data)
-            current_time = time.time()
-
-            # Process the data as needed
-            time_series.append(current_time)
-            data.append(sensor_values)
+            for packet in reader.feed(sensor_data):
+                records = packet.records
+                if self.start_us is None and len(records):
+                    self.start_us = int(records["t_us"][0])
+                # Process the data as needed, every field but the sample time
+                time_series.extend((records["t_us"].astype(np.int64) - self.start_us) / 1e6)
+                data.extend(structured_to_unstructured(records[list(records.dtype.names[1:])]))
+                if packet.lost:
+                    print(f"{sensor_name}: {packet.lost} samples lost")
 
             # Update the plot
             ax.clear()
@@ -127,6 +143,8 @@ class SensorGraphApp:
             ax.set_ylabel(sensor_name)
             ax.set_title(f"{sensor_name} Data")
 
+        except BlockingIOError:
+            pass   # nothing new this time
         except OSError as e:
             print(f"Error receiving {sensor_name} data: {e}")
 
@@ -158,22 +176,23 @@ class SensorGraphApp:
 
     def toggle_button_state(self):
         current_state = self.active_button.cget("text")
-        new_state = "Disable" if current_state == "Enable" else "Enable"
-        self.active_button.config(text=new_state)
 
-        # Send the corresponding message to the server on port 5640 (enable_socket)
-        send_message(self.enable_socket, current_state.lower())
+        # Send the corresponding message over the port 5640 session, the ack says what the SUB did
+        state = send_message(self.enable_socket, current_state.lower())
+        if state == "armed":
+            self.active_button.config(text="Disable")
+        elif state in ("disarmed", "down"):
+            self.active_button.config(text="Enable")
 
 # Updated send_message function
-def send_message(socket, message):
+def send_message(session, message):
     try:
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client_socket.connect(("192.168.2.3", 5640))  # Change the IP address if needed
-        client_socket.sendall(message.encode('utf-8'))
-        client_socket.close()
-        print(f"Sent '{message}' message to the server on port 5640")
-    except Exception as e:
+        state, switch_us, rtt_ms = session.request(message)
+        print(f"'{message}' acked: {state}, switch {switch_us} us, {rtt_ms:.1f} ms round trip")
+        return state
+    except (OSError, ValueError) as e:
         print(f"Error sending message: {e}")
+        return None
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -191,11 +210,10 @@ if __name__ == "__main__":
     int_pressure_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     int_pressure_socket.connect(("192.168.2.3", 5630))
 
-    enable_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    enable_socket.connect(("192.168.2.3", 5640))
+    enable_socket = ArmSession("192.168.2.3", 5640)
 
     battery_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    enable_socket.connect(("192.168.2.3", 5650))
+    battery_socket.connect(("192.168.2.3", 5650))
 
     app = SensorGraphApp(root, imu_socket, ext_pressure_socket, int_pressure_socket, video_socket, enable_socket, battery_socket)
     root.mainloop()
@@ -3,6 +3,9 @@ extPressure.py
 
 Receives MS5837 data input from sub at 192.168.2.3:5620
 
+Readings arrive as telemetry.py packets and are plotted at the time the SUB took them, with
+lost readings and transport delay printed from the packet header.
+
 Copyright (c) 2023
 Created by Christopher Holm
 holmch@oregonstate.edu
@@ -23,19 +26,20 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Revision History
 #####################################################################################
 2023/01/05 CEH Initial Version
+2026/10/18 CEH telemetry.py packets, plotted at sample time, loss and delay printed
 
 
 ####################################################################################
 '''
 #!/usr/bin/python
 import socket
-import struct
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 import time
 import signal
 import sys
 import subprocess
+import telemetry
 
 fig, (ax1, ax2) = plt.subplots(2, 1, sharex=True)
 
@@ -54,24 +58,36 @@ client_socket.connect(("192.168.2.3", 5620))  # Change the IP address and port a
 
 ax1.legend()
 
+reader = telemetry.TelemetryReader()
+start_us = None
+
 def update_plot(frame):
-    global time_data, TC_data, P_psi_data, D_m_data  # Declare as global variables
+    global time_data, TC_data, P_psi_data, D_m_data, start_us  # Declare as global variables
 
     try:
-        data = client_socket.recv(20)
+        data = client_socket.recv(4096)
         if not data:
             ani.event_source.stop()  # Stop the animation when the socket is closed
             plt.close(fig)  # Close the figure
             return line_TC, line_P_psi, line_D_m
 
-        D_m, P_mbar, P_psi, TC, TF = struct.unpack('fffff', data)
-        formatted_data = f"D: {D_m:.1f} m P: {P_mbar:.1f} mbar  {P_psi:.3f} psi\tT: {TC:.2f} C  {TF:.2f} F"
-        print(f"MS5867: {formatted_data}")
-
-        time_data.append(time.time())
-        TC_data.append(TC)
-        P_psi_data.append(P_psi)
-        D_m_data.append(D_m)
+        for packet in reader.feed(data):
+            if packet.stream != telemetry.STREAM_DEPTH:
+                continue
+            for record in packet.records:
+                D_m, P_mbar, P_psi, TC, TF = (record["depth"], record["pressure_mbar"], record["pressure_psi"],
+                                              record["temperature_c"], record["temperature_f"])
+                formatted_data = f"D: {D_m:.1f} m P: {P_mbar:.1f} mbar  {P_psi:.3f} psi\tT: {TC:.2f} C  {TF:.2f} F"
+                print(f"MS5867: {formatted_data}\t{reader.stats[packet.stream].lost} lost, "
+                      f"delay {packet.delay_us / 1000:.1f} ms")
+
+                # Sample time on the SUB, seconds from the first reading
+                if start_us is None:
+                    start_us = int(record["t_us"])
+                time_data.append((int(record["t_us"]) - start_us) / 1e6)
+                TC_data.append(TC)
+                P_psi_data.append(P_psi)
+                D_m_data.append(D_m)
 
         # Limit the number of data points to display (adjust as needed)
         max_data_points = 100
@@ -90,7 +106,7 @@ def update_plot(frame):
         ax2.autoscale_view()
 
         plt.suptitle('External Pressure and Depth')
-        plt.xlabel('Time')
+        plt.xlabel('Sample time (s)')
         ax1.set_ylabel('Temperature (C) / Pressure (psi)')
         ax2.set_ylabel('Depth (m)')
 
@@ -3,6 +3,11 @@ imu_plot.py
 
 Receives imu input from sub at 192.168.2.3:5610
 
+imu_send.py sends telemetry.py packets of timestamped samples (100-1000 Hz), each sample is
+plotted at the time the MPU6050 took it, and lost samples and transport delay are printed.
+A SUB running imu_send.py --legacy sends the old 24 byte 'ffffff' samples instead, those are
+told apart by the packet magic and plotted at arrival.
+
 Copyright (c) 2023
 Created by Christopher Holm
 holmch@oregonstate.edu
@@ -23,6 +28,8 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Revision History
 #####################################################################################
 2023/01/05 CEH Initial Version
+2026/10/18 CEH Batched imu_batch.py frames plotted at their sample times, legacy stream still read
+2026/10/18 CEH telemetry.py packets, loss and delay from their header
 
 
 ####################################################################################
@@ -35,6 +42,8 @@ from matplotlib.animation import FuncAnimation
 import time
 import signal
 import sys
+import numpy as np
+import telemetry
 
 fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(6, 4), sharex=True)
 plt.tight_layout()
@@ -60,30 +69,62 @@ client_socket.connect(("192.168.2.3", 5610))  # Change the IP address and port a
 
 ax1.legend()
 
+reader = telemetry.TelemetryReader()
+legacy = None		# decided by the first bytes from the SUB
+start_us = None
+max_data_points = 2000	# about 10 s at 200 Hz, adjust as needed
+
+def receive_samples(data):
+    """(times in s, Gx, Gy, Gz, Ax, Ay, Az) lists from whatever the SUB sent."""
+    global legacy, start_us
+    if legacy is None:
+        legacy = not data.startswith(telemetry.MAGIC)
+    if legacy:
+        Gx, Gy, Gz, Ax, Ay, Az = struct.unpack('ffffff', data[:24])
+        return [time.time()], [Gx], [Gy], [Gz], [Ax], [Ay], [Az]
+    columns = [[] for _ in range(7)]
+    for packet in reader.feed(data):
+        if packet.stream != telemetry.STREAM_IMU:
+            continue
+        samples = packet.records
+        if packet.lost:
+            print(f"IMU: {packet.lost} samples lost before sample {packet.seq}")
+        if start_us is None:
+            start_us = int(samples["t_us"][0])
+        columns[0].extend(((samples["t_us"].astype(np.int64) - start_us) / 1e6).tolist())
+        for axis in range(3):
+            columns[1 + axis].extend(samples["gyro"][:, axis].tolist())
+            columns[4 + axis].extend(samples["accel"][:, axis].tolist())
+    return columns
+
 def update_plot(frame):
     global time_data, Gx_data, Gy_data, Gz_data, Ax_data, Ay_data, Az_data  # Declare as global variables
 
     try:
-        data = client_socket.recv(24)
+        data = client_socket.recv(24 if legacy else 65536)
         if not data:
             ani.event_source.stop()  # Stop the animation when the socket is closed
             plt.close(fig)  # Close the figure
             return line_Gx, line_Gy, line_Gz, line_Ax, line_Ay, line_Az
 
-        Gx, Gy, Gz, Ax, Ay, Az = struct.unpack('ffffff', data)
-        formatted_data = f"Gx: {Gx:.2f} deg/s Gy: {Gy:.2f} deg/s Gz: {Gz:.2f} deg/s\tAx: {Ax:.2f} g Ay: {Ay:.2f} g Az: {Az:.2f} g"
+        times, Gx, Gy, Gz, Ax, Ay, Az = receive_samples(data)
+        if not times:
+            return line_Gx, line_Gy, line_Gz, line_Ax, line_Ay, line_Az   # partial frame, rest on the next recv
+        formatted_data = f"Gx: {Gx[-1]:.2f} deg/s Gy: {Gy[-1]:.2f} deg/s Gz: {Gz[-1]:.2f} deg/s\tAx: {Ax[-1]:.2f} g Ay: {Ay[-1]:.2f} g Az: {Az[-1]:.2f} g"
+        if not legacy:
+            stats = reader.stats[telemetry.STREAM_IMU]
+            formatted_data += f"\t{stats.lost} lost, delay {stats.delay_us / 1000:.1f} ms"
         print(f"IMU: {formatted_data}")
 
-        time_data.append(time.time())
-        Gx_data.append(Gx)
-        Gy_data.append(Gy)
-        Gz_data.append(Gz)
-        Ax_data.append(Ax)
-        Ay_data.append(Ay)
-        Az_data.append(Az)
+        time_data.extend(times)
+        Gx_data.extend(Gx)
+        Gy_data.extend(Gy)
+        Gz_data.extend(Gz)
+        Ax_data.extend(Ax)
+        Ay_data.extend(Ay)
+        Az_data.extend(Az)
 
-        # Limit the number of data points to display (adjust as needed)
-        max_data_points = 100
+        # Limit the number of data points to display
         time_data = time_data[-max_data_points:]
         Gx_data = Gx_data[-max_data_points:]
         Gy_data = Gy_data[-max_data_points:]
@@ -105,11 +146,11 @@ def update_plot(frame):
         ax2.autoscale_view()
 
         plt.suptitle('IMU Data')
-        plt.xlabel('Time')
+        plt.xlabel('Time' if legacy else 'Sample time (s)')
         ax1.set_ylabel('Degrees/sec')
         ax2.set_ylabel('g')
 
-    except OSError as e:
+    except (OSError, ValueError) as e:
         print(f"Error receiving data: {e}")
 
     return line_Gx, line_Gy, line_Gz, line_Ax, line_Ay, line_Az
@@ -3,6 +3,9 @@ intPressure.py
 
 Receives BME680 data input from sub at 192.168.2.3:5630
 
+Readings arrive as telemetry.py packets and are plotted at the time the SUB took them, with
+lost readings and transport delay printed from the packet header.
+
 Copyright (c) 2023
 Created by Christopher Holm
 holmch@oregonstate.edu
@@ -23,18 +26,19 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Revision History
 #####################################################################################
 2023/01/10 CEH Initial Version
+2026/10/18 CEH telemetry.py packets, plotted at sample time, loss and delay printed
 
 
 ####################################################################################
 '''
 #!/usr/bin/python
 import socket
-import struct
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 import time
 import signal
 import sys
+import telemetry
 
 # Define global variables for data storage
 time_data = []
@@ -58,27 +62,37 @@ client_socket.connect(server_address)
 ax1.legend(loc='upper left')
 ax2.legend(loc='upper right')
 
+reader = telemetry.TelemetryReader()
+start_us = None
+
 def update_plot(frame):
-    global time_data, T_data, P_data, H_data
+    global time_data, T_data, P_data, H_data, start_us
 
     try:
         # Receive data from the server
-        data = client_socket.recv(16)
+        data = client_socket.recv(4096)
         if not data:
             ani.event_source.stop()  # Stop the animation when the socket is closed
             plt.close(fig)  # Close the figure
             return line_T, line_P, line_H
 
-        # Unpack received data
-        intTemp, intPres, intHum = struct.unpack('fff', data)
-        formatted_data = f"T: {intTemp:.1f} deg C P: {intPres:.1f} hPa H: {intHum:.2f} % RH"
-        print(f"BME680: {formatted_data}")
-
-        # Append data to lists
-        time_data.append(time.time())
-        T_data.append(intTemp)
-        P_data.append(intPres)
-        H_data.append(intHum)
+        # Unpack received packets, each reading with the time the SUB took it
+        for packet in reader.feed(data):
+            if packet.stream != telemetry.STREAM_HEALTH:
+                continue
+            for record in packet.records:
+                intTemp, intPres, intHum = record["temperature"], record["pressure"], record["humidity"]
+                formatted_data = f"T: {intTemp:.1f} deg C P: {intPres:.1f} hPa H: {intHum:.2f} % RH"
+                print(f"BME680: {formatted_data}\t{reader.stats[packet.stream].lost} lost, "
+                      f"delay {packet.delay_us / 1000:.1f} ms")
+
+                # Append data to lists, time in seconds from the first reading
+                if start_us is None:
+                    start_us = int(record["t_us"])
+                time_data.append((int(record["t_us"]) - start_us) / 1e6)
+                T_data.append(intTemp)
+                P_data.append(intPres)
+                H_data.append(intHum)
 
         # Limit the number of data points to display
         max_data_points = 100
@@ -0,0 +1,157 @@
+'''
+telemetry.py
+
+Packet format of the SUB's sensor streams (imu_send.py on 5610, extPressure_send.py on 5620,
+intHealth_send.py on 5630) and the reader the surface tools decode them with.
+An identical copy lives in SUB/Comms/telemetry.py, keep them in sync.
+
+Every packet is a fixed 20 byte header, little endian, followed by its payload:
+    magic (4s) b"CVTM", version (B), stream id (B), payload length (H),
+    sequence (I), sent time in microseconds (Q)
+
+The payload is whole records of the stream's NumPy dtype in RECORDS, each starting with the time
+the sample was taken.  Sequence is the stream index of the payload's first record, so the next
+packet should start at sequence + records and any gap is samples lost on the way (queue drops,
+a reconnect).  Both times are the SUB's monotonic clock: sample times plot true spacing, and as
+the two clocks are not synchronised the surface measures transport latency as the delay above
+the quickest packet seen.  Payload length lets a reader step over streams it does not know.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version, replaces the bare struct streams and the imu_batch.py frame header
+
+
+####################################################################################
+'''
+import struct
+import time
+from collections import namedtuple
+import numpy as np
+
+MAGIC = b"CVTM"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHIQ")
+
+STREAM_IMU = 1
+STREAM_DEPTH = 2
+STREAM_HEALTH = 3
+
+RECORDS = {
+    # MPU6050, deg/s and g
+    STREAM_IMU: np.dtype([("t_us", "<u8"), ("gyro", "<f4", (3,)), ("accel", "<f4", (3,))]),
+    # MS5837
+    STREAM_DEPTH: np.dtype([("t_us", "<u8"), ("depth", "<f4"), ("pressure_mbar", "<f4"), ("pressure_psi", "<f4"),
+                            ("temperature_c", "<f4"), ("temperature_f", "<f4")]),
+    # BME680 in the electronics bottle, C, hPa and % RH
+    STREAM_HEALTH: np.dtype([("t_us", "<u8"), ("temperature", "<f4"), ("pressure", "<f4"), ("humidity", "<f4")]),
+}
+NAMES = {STREAM_IMU: "imu", STREAM_DEPTH: "depth", STREAM_HEALTH: "health"}
+
+Packet = namedtuple("Packet", "stream seq sent_us records lost delay_us")
+
+
+def monotonic_us():
+    return time.monotonic_ns() // 1000
+
+
+def pack(stream, **columns):
+    '''Record array for a stream from one array (or sequence) per field.'''
+    dtype = RECORDS[stream]
+    records = np.empty(len(columns["t_us"]), dtype)
+    for name in dtype.names:
+        records[name] = columns[name]
+    return records
+
+
+def encode(stream, seq, records, sent_us=None):
+    '''One packet carrying records, seq is the first record's index in the stream.'''
+    payload = np.asarray(records, RECORDS[stream]).tobytes()
+    if sent_us is None:
+        sent_us = monotonic_us()
+    return HEADER.pack(MAGIC, VERSION, stream, len(payload), seq & 0xFFFFFFFF, sent_us) + payload
+
+
+class StreamStats:
+    def __init__(self, stream):
+        self.name = NAMES.get(stream, f"stream {stream}")
+        self.expected = None
+        self.packets = 0
+        self.records = 0
+        self.lost = 0
+        self.min_offset_us = None    # arrival less sent time of the quickest packet so far
+        self.delay_us = 0
+        self.max_delay_us = 0
+
+    def update(self, seq, count, sent_us, arrival_us):
+        lost = 0
+        if self.expected is not None:
+            gap = (seq - self.expected) & 0xFFFFFFFF
+            if gap < 0x80000000:
+                lost = gap
+            # otherwise the sequence went backwards, the SUB side restarted
+        self.expected = (seq + count) & 0xFFFFFFFF
+        self.packets += 1
+        self.records += count
+        self.lost += lost
+        offset = arrival_us - sent_us
+        if self.min_offset_us is None or offset < self.min_offset_us:
+            self.min_offset_us = offset
+        self.delay_us = offset - self.min_offset_us
+        self.max_delay_us = max(self.max_delay_us, self.delay_us)
+        return lost
+
+    def summary(self):
+        return (f"{self.name}: {self.packets} packets, {self.records} records, {self.lost} lost, "
+                f"delay above the quickest {self.delay_us / 1000:.1f} ms (max {self.max_delay_us / 1000:.1f} ms)")
+
+
+class TelemetryReader:
+    '''Reassembles packets from a TCP byte stream, feed() returns every complete Packet.'''
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.stats = {}
+
+    def feed(self, data, arrival_us=None):
+        if arrival_us is None:
+            arrival_us = monotonic_us()
+        self.buffer.extend(data)
+        packets = []
+        while len(self.buffer) >= HEADER.size:
+            magic, version, stream, length, seq, sent_us = HEADER.unpack_from(self.buffer)
+            if magic != MAGIC:
+                raise ValueError("not a telemetry stream")
+            if version != VERSION:
+                raise ValueError(f"telemetry version {version}, expected {VERSION}")
+            size = HEADER.size + length
+            if len(self.buffer) < size:
+                break
+            payload = bytes(self.buffer[HEADER.size:size])
+            del self.buffer[:size]
+            if stream not in RECORDS:
+                continue   # newer SUB software, skip what we cannot read
+            records = np.frombuffer(payload, RECORDS[stream])
+            stats = self.stats.setdefault(stream, StreamStats(stream))
+            lost = stats.update(seq, len(records), sent_us, arrival_us)
+            packets.append(Packet(stream, seq, sent_us, records, lost, stats.delay_us))
+        return packets
+
+    def summary(self):
+        return "\n".join(stats.summary() for stats in self.stats.values())
@@ -2,7 +2,8 @@
 Controller.py
 
 Receives Controller input from Control at 192.168.2.2:5800
-This script is started by Controller_enable.py and gets controller data from ctl_receive.py
+This script is started once by Controller_enable.py and gets controller data from read_controller.py.
+It stays running disarmed, Controller_enable.py arms and disarms it over a local UDP command port.
 Copyright (c) 2023
 Created by Christopher Holm
 holmch@oregonstate.edu
@@ -23,277 +24,463 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Revision History
 #####################################################################################
 2023/12/05 CEH Initial Version
+2026/10/18 CEH Decode binary control frames (ctl_frame.py), every coalesced event is now applied
+2026/10/18 CEH Thruster state held in thrusters.py and written as one serial frame per control tick
+2026/10/18 CEH Axes combined through the mixing matrix in mixer.py instead of per axis branches
+2026/10/18 CEH Axis shaping from precomputed lookup tables (axis_lut.py), hot reloaded from controller.json
+2026/10/18 CEH Single asyncio event loop for the control socket, serial port and UDP telemetry, no sleep polling
+2026/10/18 CEH Bidirectional heartbeat (heartbeat.py), neutral on all thrusters when the link goes quiet
+2026/10/18 CEH Input to thruster latency histograms (latency.py), kill -USR1 prints them, dumped on exit
+2026/10/18 CEH Rate limited ring buffer logging (ring_log.py) instead of print() on the hot path
+2026/10/18 CEH Control server address from controller.json so a replayed session can drive it
+2026/10/18 CEH Serial port from controller.json so ardu_emulator.py can stand in for the Uno
+2026/10/18 CEH GPIO through hal.py so the light PWM can be simulated off the Pi
+2026/10/18 CEH Arduino boot delay from controller.json, bench runs against a pty set it to 0
+2026/10/18 CEH Frame type and button dispatch tables (ctl_dispatch.py), buttons mapped in controller.json
+2026/10/18 CEH Warm standby: armed/disarmed in process over the command port, reconnects instead of exiting
+2026/10/18 CEH Thruster frames to serial_broker.py over a message queue, the broker owns the serial port
+2026/10/18 CEH Thruster frames paced to what the Uno reads, a held back change is flushed when the interval is up
+2026/10/18 CEH Link loss commands neutral and soft disables but stays armed, only an operator disarms
+2026/10/18 CEH Config reload builds axes and buttons before swapping either, type errors keep the old ones
+2026/10/18 CEH Axis values clamped to the int16 range before the table lookup (AxisShaper.shape)
+2026/10/18 CEH Link lost log states the neutral bound through the thruster pacing (neutral_bound_ms)
+2026/10/18 CEH Counts the axis events applied to the mixer, apart from every axis frame received
 
 
 ####################################################################################
 '''
 #!/usr/bin/python3
 # Define Libraries
-import RPi.GPIO as GPIO
+import asyncio
 import signal
 import time
-import socket
-import threading
-import serial
-import re
+import ctl_frame
+from thrusters import ThrusterCommand
+from mixer import ThrusterMixer
+from axis_lut import AxisShaper
+from ctl_config import ConfigWatcher
+from ctl_dispatch import ButtonDispatcher
+from heartbeat import Heartbeat
+from latency import LatencyRecorder
+from ring_log import RingLog
+import serial_broker
+import hal
 
 # Define GPIO
 # Pin Definitions:
 lightPin = 12  # Broadcom pin 32
 
 # Duty cycle (0-100) for PWM pin
-dc1 = dc2 = dc3 = dc4 = 50
 lightdc = 60
 
 # Pin Setup:
+GPIO = hal.gpio()  # RPi.GPIO on the Pi, simulated light PWM with ROV_HAL=sim
 GPIO.setwarnings(False)
 GPIO.setmode(GPIO.BCM)  # Broadcom pin-numbering scheme
-ser = serial.Serial('/dev/ttyACM0', 115200, timeout=1)
+config = ConfigWatcher()
+shaper = AxisShaper(config.load()["axes"])
+# serial_broker.py owns /dev/ttyACM0 and the Arduino's battery output, thruster frames go through its queue
+broker = serial_broker.BrokerClient(serial_broker.settings(config.config)["command_key"])
+thrusters = ThrusterCommand(broker, **config.config.get("thrusters", {}))
+mixer = ThrusterMixer()
+log = RingLog(rate_limits=config.config.get("log_rate_limits"))
+heartbeat = Heartbeat(**config.config["heartbeat"])
 
 # PWM pins set as output
 GPIO.setup(lightPin, GPIO.OUT)
 
 # Initialize PWM on pwmPins
-pwmlight = GPIO.PWM(lightPin, 332)
-pwmlight.start(lightdc)
+pwmlight = GPIO.PWM(lightPin, 332)  # started on arm
 
+armed = False
 enable = False
 lights = False
-fwdbk = 0
-rotate = 0
-updwn = 0
-roll = 0
-client_socket = None
-stop_threads = False
+control_transport = None
+udp_transport = None
+stop_event = None
+SERVER_ADDRESS, SERVER_PORT = config.config.get("control_server", ["192.168.2.2", 5800])  # replay_controller.py can stand in
 UDP_IP = "192.168.2.2"
-UDP_PORT = 5650  # Battery output port
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-
-
-def apply_control(control_name, control_value):
-    global fwdbk, rotate, updwn, roll, enable, lights, lightdc, dim, bright
-    if control_name == "enable":
-        enable = not enable
-        if enable == True:
-            print("Enable Received")
-            sock.sendto("Enable Received".encode('utf-8'), (UDP_IP, UDP_PORT))
-        else:
-            print("Control Soft Disabled On")
-            sock.sendto("Soft Disable On".encode('utf-8'), (UDP_IP, UDP_PORT))
+UDP_PORT = 5650  # Battery output port, status messages share it
+COMMAND_PORT = config.config.get("command_port", 5660)  # arm/disarm/status from Controller_enable.py, localhost only
+RECONNECT_DELAY = 0.5  # seconds between attempts to reach the control server
+decoder = ctl_frame.FrameDecoder()
+encoder = ctl_frame.FrameEncoder()
+
+# Latency stages, all in microseconds.  Stages that cross the tether use the heartbeat clock offset.
+#   evdev_to_recv  gamepad event time on Control to frame received here
+#   tether         TICK frame sent by Control to received here
+#   recv_to_mix    TICK received to thruster mix done
+#   mix_to_write   mix done to the frame queued for serial_broker.py, which records the rest
+#   evdev_to_write gamepad event time on Control to the frame that carried it being queued
+#   arm, disarm    command received to the new state applied, thrusters flushed to neutral
+latency = LatencyRecorder(["evdev_to_recv", "tether", "recv_to_mix", "mix_to_write", "evdev_to_write", "arm", "disarm"])
+rx_us = 0                      # wall clock time the current segment was received
+tick_event_us = []             # Control side event times applied since the last serial write
+paced_flush = None             # call_later handle writing a change flush() held back
+axis_applied = 0               # axis events shaped and set on the mixer while soft enabled
+
+
+def send_udp(message):
+    if udp_transport is not None:
+        udp_transport.sendto(message)
+
+
+def arm():
+    global armed, enable
+    if armed:
+        return
+    armed = True
+    enable = False  # the pilot still soft enables from the gamepad, same as after a cold start
+    command_neutral()
+    pwmlight.start(lightdc)
+    log.log("control", "Armed")
+
+
+def link_lost():
+    # Thrusters to neutral now, the pilot soft enables from the gamepad again once the link is
+    # back; armed stays as the operator left it so a blip does not need a re-arm from the GUI
+    global enable
+    enable = False
+    command_neutral()
+
+
+def disarm():
+    global armed, enable, lights
+    was_armed = armed
+    armed = False
+    enable = False
+    lights = False
+    command_neutral()
+    pwmlight.stop()
+    if was_armed:
+        log.log("control", "Disarmed, thrusters set to neutral")
+
+
+def toggle_enable():
+    global enable
+    if not armed:
+        log.log("disabled", "Disarmed, enable ignored")
+        return
+    enable = not enable
+    if enable == True:
+        log.log("control", "Enable Received")
+        send_udp("Enable Received".encode('utf-8'))
+    else:
+        log.log("control", "Control Soft Disabled On")
+        mixer.reset()
+        send_udp("Soft Disable On".encode('utf-8'))
+
+
+def set_axis(name, value):
+    # Stick axes only update the demand vector, the tick mixes all of them together
+    global axis_applied
     if enable == True:
-        if control_name == "fwdbk":
-            fwdbk = map_range(control_value, -32768, 32767, 100, 0)
-            print(f"setting pwm1 and pwm4 to {fwdbk}")
-            serialData = f"pwm1:{fwdbk},pwm4:{fwdbk}\n"
-            ser.write(serialData.encode('utf-8'))
-        elif control_name == "rotate":
-            rotate = map_range(control_value, -32768, 32767, 0, 100)
-            if rotate > 50:
-                dc4 = ((rotate - 50) / 2) + 50
-                dc1 = abs(((rotate - 50) / 2) - 50)
-            elif rotate < 50:
-                dc1 = ((50 - rotate) / 2) + 50
-                dc4 = abs(((50 - rotate) / 2) - 50)
-            else:
-                dc1 = dc4 = 50
-            print(f"Setting pwm1 to {dc1} and pwm4 to {dc4}")
-            serialData = f"pwm1:{dc1},pwm4:{dc4}\n"
-            ser.write(serialData.encode('utf-8'))
-        elif control_name == "updwn":
-            updwn = map_range(control_value, -32768, 32767, 0, 100)
-            print(f"Setting pwm2 and pwm3 to {updwn}")
-            serialData = f"pwm2:{updwn},pwm3:{updwn}\n"
-            ser.write(serialData.encode('utf-8'))
-        elif control_name == "roll":
-            roll = map_range(control_value, -32768, 32767, 0, 100)
-            if roll > 50:
-                dc2 = ((roll - 50) / 2) + 50
-                dc3 = abs(((roll - 50) / 2) - 50)
-            elif roll < 50:
-                dc3 = ((50 - roll) / 2) + 50
-                dc2 = abs(((50 - roll) / 2) - 50)
-            else:
-                dc2 = dc3 = 50
-            print(f"Setting pwm2 to {dc2} and pwm3 to {dc3}")
-            serialData = f"pwm2:{dc2},pwm3:{dc3}\n"
-            ser.write(serialData.encode('utf-8'))
-        elif control_name == "lights":
-            if control_value == 1:
-                lights = not lights
-                if lights == True:
-                    pwmlight.start(lightdc)
-                    print(f"Turning on Lights at {lightdc}")
-                else:
-                    pwmlight.stop()
-                    print("Lights out!")
-            else:
-                print("light input error?")
-        elif control_name == "dim":
-            if control_value == 1:
-                if lightdc > 10:
-                    lightdc = lightdc - 10
-                    pwmlight.start(lightdc)
-                    print(f"Setting Lights Dimmer by 10 now set to {lightdc}")
-                else:
-                    print("Lights already at minimum setting, no change")
-        elif control_name == "bright":
-            if control_value == 1:
-                if lightdc < 100:
-                    lightdc = lightdc + 10
-                    pwmlight.start(lightdc)
-                    print(f"Setting Lights Brighter by 10 now set to {lightdc}")
-                else:
-                    print("Lights already at maximum setting, no change")
+        mixer.set_axis(name, value)
+        axis_applied += 1
+    else:
+        log.log("disabled", "Soft Disable Active")
+
+
+def toggle_lights():
+    global lights
+    if enable != True:
+        log.log("disabled", "Soft Disable Active")
+        return
+    lights = not lights
+    if lights == True:
+        pwmlight.start(lightdc)
+        log.log("lights", "Turning on Lights at %d", lightdc)
+    else:
+        pwmlight.stop()
+        log.log("lights", "Lights out!")
+
+
+def dim_lights():
+    global lightdc
+    if enable != True:
+        log.log("disabled", "Soft Disable Active")
+    elif lightdc > 10:
+        lightdc = lightdc - 10
+        pwmlight.start(lightdc)
+        log.log("lights", "Setting Lights Dimmer by 10 now set to %d", lightdc)
     else:
-        print("Soft Disable Active")
-        pass
+        log.log("lights", "Lights already at minimum setting, no change")
 
 
-def map_range(value, in_min, in_max, out_min, out_max):
-    return (value - in_min) * (out_max - out_min) // (in_max - in_min) + out_min
+def brighten_lights():
+    global lightdc
+    if enable != True:
+        log.log("disabled", "Soft Disable Active")
+    elif lightdc < 100:
+        lightdc = lightdc + 10
+        pwmlight.start(lightdc)
+        log.log("lights", "Setting Lights Brighter by 10 now set to %d", lightdc)
+    else:
+        log.log("lights", "Lights already at maximum setting, no change")
 
 
-def is_server_alive():
-    try:
-        # Send a small request to check if the server is alive
-        client_socket.sendall(b"PING")
-        return True
-    except Exception:
-        return False
+# Action names the "buttons" section of controller.json can map a key code to
+BUTTON_ACTIONS = {"enable": toggle_enable, "lights": toggle_lights, "dim": dim_lights, "bright": brighten_lights}
+buttons = ButtonDispatcher(BUTTON_ACTIONS, config.config["buttons"])
 
 
-def cleanup_and_exit(signum, frame):
-    global stop_threads
-    print("Received SIGTERM, Control has been disabled, closing out")
-    stop_threads = True  # Set the flag to stop threads
+def reload_config():
+    # Rebuild the axis curves and button map if controller.json was edited, the old tables stay in use on error
+    try:
+        new_config = config.load()
+        axes = shaper.build(new_config["axes"])
+        table = buttons.build(new_config["buttons"])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        # A wrong type ("deadband": "0.1") or shape is as much an error as a missing key
+        log.log("config", "Keeping previous axis curves and button map, could not reload %s: %s", config.path, e)
+        return
+    # Both built, swap them together so the tables in use always come from one file
+    shaper.axes = axes
+    buttons.table = table
+    log.log("config", "Reloaded %s", config.path)
+
+
+def cleanup():
+    log.log("control", "Control has been disabled, closing out")
+    log.log("stats", "Control frames: %d received, %d lost, %d resyncs", decoder.frames, decoder.lost, decoder.resyncs)
+    log.log("stats", "Thruster frames: %d written (%d bytes), %d unchanged ticks skipped, %d held back for the Uno", thrusters.writes, thrusters.bytes_written, thrusters.skipped, thrusters.paced)
+    log.log("stats", "Serial broker queue: %s", broker.summary())
+    log.log("stats", "Heartbeat: %s", heartbeat.summary())
+    log.log("stats", "Button actions: %s", buttons.summary())
+    log.log("stats", "Axis events: %d applied while enabled", axis_applied)
+    log.log("stats", "Axis values outside the int16 range, clamped: %d", shaper.out_of_range)
+    log.log("stats", "Arming: %d arm, %d disarm commands", latency.stages["arm"].total, latency.stages["disarm"].total)
+    print_latency()
+    try:
+        latency.dump(config.config.get("latency_log", "Controller_latency.json"))
+    except OSError as e:
+        log.log("stats", "Could not write latency histograms: %s", e)
+    log.log("stats", "Log: %s", log.stats())
     pwmlight.stop()
     GPIO.cleanup()
-    ser.close()
-    sock.close()
-
-
-def process_event(event):
-    if event.startswith("AXIS"):
-        axis, value = event.split()[1], int(event.split()[2])  # Convert value to integer
-        if axis == "1":
-            apply_control("fwdbk", value)
-        elif axis == "3":
-            apply_control("rotate", value)
-        elif axis == "4":
-            apply_control("updwn", value)
-        elif axis == "0":
-            apply_control("roll", value)
-        print(f"Event Axis {axis}, {value}")
-    if event.startswith("BUTTON"):
-        if "BTN_THUMBL" in event and "1" in event:
-            apply_control("enable", 1)
-        elif "BTN_WEST" in event and "1" in event:
-            apply_control("lights", 1)
-        elif "BTN_TL" in event and "1" in event:
-            apply_control("dim", 1)
-        elif "BTN_TR 1" in event and "1" in event:
-            apply_control("bright", 1)
+    log.close()
+
+
+def print_latency():
+    log.log("stats", "Latency (ms):\n%s", latency.summary())
+
+
+def record_peer_latency(stage, peer_timestamp, now_us):
+    local = heartbeat.to_local_us(peer_timestamp)
+    if local is not None:
+        latency.record(stage, now_us - local)
+    return local
+
+
+def flush_thrusters():
+    mixed_us = ctl_frame.timestamp_us()
+    latency.record("recv_to_mix", mixed_us - rx_us)
+    write_thrusters(mixed_us)
+
+
+def write_thrusters(mixed_us):
+    # Serial frames are paced for the Uno, the latest state goes out as soon as the interval is up
+    if thrusters.flush():
+        written_us = ctl_frame.timestamp_us()
+        latency.record("mix_to_write", written_us - mixed_us)
+        for event_us in tick_event_us:
+            latency.record("evdev_to_write", written_us - event_us)
+    elif thrusters.pending():
+        schedule_flush()
+        return   # events are timed to the write that carries them
+    tick_event_us.clear()
+
+
+def schedule_flush():
+    global paced_flush
+    if paced_flush is None:
+        paced_flush = asyncio.get_running_loop().call_later(thrusters.wait(), paced_write)
+
+
+def paced_write():
+    global paced_flush
+    paced_flush = None
+    write_thrusters(ctl_frame.timestamp_us())
+
+
+def on_axis(frame):
+    axis, value = frame.code, frame.value
+    shaped = shaper.shape(axis, value)
+    if shaped is not None:
+        set_axis(*shaped)
+        event_us = record_peer_latency("evdev_to_recv", frame.timestamp, rx_us)
+        if event_us is not None:
+            tick_event_us.append(event_us)
+    log.log("axis", "Event Axis %d, %d", axis, value)
+
+
+def on_button(frame):
+    # Only act on the press, not the release (0) or autorepeat (2)
+    if frame.value == 1 and not buttons.dispatch(frame.code):
+        log.log("button", "Button %d has no function map", frame.code)
+
+
+def on_tick(frame):
+    # End of a control tick, mix every axis at once and send the whole thruster state
+    record_peer_latency("tether", frame.timestamp, rx_us)
+    if enable:
+        thrusters.set_all(mixer.mix())
     else:
-        print("Button has no function map")
+        thrusters.neutral()
+    flush_thrusters()
+    if config.changed():
+        reload_config()
 
 
-def controller_thread():
-    global client_socket, stop_threads
+def on_ping(frame):
+    send_frame(heartbeat.pong_for(frame))
 
-    try:
-        while not stop_threads:
-            data = client_socket.recv(1024)
-            if not data:
-                break
 
-            button_input = data.decode().strip()
-            process_event(button_input)
-            print(f"Received: {button_input}")
+FRAME_HANDLERS = {
+    ctl_frame.EV_AXIS: on_axis,
+    ctl_frame.EV_BUTTON: on_button,
+    ctl_frame.EV_TICK: on_tick,
+    ctl_frame.EV_PING: on_ping,
+    ctl_frame.EV_PONG: heartbeat.on_pong,
+}
 
-            time.sleep(0.01)  # Adjust the sleep duration based on your requirements
 
-            # Check if the server is still alive
-            if not is_server_alive():
-                print("Server is no longer reachable. Exiting.")
-                stop_threads = True
+def process_event(frame):
+    handler = FRAME_HANDLERS.get(frame.type)
+    if handler is not None:
+        handler(frame)
 
-    except Exception as e:
-        print(f"An unexpected error occurred in controller_thread: {e}")
 
+class ControlProtocol(asyncio.Protocol):
+    '''Port 5800 control stream, frames are applied as soon as the loop sees the bytes.'''
 
-def serial_thread():
-    global stop_threads
+    def __init__(self, closed):
+        self.closed = closed  # future main() waits on before reconnecting
 
-    try:
-        last_battery_voltage_time = time.time()
+    def connection_made(self, transport):
+        log.log("link", "Connected to server at %s:%d", SERVER_ADDRESS, SERVER_PORT)
+        decoder.reset_stream()  # the server numbers frames per connection
+
+    def data_received(self, data):
+        global rx_us
+        rx_us = ctl_frame.timestamp_us()
+        heartbeat.received()
+        # A single segment can hold several frames or part of one, apply every whole frame
+        for frame in decoder.feed(data):
+            process_event(frame)
+            log.log("frame", "Received: %s", frame)
 
-        while not stop_threads:
-            # Read data from the serial port
-            serial_data = ser.readline().decode('utf-8').strip()
+    def connection_lost(self, exc):
+        global control_transport
+        control_transport = None
+        link_lost()
+        log.log("link", "Server is no longer reachable, thrusters at neutral, %s, reconnecting (%s)",
+                "still armed" if armed else "disarmed", exc)
+        if not self.closed.done():
+            self.closed.set_result(exc)
 
-            if serial_data:
-                print(serial_data)
 
-                # Check for "Battery Voltage" in the serial data
-                if "Battery Voltage" in serial_data:
-                    # Check if it's been one second since the last battery voltage update
-                    if (time.time() - last_battery_voltage_time) >= 1:
-                        # Update the last update time
-                        last_battery_voltage_time = time.time()
+COMMANDS = {"arm": arm, "disarm": disarm, "status": None}
 
-                        # Extract battery voltage using a regular expression
-                        match = re.search(r'Battery Voltage: ([\d.]+)', serial_data)
-                        if match:
-                            voltage_str = match.group(1)
-                            try:
-                                battery_voltage = float(voltage_str)
-                                sock.sendto(str(battery_voltage).encode('utf-8'), (UDP_IP, UDP_PORT))
-                            except ValueError:
-                                print("Failed to parse battery voltage")
 
-                time.sleep(0.01)  # Adjust the sleep duration based on your requirements
+class CommandProtocol(asyncio.DatagramProtocol):
+    '''Local arm/disarm/status datagrams from Controller_enable.py, answered with the state and switch time.'''
 
-    except Exception as e:
-        print(f"An unexpected error occurred in serial_thread: {e}")
+    def connection_made(self, transport):
+        self.transport = transport
 
+    def datagram_received(self, data, addr):
+        start = time.perf_counter()
+        command = data.decode('utf-8', errors='replace').strip()
+        if command not in COMMANDS:
+            self.transport.sendto(f"error unknown command {command!r}".encode('utf-8'), addr)
+            return
+        switch_us = 0
+        if COMMANDS[command] is not None:
+            COMMANDS[command]()
+            switch_us = int((time.perf_counter() - start) * 1e6)
+            latency.record(command, switch_us)
+        # "armed 180" / "disarmed 95": state after the command and the in process switch time in us
+        state = "armed" if armed else "disarmed"
+        self.transport.sendto(f"{state} {switch_us}".encode('utf-8'), addr)
 
-def main():
-    global client_socket, stop_threads  # Declare client_socket as a global variable
 
-    server_address = "192.168.2.2"
-    server_port = 5800
+def command_neutral():
+    mixer.reset()
+    thrusters.neutral()
+    write_thrusters(ctl_frame.timestamp_us())
 
-    # Connect to the server
-    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    client_socket.connect((server_address, server_port))
-    print(f"Connected to server at {server_address}:{server_port}")
-    time.sleep(5)
+
+def neutral_bound_ms():
+    # Last frame heard to neutral on the wire: detection, then the neutral frame waits out the
+    # pacing only if the last write came later than timeout - min_interval into the silence
+    return heartbeat.bound_ms + max(0.0, 2 * thrusters.min_interval - heartbeat.timeout) * 1000
+
+
+def send_frame(fields):
+    if control_transport is not None and not control_transport.is_closing():
+        control_transport.write(encoder.encode(*fields))
+
+
+def send_heartbeat():
+    send_frame(heartbeat.ping())
+    asyncio.get_running_loop().call_later(heartbeat.period, send_heartbeat)
+
+
+def check_link():
+    # Failsafe: nothing heard for the heartbeat timeout, stop every thruster right now rather
+    # than holding the last command until the Arduino's own 500 ms serialTimeout
+    if control_transport is not None and heartbeat.check():
+        link_lost()
+        log.log("link", "Control link lost after %.1f ms of silence (detection bound %.1f ms), "
+                "neutral written within %.1f ms, reconnecting",
+                heartbeat.last_detection_ms, heartbeat.bound_ms, neutral_bound_ms())
+        control_transport.abort()
+    asyncio.get_running_loop().call_later(heartbeat.check_interval, check_link)
+
+
+async def main():
+    global control_transport, udp_transport, stop_event
+
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, stop_event.set)
+    loop.add_signal_handler(signal.SIGINT, stop_event.set)
+    loop.add_signal_handler(signal.SIGUSR1, print_latency)
+
+    udp_transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(UDP_IP, UDP_PORT))
+    command_transport, _ = await loop.create_datagram_endpoint(CommandProtocol, local_addr=("127.0.0.1", COMMAND_PORT))
+    send_heartbeat()
+    check_link()
+    stopped = asyncio.ensure_future(stop_event.wait())
     try:
-        # Start the controller_thread in the background
-        controller_thread_instance = threading.Thread(target=controller_thread)
-        controller_thread_instance.start()
-        serial_thread_instance = threading.Thread(target=serial_thread)
-        serial_thread_instance.start()
-        while not stop_threads:
-            time.sleep(1)  # Adjust the sleep duration based on your requirements
-
-            # Check if the server is still alive
-            if not is_server_alive():
-                print("Server is no longer reachable. Exiting.")
-                stop_threads = True
+        # Stay up through link drops at neutral, only a signal ends the process
+        while not stop_event.is_set():
+            closed = loop.create_future()
+            try:
+                control_transport, _ = await loop.create_connection(lambda: ControlProtocol(closed), SERVER_ADDRESS, SERVER_PORT)
+            except OSError as e:
+                log.log("retry", "Server at %s:%d not reachable, retrying: %s", SERVER_ADDRESS, SERVER_PORT, e)
+                await asyncio.wait({stopped}, timeout=RECONNECT_DELAY)
+                continue
+            heartbeat.received()
+            await asyncio.wait({closed, stopped}, return_when=asyncio.FIRST_COMPLETED)
     finally:
-        client_socket.close()
-        cleanup_and_exit(None, None)
-        sock.close()
+        disarm()
+        if thrusters.pending():
+            # Neutral held back by the pacing, give it its turn before the loop goes away
+            await asyncio.sleep(thrusters.wait())
+            thrusters.flush()
+        stopped.cancel()
+        if control_transport is not None:
+            control_transport.close()
+        command_transport.close()
+        udp_transport.close()
 
 
 if __name__ == "__main__":
     try:
-        signal.signal(signal.SIGTERM, cleanup_and_exit)
-        main()  # Run the main script logic without threading
-
-    except KeyboardInterrupt:
-        pass
+        asyncio.run(main())
     finally:
         # Ensure cleanup before exit
-        cleanup_and_exit(None, None)
+        cleanup()
@@ -2,6 +2,8 @@
 Controller_enable.py
 
 Recieves Enable button input  at 192.168.2.2:5840
+Starts serial_broker.py and Controller.py once and keeps them warm, enable/disable arm and
+disarm Controller.py over its local command port instead of starting and killing the process.
 
 Copyright (c) 2023
 Created by Christopher Holm
@@ -24,187 +26,292 @@ Revision History
 #####################################################################################
 2023/01/05 CEH Initial Version
 2024/03/07 CEH Removed GPIO and added better process handling, ensure we don't Zombie!
+2026/10/18 CEH Serial port from controller.json, shared with Controller.py and ardu_emulator.py
+2026/10/18 CEH Warm standby: arm/disarm a persistent Controller.py, battery comes from Controller.py which holds the port
+2026/10/18 CEH Starts serial_broker.py, the single owner of the serial port
+2026/10/18 CEH Children supervised through pidfds (supervisor.py): reaped on exit, restarted with backoff, no psutil scan
+2026/10/18 CEH Persistent command sessions (arm_session.py on Control): request ids, acks with the actual armed state
+2026/10/18 CEH Children run on this interpreter (Comms/env) rather than /usr/bin/python3
+2026/10/18 CEH Restarts serial_broker.py when its status block shows the Arduino has gone silent
+2026/10/18 CEH Status polls answered quietly, and at once when Controller.py is down
+2026/10/18 CEH Cold start and restarts never block the loop, acks wait in ColdStart until Controller.py answers
 
 ####################################################################################
 '''
 import socket
 import os
-import subprocess
-from subprocess import PIPE
-import psutil
+import selectors
+import sys
 import time
-import serial
-import threading
+import serial_broker
+from ctl_config import ConfigWatcher
+from supervisor import Child, Supervisor
 
 # Server configuration
 host = "192.168.2.3"
-client = "192.168.2.2"
 control_port = 5640
-data_port = 5650
-serial_port = "/dev/ttyACM0"
-baud_rate = 115200
-process = None
-ser = None
-serial_running = False
-broadcast_enabled = True  # Global flag to control the broadcast thread
-battery_broadcast_thread = None
-
-def start_controller():
-    global process
-    log_dir = "/home/rov/logs/"
-    script_dir = "/home/rov/CVHS_SUB/Comms/Controller.py"
-    stdout_path = os.path.join(log_dir, "Controller_stdout.txt")
-    stderr_path = os.path.join(log_dir, "Controller_stderr.txt")
-    with open(stdout_path, "w") as out_file, open(stderr_path, "w") as err_file:
-        process = subprocess.Popen(["/usr/bin/python3", script_dir], stdout=out_file, stderr=err_file)
-    return process
-
-def start_battery_broadcast():
-    global broadcast_enabled
-
-    while broadcast_enabled:
-        send_battery_voltage()
-        time.sleep(0.25)  # Adjust the sleep duration as needed
-
-    # Additional cleanup or final actions can be added here
-    print("Battery broadcast thread stopped.")
-
-def stop_battery_broadcast():
-    global broadcast_enabled
-    broadcast_enabled = False  # Set the flag to stop the broadcast thread
-
-def restart_battery_broadcast():
-    global broadcast_enabled, battery_broadcast_thread
-
-    # Wait for a short duration before restarting the broadcast
-    time.sleep(1)
-
-    # Reset the broadcast flag and start the thread again
-    broadcast_enabled = True
-    battery_broadcast_thread = threading.Thread(target=start_battery_broadcast, daemon=True)
-    battery_broadcast_thread.start()
-
-def handle_message(message):
-    global process, ser, serial_running, battery_broadcast_thread
-
+config = ConfigWatcher().load()
+command_port = config.get("command_port", 5660)  # Controller.py arm/disarm/status, localhost only
+cold_start_timeout = 5  # interpreter, numpy and GPIO init, the serial port stays with the broker
+stop_timeout = 2  # SIGTERM to SIGKILL for a child that is being restarted
+broker_options = serial_broker.settings(config)
+# The Uno prints a battery line every loop(), none for silent_s after the boot delay means the
+# port or the broker is stuck, reopening it is the one thing that can bring it back
+arduino_silent = broker_options["silent_s"]
+arduino_grace = config.get("arduino_boot_delay", 5) + arduino_silent
+arduino_check_interval = 1.0
+log_dir = "/home/rov/logs/"
+script_dir = "/home/rov/CVHS_SUB/Comms/"
+selector = selectors.DefaultSelector()
+supervisor = Supervisor(selector)
+
+def child(name, script):
+    # Same interpreter as ours, the Comms/env one that has sysv_ipc
+    return Child(name, [sys.executable, os.path.join(script_dir, script)],
+                 os.path.join(log_dir, f"{name}_stdout.txt"), os.path.join(log_dir, f"{name}_stderr.txt"))
+
+# serial_broker.py opens the port once (the Uno resets then) and forwards battery voltage the
+# whole time, Controller.py starts disarmed and queues its thruster frames to the broker
+broker = child("serial_broker", "serial_broker.py")
+controller = child("Controller", "Controller.py")
+broker_status = serial_broker.StatusReader(broker_options["status_key"])
+
+def send_command(command, timeout=0.5):
+    # One datagram to Controller.py, returns (state, switch us) or None if nothing answered
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as command_socket:
+        command_socket.settimeout(timeout)
+        start = time.perf_counter()
+        command_socket.sendto(command.encode('utf-8'), ("127.0.0.1", command_port))
+        try:
+            reply = command_socket.recv(1024).decode('utf-8')
+        except OSError:
+            return None
+        rtt_ms = (time.perf_counter() - start) * 1000
+    state, switch_us = parse_reply(reply)
+    if command != "status":  # activate.py polls status every second, only log what changes state
+        print(f"Controller.py {state}: switch {switch_us} us in process, {rtt_ms:.2f} ms round trip")
+    return state, switch_us
+
+def parse_reply(reply):
+    # "armed 180" / "disarmed 95" from Controller.py's command port
+    state, _, switch_us = reply.partition(" ")
+    return state, int(switch_us or 0)
+
+def wait_for_controller():
+    # Poll status until a freshly started Controller.py answers or gives up
+    deadline = time.monotonic() + cold_start_timeout
+    while time.monotonic() < deadline:
+        if controller.process.poll() is not None:
+            print("Controller.py exited during start up")
+            return None
+        reply = send_command("status", timeout=0.2)
+        if reply is not None:
+            return reply
+    print(f"Controller.py did not answer within {cold_start_timeout} s")
+    return None
+
+class ColdStart:
+    '''Controller.py on its way up.  Status is polled from the server loop over a non-blocking
+    socket, and the commands that arrive meanwhile are sent and acked once it answers, or acked
+    "down" if it exits or the deadline passes, so other sessions are served the whole time.'''
+
+    poll_interval = 0.2
+
+    def __init__(self, timeout=cold_start_timeout):
+        self.started = time.monotonic()
+        self.timeout_s = timeout
+        self.deadline = self.started + timeout
+        self.next_poll = self.started
+        self.waiters = []   # (command to send once it answers, called with the ack)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        selector.register(self.socket, selectors.EVENT_READ, self.readable)
+
+    def ours(self):
+        # The process started for this cold start, not one still being terminated
+        return controller.started >= self.started
+
+    def timeout(self):
+        return max(0.0, min(self.next_poll, self.deadline) - time.monotonic())
+
+    def poll(self):
+        now = time.monotonic()
+        if self.ours() and (not controller.running or controller.process.poll() is not None):
+            print("Controller.py exited during start up")
+            self.finish(None)
+        elif now >= self.deadline:
+            print(f"Controller.py did not answer within {self.timeout_s} s")
+            self.finish(None)
+        elif now >= self.next_poll:
+            self.next_poll = now + self.poll_interval
+            if self.ours():
+                try:
+                    self.socket.sendto(b"status", ("127.0.0.1", command_port))
+                except OSError:
+                    pass   # not bound yet, the next poll tries again
+
+    def readable(self, status_socket):
+        try:
+            reply = status_socket.recv(1024).decode('utf-8')
+        except OSError:
+            return
+        print(f"Controller.py cold start took {time.monotonic() - self.started:.2f} s")
+        self.finish(parse_reply(reply))
+
+    def finish(self, reply):
+        global cold_start
+        selector.unregister(self.socket)
+        self.socket.close()
+        cold_start = None
+        for command, acknowledge in self.waiters:
+            acknowledge((send_command(command) if reply is not None else None) or ("down", 0))
+
+cold_start = None   # ColdStart while a started Controller.py has not answered yet
+
+def start_controller(command, acknowledge, restart=False):
+    # Start Controller.py now rather than waiting out the backoff, or restart a hung one, and
+    # leave the ack to the server loop.  Requests during a start up queue behind it in order.
+    global cold_start
+    if cold_start is None:
+        if restart:
+            cold_start = ColdStart(cold_start_timeout + stop_timeout)
+            supervisor.terminate(controller, kill_after=stop_timeout)  # it always starts disarmed
+        else:
+            print("Controller.py is not running, cold starting it")
+            cold_start = ColdStart()
+            if controller.running:
+                supervisor.stop(controller)  # exited but not reaped yet, wait() returns at once
+            supervisor.start_now(controller)
+    cold_start.waiters.append((command, acknowledge))
+
+def check_arduino():
+    if not broker.running or time.monotonic() - broker.started < arduino_grace:
+        return
+    status = broker_status.read()
+    silent = time.monotonic() - broker.started if status is None else status["age_ms"] / 1000
+    if silent > arduino_silent:
+        print(f"No battery line from the Arduino for {silent:.1f} s, restarting serial_broker.py")
+        supervisor.terminate(broker)
+
+def handle_message(message, acknowledge):
+    # Returns the ack (state, switch us), state is what Controller.py reports after the command
+    # or "down" if it could not be reached.  None while Controller.py starts, acknowledge is
+    # called with the ack from the server loop once it is up
     if message == "disable":
-        print("Received 'disable' message. Stopping Controller.py")
-        if process and process.poll() is None:
-            process.terminate()
-            process.communicate()  # Wait for the subprocess to complete
-
-        if not serial_running:
-            start_serial()
+        print("Received 'disable' message. Disarming Controller.py")
+        if cold_start is not None:
+            start_controller("disarm", acknowledge)
+            return None
+        reply = send_command("disarm")
+        if reply is None:
+            print("Controller.py did not answer, restarting it so the thrusters cannot stay armed")
+            start_controller("disarm", acknowledge, restart=True)
+            return None
 
-        # Stop the battery broadcast thread
-        stop_battery_broadcast()
+    elif message == "enable":
+        print("Received 'enable' message. Arming Controller.py")
+        if cold_start is not None or not controller.running or controller.process.poll() is not None:
+            start_controller("arm", acknowledge)
+            return None
+        reply = send_command("arm")
 
-        # Restart the battery broadcast thread after a short delay
-        restart_battery_broadcast()
+    elif message == "status":
+        # A running Controller.py answers in well under a millisecond, a down or starting one
+        # should not hold up the loop every time the surface polls
+        reply = send_command("status", timeout=0.1) if controller.running and cold_start is None else None
 
-    elif message == "enable":
-        print("Received 'enable' message. Starting Controller.py")
-        if serial_running:
-            stop_battery_broadcast()
-            stop_serial()
-            time.sleep(1)  # Delay for 1 second
-        
-        if not process or process.poll() is not None:
-            start_controller()
-        else:
-            print("Controller.py is already running.")
     else:
         print(f"Received unknown message: {message}")
+        return "error", 0
+    return reply or ("down", 0)
 
-def cleanup_zombies():
-    for proc in psutil.process_iter(['pid', 'name', 'status']):
-        if proc.info['status'] == psutil.STATUS_ZOMBIE:
-            print(f"Terminating zombie process: {proc.info['name']} ({proc.info['pid']})")
-            try:
-                psutil.Process(proc.info['pid']).terminate()
-            except psutil.NoSuchProcess:
-                pass
-
-def start_serial():
-    global ser, serial_running
-    try:
-        ser = serial.Serial(serial_port, baud_rate, timeout=1)
-        serial_running = True
-        print(f"Serial port {serial_port} opened.")
-        time.sleep(1)  # Delay to stabilize the serial connection
-    except Exception as e:
-        print(f"Error opening serial port: {e}")
-
-def stop_serial():
-    global ser, serial_running
-    try:
-        ser.close()
-        serial_running = False
-        print(f"Serial port {serial_port} closed.")
-    except Exception as e:
-        print(f"Error closing serial port: {e}")
-
-def read_battery_voltage():
-    global ser
-    try:
-        if not ser or not ser.is_open:
-            start_serial()  # Call start_serial without parameters
-        
-        data = ser.readline().decode('utf-8').strip()
-        if data:
-            # Extract the numeric part representing the battery voltage
-            voltage_part = data.split('Battery Voltage: ')[-1]
-            try:
-                battery_voltage = float(voltage_part)
-                print(f"Battery Voltage: {battery_voltage}")
-                return battery_voltage
-            except ValueError as ve:
-                print(f"Error converting string to float: {ve}")
-                return None
-        else:
-            print("Empty data received from serial port.")
-            return None
-    except Exception as e:
-        print(f"Error reading battery voltage: {e}")
-        return None
+class Session:
+    '''One command session from the surface, requests are "<id> <command>" lines.'''
 
-def send_battery_voltage():
-    battery_voltage = read_battery_voltage()
-    if battery_voltage is not None:
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as data_socket:
-                data_socket.sendto(str(battery_voltage).encode('utf-8'), (client, data_port))
-                print(f"Sent battery voltage to {client}:{data_port}: {battery_voltage}")
-        except Exception as e:
-            print(f"Error sending battery voltage: {e}")
+    def __init__(self, client_socket, client_address):
+        self.socket = client_socket
+        self.address = client_address
+        self.buffer = b""
+        self.requests = 0
 
+    def readable(self, client_socket):
+        try:
+            data = self.socket.recv(1024)
+        except OSError as e:
+            print(f"Error receiving message: {e}")
+            data = b""
+        if not data:
+            # activate.py before sessions sent one bare word and closed, still honour it
+            if self.buffer.strip():
+                self.handle(self.buffer.decode('utf-8', errors='replace').strip(), reply=False)
+            print(f"Session with {self.address} closed after {self.requests} requests")
+            selector.unregister(self.socket)
+            self.socket.close()
+            return
+        self.buffer += data
+        while b"\n" in self.buffer:
+            line, self.buffer = self.buffer.split(b"\n", 1)
+            if line.strip():
+                self.handle(line.decode('utf-8', errors='replace').strip())
+
+    def handle(self, line, reply=True):
+        request_id, _, message = line.rpartition(" ")
+        if message != "status":
+            print(f"Received message from client: {line}")
+        self.requests += 1
+
+        def acknowledge(ack):
+            if reply:
+                try:
+                    self.socket.sendall(f"{request_id or '-'} {ack[0]} {ack[1]}\n".encode('utf-8'))
+                except OSError as e:
+                    print(f"Error sending ack: {e}")
+
+        ack = handle_message(message, acknowledge)
+        if ack is not None:
+            acknowledge(ack)
+
+def accept_client(server_socket):
+    client_socket, client_address = server_socket.accept()
+    print(f"Connection established with {client_address}")
+    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    client_socket.settimeout(1.0)  # only read when the selector says so, bounded sendall
+    session = Session(client_socket, client_address)
+    selector.register(client_socket, selectors.EVENT_READ, session.readable)
 
 def start_server():
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.bind((host, control_port))
-    server_socket.listen(1)
+    server_socket.listen(4)
+    selector.register(server_socket, selectors.EVENT_READ, accept_client)
 
     print(f"Server listening on {host}:{control_port}")
 
+    # One loop for the control port and child exits, each ready file calls its handler
+    next_check = time.monotonic() + arduino_check_interval
     while True:
-        cleanup_zombies()
-        client_socket, client_address = server_socket.accept()
-        print(f"Connection established with {client_address}")
-
-        try:
-            data = client_socket.recv(1024).decode('utf-8')
-            if data:
-                print(f"Received message from client: {data}")
-                handle_message(data)
-        except Exception as e:
-            print(f"Error receiving message: {e}")
-        finally:
-            client_socket.close()
+        timeout = max(0.0, next_check - time.monotonic())
+        if supervisor.timeout() is not None:
+            timeout = min(timeout, supervisor.timeout())
+        if cold_start is not None:
+            timeout = min(timeout, cold_start.timeout())
+        for key, _ in selector.select(timeout):
+            key.data(key.fileobj)
+        supervisor.run_due()
+        if cold_start is not None:
+            cold_start.poll()
+        if time.monotonic() >= next_check:
+            next_check = time.monotonic() + arduino_check_interval
+            check_arduino()
 
 if __name__ == "__main__":
-    # Start battery voltage broadcast in a separate thread
-    battery_broadcast_thread = threading.Thread(target=start_battery_broadcast, daemon=True)
-    battery_broadcast_thread.start()
+    supervisor.add(broker)
+    supervisor.add(controller)
+    wait_for_controller()
 
     # Start the main server to handle control messages
-    start_server()
+    try:
+        start_server()
+    finally:
+        supervisor.stop_all()
+        print(f"Children: {supervisor.summary()}")
@@ -0,0 +1,100 @@
+'''
+axis_lut.py
+
+Precomputed 65536 entry lookup table per gamepad axis.  Range mapping, deadband, expo curve and
+inversion are folded together once at startup, so shaping an evdev value is a single index:
+    lut[value + 32768]
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version, replaces Controller.map_range
+2026/10/18 CEH build() checks a section without touching the table in use
+2026/10/18 CEH shape() clamps values outside the int16 range the tables cover, and counts them
+
+
+####################################################################################
+'''
+import numpy as np
+
+AXIS_MIN = -32768
+AXIS_MAX = 32767
+LUT_OFFSET = -AXIS_MIN   # index = value + LUT_OFFSET
+
+
+def build_lut(deadband=0.0, expo=0.0, invert=False, out_min=-1.0, out_max=1.0):
+    '''Return a float array of 65536 shaped outputs covering the whole int16 evdev range.
+
+    deadband is the fraction of half travel around center that reads as zero, expo blends a
+    linear response (0) with a cubic one (1) for finer control near center.
+    '''
+    if not 0.0 <= deadband < 1.0:
+        raise ValueError(f"deadband must be in [0, 1), got {deadband}")
+    if not 0.0 <= expo <= 1.0:
+        raise ValueError(f"expo must be in [0, 1], got {expo}")
+    x = (np.arange(AXIS_MIN, AXIS_MAX + 1, dtype=np.float64) - AXIS_MIN) / 32767.5 - 1.0
+    if invert:
+        x = -x
+    magnitude = np.clip((np.abs(x) - deadband) / (1.0 - deadband), 0.0, 1.0)
+    magnitude = (1.0 - expo) * magnitude + expo * magnitude ** 3
+    shaped = np.sign(x) * magnitude
+    # -1..1 onto the configured output range
+    lut = (shaped + 1.0) * 0.5 * (out_max - out_min) + out_min
+    return lut.astype(np.float32)
+
+
+class AxisShaper:
+    '''evdev axis code -> (control name, lookup table), built from the "axes" config section.'''
+
+    def __init__(self, axes_config=None):
+        self.axes = {}
+        self.out_of_range = 0
+        if axes_config:
+            self.load(axes_config)
+
+    def load(self, axes_config):
+        # Swap the whole table at once so the hot path never sees a half built map
+        self.axes = self.build(axes_config)
+
+    def shape(self, code, value):
+        '''(control name, shaped output) for an axis event, None for an axis not in the config.
+
+        value comes off the network as an int32, anything past the int16 evdev range would index
+        the wrong end of the table (or past it), so it is clamped to full travel and counted.
+        '''
+        entry = self.axes.get(code)
+        if entry is None:
+            return None
+        if not AXIS_MIN <= value <= AXIS_MAX:
+            self.out_of_range += 1
+            value = AXIS_MIN if value < AXIS_MIN else AXIS_MAX
+        name, lut = entry
+        return name, lut[value + LUT_OFFSET]
+
+    def build(self, axes_config):
+        '''The axes table for a config section, raises without touching the one in use.'''
+        axes = {}
+        for code, cfg in axes_config.items():
+            lut = build_lut(deadband=cfg.get("deadband", 0.0),
+                            expo=cfg.get("expo", 0.0),
+                            invert=cfg.get("invert", False),
+                            out_min=cfg.get("min", -1.0),
+                            out_max=cfg.get("max", 1.0))
+            axes[int(code)] = (cfg["name"], lut)
+        return axes
@@ -0,0 +1,119 @@
+'''
+battery_telemetry.py
+
+Battery voltage telemetry from serial_broker.py (SUB) to activate.py (Control) on UDP port 5650.
+An identical copy lives in CONTROL/act/battery_telemetry.py, keep them in sync.
+
+Every packet is a fixed 24 bytes, little endian:
+    magic (4s) b"CVBT", version (B), flags (B), sequence (H), timestamp in microseconds (Q),
+    latest reading in volts (f), EWMA smoothed volts (f)
+
+Packets go out once per interval from one socket that stays open, and at once when the smoothed
+voltage falls below low_voltage (or recovers above clear_voltage) so the pilot is warned on the
+reading that crossed, not up to a second later.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version, replaces the str(float) text datagrams
+
+
+####################################################################################
+'''
+import socket
+import struct
+from collections import namedtuple
+from ctl_frame import timestamp_us
+
+MAGIC = b"CVBT"
+VERSION = 1
+PACKET = struct.Struct("<4sBBHQff")
+
+FLAG_LOW = 0x01     # smoothed voltage is below the low threshold
+FLAG_EDGE = 0x02    # sent immediately because the low state just changed
+
+BatterySample = namedtuple("BatterySample", "flags seq timestamp volts smoothed")
+
+
+def encode(flags, seq, ts, volts, smoothed):
+    return PACKET.pack(MAGIC, VERSION, flags, seq & 0xFFFF, ts, volts, smoothed)
+
+
+def decode(data):
+    '''BatterySample from one datagram, ValueError if it is not a battery packet.'''
+    if len(data) != PACKET.size or data[:4] != MAGIC:
+        raise ValueError("not a battery telemetry packet")
+    magic, version, flags, seq, ts, volts, smoothed = PACKET.unpack(data)
+    if version != VERSION:
+        raise ValueError(f"battery telemetry version {version}, expected {VERSION}")
+    return BatterySample(flags, seq, ts, volts, smoothed)
+
+
+class BatteryTelemetry:
+    '''Called with every battery reading, smooths it and decides when to send.'''
+
+    def __init__(self, address, interval=1.0, alpha=0.2, low_voltage=13.6, clear_voltage=14.0):
+        self.address = tuple(address)
+        self.interval_us = int(interval * 1e6)
+        self.alpha = alpha
+        self.low_voltage = low_voltage
+        self.clear_voltage = clear_voltage   # above low_voltage so a sagging pack does not flap
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.smoothed = None
+        self.low = False
+        self.seq = 0
+        self.last_sent_us = None
+        self.samples = 0
+        self.sent = 0
+        self.alerts = 0
+        self.errors = 0
+
+    def __call__(self, volts, now_us=None):
+        if now_us is None:
+            now_us = timestamp_us()
+        self.samples += 1
+        if self.smoothed is None:
+            self.smoothed = volts
+        else:
+            self.smoothed += self.alpha * (volts - self.smoothed)
+        flags = 0
+        low = self.smoothed < self.low_voltage or (self.low and self.smoothed < self.clear_voltage)
+        if low != self.low:
+            self.low = low
+            flags |= FLAG_EDGE
+            self.alerts += low
+        if self.low:
+            flags |= FLAG_LOW
+        if flags & FLAG_EDGE or self.last_sent_us is None or now_us - self.last_sent_us >= self.interval_us:
+            self.send(flags, volts, now_us)
+
+    def send(self, flags, volts, now_us):
+        self.seq += 1
+        try:
+            self.sock.sendto(encode(flags, self.seq, now_us, volts, self.smoothed), self.address)
+        except OSError:
+            self.errors += 1   # surface not up yet, the next reading tries again
+            return
+        self.last_sent_us = now_us
+        self.sent += 1
+
+    def summary(self):
+        smoothed = "n/a" if self.smoothed is None else f"{self.smoothed:.2f} V"
+        return (f"{self.samples} readings, {self.sent} packets sent, {self.alerts} low voltage alerts, "
+                f"{self.errors} send errors, smoothed {smoothed}")
@@ -0,0 +1,68 @@
+'''
+ctl_config.py
+
+Loads controller.json, the pilot input configuration for Controller.py, and notices when it has
+been edited so curves and mappings can be reloaded without restarting the Controller.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH ROV_CONFIG environment variable overrides the default path
+2026/10/18 CEH mtime taken before parsing, a broken edit is not retried every check
+
+
+####################################################################################
+'''
+import json
+import os
+import time
+
+# ROV_CONFIG points a bench run at a different file, e.g. the ardu_emulator.py pty and a local replay
+DEFAULT_PATH = os.environ.get("ROV_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "controller.json"))
+
+
+class ConfigWatcher:
+    '''Reads a JSON config file and reports when its modification time changes.'''
+
+    def __init__(self, path=DEFAULT_PATH, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.mtime = None
+        self.last_check = 0.0
+        self.config = {}
+
+    def load(self):
+        # Taken before parsing, so a broken edit is tried once and not again every check_interval
+        self.mtime = os.stat(self.path).st_mtime
+        with open(self.path) as f:
+            self.config = json.load(f)
+        return self.config
+
+    def changed(self, now=None):
+        '''Cheap enough for the control tick, only stats the file every check_interval seconds.'''
+        if now is None:
+            now = time.monotonic()
+        if now - self.last_check < self.check_interval:
+            return False
+        self.last_check = now
+        try:
+            return os.stat(self.path).st_mtime != self.mtime
+        except OSError:
+            return False
@@ -0,0 +1,73 @@
+'''
+ctl_dispatch.py
+
+Button dispatch for Controller.py.  The "buttons" section of controller.json maps evdev key
+codes to action names, it is compiled once into a dict of code -> (name, handler) so handling a
+press is a single lookup, and remapping a button is a config edit.  Every action and unmapped
+press is counted.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH build() checks a section without touching the table in use
+
+
+####################################################################################
+'''
+
+
+class ButtonDispatcher:
+    '''evdev key code -> action handler, built from the "buttons" config section.'''
+
+    def __init__(self, actions, buttons_config=None):
+        self.actions = actions          # action name -> callable taking no arguments
+        self.table = {}
+        self.counts = dict.fromkeys(actions, 0)
+        self.unmapped = 0
+        if buttons_config:
+            self.load(buttons_config)
+
+    def load(self, buttons_config):
+        # Swap the whole table at once so the hot path never sees a half built map
+        self.table = self.build(buttons_config)
+
+    def build(self, buttons_config):
+        '''The dispatch table for a config section, raises without touching the one in use.'''
+        table = {}
+        for code, name in buttons_config.items():
+            if name not in self.actions:
+                raise ValueError(f"button {code} maps to unknown action {name!r}, "
+                                 f"expected one of {', '.join(sorted(self.actions))}")
+            table[int(code)] = (name, self.actions[name])
+        return table
+
+    def dispatch(self, code):
+        entry = self.table.get(code)
+        if entry is None:
+            self.unmapped += 1
+            return False
+        name, handler = entry
+        self.counts[name] += 1
+        handler()
+        return True
+
+    def summary(self):
+        counts = ", ".join(f"{name} {count}" for name, count in self.counts.items())
+        return f"{counts}, unmapped {self.unmapped}"
@@ -23,11 +23,13 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Revision History
 #####################################################################################
 2023/12/05 CEH Initial Version
+2026/10/18 CEH Decode binary control frames
 
 
 ####################################################################################
 '''
 import socket
+import ctl_frame
 
 def main():
     server_address = "192.168.2.2"  # Change this to the IP address of the server
@@ -35,6 +37,7 @@ def main():
 
     client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     client_socket.connect((server_address, server_port))
+    decoder = ctl_frame.FrameDecoder()
 
     try:
         while True:
@@ -42,8 +45,9 @@ def main():
             if not data:
                 break
 
-            # Decode the received data and print it
-            print(data.decode())
+            # Decode the received frames and print them
+            for frame in decoder.feed(data):
+                print(frame)
     finally:
         client_socket.close()
 
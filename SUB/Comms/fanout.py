@@ -0,0 +1,193 @@
+'''
+fanout.py
+
+Non blocking TCP publisher for the sensor servers (imu_send.py, intHealth_send.py,
+extPressure_send.py).  Any number of viewers can connect; every published frame is queued for
+each of them and written as their socket takes it, so a slow or stalled viewer only ever backs
+up its own queue and the sender's cadence never waits on anyone.
+
+Each client's queue holds at most max_frames whole frames.  When it is full the policy decides:
+    drop_oldest   forget the oldest frame not yet started, a viewer sees the freshest data (default)
+    drop_newest   keep the backlog, the new frame is not queued for that client
+    disconnect    close the client, it reconnects when it can keep up
+Frames are only ever dropped whole, so fixed size records stay aligned on every stream.
+
+Per client lag (published to fully written), frames sent and dropped and the deepest the queue
+got are kept, and reported when the client leaves and in summary() (the last DEPARTED of those
+that have left).
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH Summaries of departed clients bounded
+
+
+####################################################################################
+'''
+import selectors
+import socket
+import time
+from collections import deque
+from latency import LatencyHistogram
+
+POLICIES = ("drop_oldest", "drop_newest", "disconnect")
+DEPARTED = 16   # summaries of clients that have left kept for summary()
+
+
+def now_us():
+    return time.monotonic_ns() // 1000
+
+
+class Subscriber:
+    '''One connected viewer, its queue of (frame, published us) and its metrics.'''
+
+    def __init__(self, sock, address):
+        self.socket = sock
+        self.name = f"{address[0]}:{address[1]}"
+        self.queue = deque()
+        self.offset = 0          # bytes of queue[0] already written
+        self.events = selectors.EVENT_READ
+        self.sent = 0
+        self.dropped = 0
+        self.deepest = 0
+        self.lag = LatencyHistogram(self.name)
+
+    def summary(self):
+        lag = "no frames" if self.lag.total == 0 else (
+            f"lag p50 {self.lag.percentile(50) / 1000:.1f} p99 {self.lag.percentile(99) / 1000:.1f} "
+            f"max {self.lag.max / 1000:.1f} ms")
+        return (f"{self.name}: {self.sent} frames sent, {self.dropped} dropped, "
+                f"queue {len(self.queue)} (deepest {self.deepest}), {lag}")
+
+
+class FanoutServer:
+    def __init__(self, address, max_frames=64, policy="drop_oldest", backlog=8, log=print):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown drop policy {policy!r}, use one of {', '.join(POLICIES)}")
+        self.max_frames = max_frames
+        self.policy = policy
+        self.log = log
+        self.selector = selectors.DefaultSelector()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(address)
+        self.server.listen(backlog)
+        self.server.setblocking(False)
+        self.selector.register(self.server, selectors.EVENT_READ, self._accept)
+        self.clients = []
+        self.published = 0
+        self.connections = 0
+        self.departed = deque(maxlen=DEPARTED)   # summaries of the latest clients to leave
+
+    def _accept(self, server):
+        try:
+            sock, address = server.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = Subscriber(sock, address)
+        self.clients.append(client)
+        self.connections += 1
+        self.selector.register(sock, client.events, lambda sock, client=client: self._ready(client))
+        self.log(f"Client {client.name} connected, {len(self.clients)} connected")
+
+    def _ready(self, client):
+        # Readable means the viewer closed (they never send), writable means room to flush
+        try:
+            if client.socket.recv(4096) == b"":
+                self._close(client, "disconnected")
+                return
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            self._close(client, str(e))
+            return
+        self._flush(client)
+
+    def _flush(self, client):
+        while client.queue:
+            frame, published_us = client.queue[0]
+            try:
+                client.offset += client.socket.send(frame[client.offset:])
+            except BlockingIOError:
+                break
+            except OSError as e:
+                self._close(client, str(e))
+                return
+            if client.offset < len(frame):
+                break   # socket buffer full, the rest goes when it is writable again
+            client.queue.popleft()
+            client.offset = 0
+            client.sent += 1
+            client.lag.record(now_us() - published_us)
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.queue else 0)
+        if events != client.events:
+            client.events = events
+            self.selector.modify(client.socket, events, lambda sock, client=client: self._ready(client))
+
+    def _close(self, client, reason):
+        self.selector.unregister(client.socket)
+        client.socket.close()
+        self.clients.remove(client)
+        self.departed.append(client.summary())
+        self.log(f"Client gone ({reason}), {client.summary()}")
+
+    def publish(self, frame):
+        '''Queue frame for every client and write as much as their sockets take, never blocks.'''
+        frame = memoryview(frame)
+        published_us = now_us()
+        self.published += 1
+        for client in list(self.clients):
+            if len(client.queue) >= self.max_frames:
+                if self.policy == "disconnect":
+                    self._close(client, f"too slow, {len(client.queue)} frames behind")
+                    continue
+                client.dropped += 1
+                # The head frame may be part written, then the oldest one not started goes instead
+                oldest = 1 if client.offset else 0
+                if self.policy == "drop_newest" or oldest >= len(client.queue):
+                    continue
+                del client.queue[oldest]
+            client.queue.append((frame, published_us))
+            client.deepest = max(client.deepest, len(client.queue))
+            self._flush(client)
+
+    def wait(self, seconds):
+        '''Service connections and slow clients for seconds, the caller's sample period.'''
+        deadline = time.monotonic() + seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            for key, _ in self.selector.select(remaining):
+                key.data(key.fileobj)
+
+    def summary(self):
+        clients = [client.summary() for client in self.clients] + list(self.departed)
+        return f"{self.published} frames published to {self.connections} clients" + "".join(
+            f"\n  {line}" for line in clients)
+
+    def close(self):
+        for client in list(self.clients):
+            self._close(client, "server closing")
+        self.selector.unregister(self.server)
+        self.server.close()
+        self.selector.close()
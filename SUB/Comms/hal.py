@@ -0,0 +1,552 @@
+'''
+hal.py
+
+Hardware abstraction for the SUB services so they can run off the Pi.  Each factory returns an
+object with the same API the scripts already use:
+
+    gpio()      RPi.GPIO, or SimGPIO recording the light PWM
+    smbus(n)    smbus2.SMBus(n), or SimSMBus with a register level MPU6050 at 0x68
+    i2c_msg()   smbus2.i2c_msg for i2c_rdwr() bursts on that bus, or SimI2cMsg
+    bme680()    adafruit_bme680 on board.I2C(), or SimBME680
+    ms5837()    ms5837.MS5837_30BA(), or SimMS5837
+    ms8607()    adafruit_ms8607 on board.I2C(), the hull leak sensor, or SimMS8607
+
+The backend comes from ROV_HAL (hw or sim), falling back to "hal": {"backend": ...} in
+controller.json and then hw.  Hardware libraries are only imported by the hw backend.  The
+simulated sensors take their noise and timing from the same "hal" section: I2C transactions cost
+their bit time at i2c_hz plus a fixed per call overhead, and conversions block like the parts do.
+
+Every I2C bus comes back wrapped in TimedBus so per sample I/O cost can be profiled on either
+backend.  The serial side is simulated by SUB/Development/ardu_emulator.py on a pty.
+
+    ROV_HAL=sim python3 sensors/sensor_hub.py
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH MPU6050 FIFO and i2c_rdwr() bursts in the simulation
+2026/10/18 CEH MS8607 leak sensor
+
+
+####################################################################################
+'''
+import math
+import os
+import random
+import time
+from collections import deque
+from ctl_config import ConfigWatcher
+
+# Same values as ms5837-python so scripts work against either backend
+UNITS_Pa = 100.0
+UNITS_hPa = 1.0
+UNITS_kPa = 0.1
+UNITS_mbar = 1.0
+UNITS_bar = 0.001
+UNITS_atm = 0.000986923
+UNITS_Torr = 0.750062
+UNITS_psi = 0.014503773773022
+UNITS_Centigrade = 1
+UNITS_Farenheit = 2
+UNITS_Kelvin = 3
+DENSITY_FRESHWATER = 997
+DENSITY_SALTWATER = 1029
+
+DEFAULTS = {
+    "backend": "hw",
+    "i2c_hz": 100000,         # Pi default bus speed
+    "i2c_overhead_us": 60,    # syscall and driver cost per transaction
+    "noise": 1.0,             # scales every simulated noise term, 0 for clean signals
+    "seed": None,
+    "depth_m": 1.5,           # simulated dive, depth oscillates around this
+}
+
+_settings = None
+
+
+def settings():
+    global _settings
+    if _settings is None:
+        _settings = dict(DEFAULTS)
+        try:
+            _settings.update(ConfigWatcher().load().get("hal", {}))
+        except (OSError, ValueError):
+            pass
+        _settings["backend"] = os.environ.get("ROV_HAL", _settings["backend"])
+        if _settings["backend"] not in ("hw", "sim"):
+            raise ValueError(f"unknown HAL backend {_settings['backend']!r}, use hw or sim")
+        random.seed(_settings["seed"])
+    return _settings
+
+
+def simulated():
+    return settings()["backend"] == "sim"
+
+
+class TimedBus:
+    '''Counts transactions and time spent in every call on an SMBus like object.'''
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __getattr__(self, name):
+        attr = getattr(self.bus, name)
+        if not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - start
+                self.calls += 1
+        return timed
+
+    def reset(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+    def summary(self, samples=1):
+        samples = max(samples, 1)
+        return (f"{self.calls} I2C calls, {self.seconds * 1000:.1f} ms; per sample "
+                f"{self.calls / samples:.1f} calls, {self.seconds * 1e6 / samples:.0f} us")
+
+
+# ----------------------------------------------------------------------------- simulation
+
+def _bus_delay(nbytes):
+    # Start, address and stop bits plus 9 clocks per byte, the per call overhead dominates at 400 kHz
+    s = settings()
+    time.sleep((nbytes * 9 + 20) / s["i2c_hz"] + s["i2c_overhead_us"] / 1e6)
+
+
+def _noise(sigma):
+    return random.gauss(0.0, sigma * settings()["noise"])
+
+
+class SimPWM:
+    def __init__(self, pin, frequency):
+        self.pin = pin
+        self.frequency = frequency
+        self.duty = 0.0
+        self.running = False
+        self.changes = 0
+
+    def start(self, duty):
+        self.running = True
+        self.ChangeDutyCycle(duty)
+
+    def ChangeDutyCycle(self, duty):
+        if not 0.0 <= duty <= 100.0:
+            raise ValueError("dutycycle must have a value from 0.0 to 100.0")
+        self.duty = duty
+        self.changes += 1
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        self.running = False
+
+
+class SimGPIO:
+    '''The part of the RPi.GPIO module Controller.py uses.'''
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+
+    def __init__(self):
+        self.mode = None
+        self.pins = {}
+        self.pwms = []
+
+    def setwarnings(self, flag):
+        pass
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setup(self, pin, direction):
+        if self.mode is None:
+            raise RuntimeError("Please set pin numbering mode using GPIO.setmode(GPIO.BOARD) or GPIO.setmode(GPIO.BCM)")
+        self.pins[pin] = direction
+
+    def PWM(self, pin, frequency):
+        if self.pins.get(pin) != self.OUT:
+            raise RuntimeError("You must setup() the GPIO channel as an output first")
+        pwm = SimPWM(pin, frequency)
+        self.pwms.append(pwm)
+        return pwm
+
+    def cleanup(self):
+        self.pins.clear()
+
+
+class SimMPU6050:
+    '''Register map of an MPU6050 at rest in a gently rolling hull, samples at the configured rate.
+
+    Every sample also goes into the 1024 byte FIFO when USER_CTRL and FIFO_EN say so, in the
+    part's order (accel, temperature, gyro x, y, z).  A full FIFO drops its oldest bytes and sets
+    FIFO_OFLOW in INT_STATUS, which leaves the byte stream out of step just like the real part.
+    '''
+    WHO_AM_I = 0x75
+    PWR_MGMT_1 = 0x6B
+    SMPLRT_DIV = 0x19
+    CONFIG = 0x1A
+    GYRO_CONFIG = 0x1B
+    ACCEL_CONFIG = 0x1C
+    FIFO_EN = 0x23
+    INT_STATUS = 0x3A
+    DATA_START = 0x3B
+    DATA_END = 0x49
+    USER_CTRL = 0x6A
+    FIFO_COUNTH = 0x72
+    FIFO_R_W = 0x74
+    FIFO_SIZE = 1024
+    FIFO_OFLOW = 0x10
+
+    def __init__(self):
+        self.regs = bytearray(128)
+        self.regs[self.WHO_AM_I] = 0x68
+        self.regs[self.PWR_MGMT_1] = 0x40    # reset state is asleep
+        self.start = time.monotonic()
+        self.sample_index = None
+        self.samples = 0
+        self.fifo = deque(maxlen=self.FIFO_SIZE)
+
+    def sample_rate(self):
+        base = 8000.0 if self.regs[self.CONFIG] & 0x07 in (0, 7) else 1000.0
+        return base / (1 + self.regs[self.SMPLRT_DIV])
+
+    def _sample(self, index):
+        t = index / self.sample_rate()
+        roll = math.radians(5.0) * math.sin(2 * math.pi * 0.2 * t)
+        roll_rate = math.degrees(math.radians(5.0) * 2 * math.pi * 0.2 * math.cos(2 * math.pi * 0.2 * t))
+        accel_lsb = 16384.0 / (1 << ((self.regs[self.ACCEL_CONFIG] >> 3) & 3))
+        gyro_lsb = 131.0 / (1 << ((self.regs[self.GYRO_CONFIG] >> 3) & 3))
+        accel = (math.sin(roll) + _noise(0.004), _noise(0.004), math.cos(roll) + _noise(0.004))
+        gyro = (roll_rate + _noise(0.05), _noise(0.05), _noise(0.05))
+        temp_c = 28.0 + _noise(0.05)
+        values = [a * accel_lsb for a in accel] + [(temp_c - 36.53) * 340] + [g * gyro_lsb for g in gyro]
+        data = bytearray()
+        for value in values:
+            raw = max(-32768, min(32767, int(round(value)))) & 0xFFFF
+            data += bytes((raw >> 8, raw & 0xFF))
+        return data
+
+    def _push_fifo(self, data):
+        enabled = self.regs[self.FIFO_EN]
+        # Byte ranges of the sample block for ACCEL_FIFO_EN, TEMP_FIFO_EN, XG, YG and ZG
+        for bit, start, end in ((0x08, 0, 6), (0x80, 6, 8), (0x40, 8, 10), (0x20, 10, 12), (0x10, 12, 14)):
+            if enabled & bit:
+                if len(self.fifo) + end - start > self.FIFO_SIZE:
+                    self.regs[self.INT_STATUS] |= self.FIFO_OFLOW
+                self.fifo.extend(data[start:end])
+
+    def _update(self):
+        if self.regs[self.PWR_MGMT_1] & 0x40:
+            return   # asleep, data registers hold their last value
+        index = int((time.monotonic() - self.start) * self.sample_rate())
+        if index == self.sample_index:
+            return
+        first = index if self.sample_index is None else self.sample_index + 1
+        # Long gaps only need enough samples to fill the FIFO, the rest would be dropped anyway
+        first = max(first, index - self.FIFO_SIZE // 6)
+        self.sample_index = index
+        fifo_on = self.regs[self.USER_CTRL] & 0x40
+        for i in range(first, index + 1):
+            data = self._sample(i)
+            self.samples += 1
+            if fifo_on:
+                self._push_fifo(data)
+        self.regs[self.DATA_START:self.DATA_END] = data
+
+    def read(self, register, length):
+        self._update()
+        if register == self.FIFO_R_W:
+            # Reads past the end of the FIFO return the last byte again, count them as garbage
+            return [self.fifo.popleft() if self.fifo else 0xFF for _ in range(length)]
+        count = len(self.fifo)
+        self.regs[self.FIFO_COUNTH] = count >> 8
+        self.regs[self.FIFO_COUNTH + 1] = count & 0xFF
+        data = list(self.regs[register:register + length])
+        if register <= self.INT_STATUS < register + length:
+            self.regs[self.INT_STATUS] = 0   # cleared on read
+        return data
+
+    def write(self, register, value):
+        if register == self.PWR_MGMT_1 and value & 0x80:
+            self.__init__()
+            return
+        if register == self.USER_CTRL and value & 0x04:
+            self.fifo.clear()   # FIFO_RESET, self clearing
+            value &= ~0x04
+        self.regs[register] = value & 0xFF
+        if register in (self.SMPLRT_DIV, self.CONFIG):
+            # New sample rate, count samples from now so indices stay in step with it
+            self.start = time.monotonic()
+            self.sample_index = None
+
+
+class SimI2cMsg:
+    '''smbus2.i2c_msg for SimSMBus.i2c_rdwr(), read messages fill buf and convert with bytes().'''
+
+    def __init__(self, address, flags, buf):
+        self.addr = address
+        self.flags = flags
+        self.buf = buf
+
+    @classmethod
+    def read(cls, address, length):
+        return cls(address, 1, bytearray(length))
+
+    @classmethod
+    def write(cls, address, buf):
+        return cls(address, 0, bytearray(buf))
+
+    def __bytes__(self):
+        return bytes(self.buf)
+
+    def __iter__(self):
+        return iter(self.buf)
+
+    def __len__(self):
+        return len(self.buf)
+
+
+class SimSMBus:
+    '''smbus2.SMBus calls against simulated devices, each call costs its bus time.'''
+
+    def __init__(self, bus=1):
+        self.bus = bus
+        self.devices = {0x68: SimMPU6050()}
+
+    def _device(self, address):
+        try:
+            return self.devices[address]
+        except KeyError:
+            raise OSError(121, "Remote I/O error") from None   # what smbus2 raises on a NACK
+
+    def read_byte_data(self, address, register):
+        _bus_delay(4)
+        return self._device(address).read(register, 1)[0]
+
+    def read_word_data(self, address, register):
+        _bus_delay(5)
+        low, high = self._device(address).read(register, 2)
+        return low | high << 8
+
+    def read_i2c_block_data(self, address, register, length):
+        _bus_delay(3 + length)
+        return self._device(address).read(register, length)
+
+    def write_byte_data(self, address, register, value):
+        _bus_delay(3)
+        self._device(address).write(register, value)
+
+    def i2c_rdwr(self, *messages):
+        # One combined transaction, a register pointer write then reads from there on
+        _bus_delay(sum(len(m) + 1 for m in messages))
+        register = None
+        for message in messages:
+            device = self._device(message.addr)
+            if message.flags:
+                message.buf[:] = bytes(device.read(register, len(message)))
+            else:
+                register = message.buf[0]
+                for offset, value in enumerate(message.buf[1:]):
+                    device.write(register + offset, value)
+
+    def close(self):
+        pass
+
+
+class SimBME680:
+    '''adafruit_bme680 properties for the sealed electronics bottle, a forced mode reading blocks.'''
+    CONVERSION_S = 0.05
+    MIN_REFRESH_S = 0.1
+
+    def __init__(self):
+        self.sea_level_pressure = 1013.25
+        self.start = time.monotonic()
+        self.last_reading = 0.0
+        self.readings = 0
+        self._perform_reading()
+
+    def _perform_reading(self):
+        if time.monotonic() - self.last_reading < self.MIN_REFRESH_S:
+            return
+        _bus_delay(8 + 15)
+        time.sleep(self.CONVERSION_S)
+        self.last_reading = time.monotonic()
+        self.readings += 1
+        warm = 8.0 * (1 - math.exp(-(self.last_reading - self.start) / 600.0))  # electronics heating up
+        self._temperature = 30.0 + warm + _noise(0.02)
+        self._pressure = 1012.0 + warm * 3.4 + _noise(0.05)   # sealed volume, pressure follows temperature
+        self._humidity = 38.0 - warm + _noise(0.1)
+
+    @property
+    def temperature(self):
+        self._perform_reading()
+        return self._temperature
+
+    @property
+    def pressure(self):
+        self._perform_reading()
+        return self._pressure
+
+    @property
+    def relative_humidity(self):
+        self._perform_reading()
+        return self._humidity
+
+    @property
+    def altitude(self):
+        return 44330 * (1.0 - math.pow(self.pressure / self.sea_level_pressure, 0.1903))
+
+
+class SimMS5837:
+    '''ms5837-python MS5837_30BA on a slow dive, read() blocks for both conversions.'''
+    CONVERSION_S = 0.0205     # OSR 8192, D1 and D2 each
+
+    def __init__(self):
+        self.fluid_density = DENSITY_FRESHWATER
+        self.start = time.monotonic()
+        self._pressure = 1013.25
+        self._temperature = 1500
+        self.initialized = False
+
+    def init(self):
+        _bus_delay(1 + 7 * 3)   # reset and PROM read
+        self.initialized = True
+        return True
+
+    def read(self, oversampling=5):
+        if not self.initialized:
+            return False
+        for _ in range(2):
+            _bus_delay(1)
+            time.sleep(self.CONVERSION_S)
+            _bus_delay(4)
+        t = time.monotonic() - self.start
+        depth = max(0.0, settings()["depth_m"] * (1 + 0.2 * math.sin(2 * math.pi * t / 60.0)) + _noise(0.002))
+        self._pressure = 1013.25 + depth * DENSITY_FRESHWATER * 9.80665 / 100.0
+        self._temperature = int((14.0 + _noise(0.01)) * 100)
+        return True
+
+    def setFluidDensity(self, density):
+        self.fluid_density = density
+
+    def pressure(self, conversion=UNITS_mbar):
+        return self._pressure * conversion
+
+    def temperature(self, conversion=UNITS_Centigrade):
+        degC = self._temperature / 100.0
+        if conversion == UNITS_Farenheit:
+            return degC * 9 / 5 + 32
+        if conversion == UNITS_Kelvin:
+            return degC + 273
+        return degC
+
+    def depth(self):
+        return (self.pressure(UNITS_Pa) - 101300) / (self.fluid_density * 9.80665)
+
+    def altitude(self):
+        return (1 - pow((self.pressure() / 1013.25), .190284)) * 145366.45 * .3048
+
+
+class SimMS8607:
+    '''adafruit_ms8607 properties for the leak sensor in the dry hull, each property converts.'''
+    CONVERSION_S = 0.0172     # OSR 8192 pressure or temperature, humidity takes about as long
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.readings = 0
+
+    def _convert(self):
+        _bus_delay(1)
+        time.sleep(self.CONVERSION_S)
+        _bus_delay(4)
+        self.readings += 1
+        return 6.0 * (1 - math.exp(-(time.monotonic() - self.start) / 600.0))   # hull warming up
+
+    @property
+    def pressure(self):
+        warm = self._convert()
+        self._convert()   # the pressure calculation needs a temperature conversion too
+        return 1012.0 + warm * 3.4 + _noise(0.05)
+
+    @property
+    def temperature(self):
+        return 29.0 + self._convert() + _noise(0.02)
+
+    @property
+    def relative_humidity(self):
+        return 36.0 - self._convert() + _noise(0.1)
+
+
+# ----------------------------------------------------------------------------- factories
+
+def gpio():
+    if simulated():
+        return SimGPIO()
+    import RPi.GPIO as GPIO
+    return GPIO
+
+
+def smbus(bus=1):
+    if simulated():
+        return TimedBus(SimSMBus(bus))
+    import smbus2
+    return TimedBus(smbus2.SMBus(bus))
+
+
+def i2c_msg():
+    if simulated():
+        return SimI2cMsg
+    import smbus2
+    return smbus2.i2c_msg
+
+
+def bme680():
+    if simulated():
+        return SimBME680()
+    import board
+    import adafruit_bme680
+    return adafruit_bme680.Adafruit_BME680_I2C(board.I2C(), debug=False)
+
+
+def ms5837():
+    if simulated():
+        return SimMS5837()
+    import ms5837 as driver
+    return driver.MS5837_30BA()   # default I2C bus is 1 (Raspberry Pi 4)
+
+
+def ms8607():
+    if simulated():
+        return SimMS8607()
+    import board
+    from adafruit_ms8607 import MS8607
+    return MS8607(board.I2C())
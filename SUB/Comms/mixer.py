@@ -0,0 +1,81 @@
+'''
+mixer.py
+
+Thruster allocation for the 4 thruster CVHS ROV.  The pilot demand vector (fwdbk, rotate, updwn,
+roll), each -1..1, is turned into pwm1..pwm4 duty cycles with one matrix-vector product per tick.
+
+Channel layout (ArduThruster.ino): pwm1 = D3, pwm2 = D5, pwm3 = D6, pwm4 = D9.  The CW/CCW
+reversal of pwm2 and pwm4 is done by the Arduino's map() so the matrix here works in
+"positive = thrust in the commanded direction" units.  The default matrix reproduces what
+Controller.py has always done: pwm1/pwm4 drive fwdbk and rotate, pwm2/pwm3 drive updwn and roll,
+with rotate and roll at half gain.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version, replaces the per axis if/else in Controller.apply_control
+
+
+####################################################################################
+'''
+import numpy as np
+
+AXES = ("fwdbk", "rotate", "updwn", "roll")
+
+#                     fwdbk rotate updwn roll
+DEFAULT_MIX = [[1.0, -0.5, 0.0,  0.0],   # pwm1
+               [0.0,  0.0, 1.0,  0.5],   # pwm2
+               [0.0,  0.0, 1.0, -0.5],   # pwm3
+               [1.0,  0.5, 0.0,  0.0]]   # pwm4
+
+
+class ThrusterMixer:
+    '''Mixing matrix with saturation aware normalization.
+
+    When any channel would go past full scale the whole output vector is scaled down together,
+    so combined commands keep their direction instead of clipping one thruster.
+    '''
+
+    def __init__(self, matrix=DEFAULT_MIX, neutral=50.0, span=50.0):
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        if self.matrix.shape != (4, len(AXES)):
+            raise ValueError(f"mixing matrix must be 4x{len(AXES)}, got {self.matrix.shape}")
+        self.neutral = neutral
+        self.span = span
+        self.index = {name: i for i, name in enumerate(AXES)}
+        self.demand = np.zeros(len(AXES))
+        self.output = np.zeros(4)
+        self.saturated = 0
+
+    def set_axis(self, name, value):
+        self.demand[self.index[name]] = value
+
+    def reset(self):
+        self.demand[:] = 0.0
+
+    def mix(self, demand=None):
+        '''Return the pwm1..pwm4 duty cycles (0-100) for the demand vector.'''
+        if demand is None:
+            demand = self.demand
+        out = np.dot(self.matrix, demand, out=self.output)
+        peak = np.abs(out).max()
+        if peak > 1.0:
+            out /= peak
+            self.saturated += 1
+        return out * self.span + self.neutral
@@ -0,0 +1,115 @@
+'''
+ring_log.py
+
+Non-blocking log for the Controller hot path.  log() only appends a record to an in-memory ring
+buffer, a background thread formats the records and writes them out, so the control loop never
+waits on the SD card that Controller_enable.py points stdout at.
+
+Each message key can be rate limited: repeats inside the interval are only counted, and the next
+line written for that key says how many were suppressed.  When the ring is full the oldest record
+is dropped and counted rather than blocking.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+
+
+####################################################################################
+'''
+import sys
+import threading
+import time
+from collections import deque
+
+
+class RingLog:
+    def __init__(self, stream=None, capacity=4096, flush_interval=0.2, rate_limits=None):
+        self.stream = stream
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.rate_limits = dict(rate_limits or {})
+        self.records = deque(maxlen=capacity)
+        self.last_emit = {}
+        self.counts = {}
+        self.suppressed = {}
+        self.suppressed_total = {}
+        self.dropped = 0
+        self.written = 0
+        self.wake = threading.Event()
+        self.closed = False
+        self.writer = threading.Thread(target=self._run, name="ring_log", daemon=True)
+        self.writer.start()
+
+    def log(self, key, msg, *args):
+        '''Queue msg % args under key, formatting happens on the writer thread.'''
+        self.counts[key] = self.counts.get(key, 0) + 1
+        interval = self.rate_limits.get(key)
+        now = time.time()
+        if interval:
+            if now - self.last_emit.get(key, 0.0) < interval:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                self.suppressed_total[key] = self.suppressed_total.get(key, 0) + 1
+                return
+            self.last_emit[key] = now
+        if len(self.records) == self.capacity:
+            self.dropped += 1
+        self.records.append((now, key, msg, args, self.suppressed.pop(key, 0)))
+
+    def _format(self, record):
+        stamp, key, msg, args, suppressed = record
+        try:
+            text = msg % args if args else msg
+        except (TypeError, ValueError) as e:
+            text = f"{msg!r} {args!r} (bad log format: {e})"
+        clock = time.strftime("%H:%M:%S", time.localtime(stamp))
+        line = f"{clock}.{int(stamp % 1 * 1000):03d} {key}: {text}"
+        if suppressed:
+            line += f" (+{suppressed} suppressed)"
+        return line + "\n"
+
+    def drain(self):
+        stream = self.stream or sys.stdout
+        lines = []
+        while self.records:
+            lines.append(self._format(self.records.popleft()))
+        if lines:
+            stream.write("".join(lines))
+            stream.flush()
+            self.written += len(lines)
+
+    def _run(self):
+        while not self.closed:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self.drain()
+            except (OSError, ValueError):
+                pass
+
+    def stats(self):
+        parts = [f"{key} {count}" + (f" ({self.suppressed_total[key]} suppressed)" if self.suppressed_total.get(key) else "")
+                 for key, count in sorted(self.counts.items())]
+        return f"written {self.written}, ring drops {self.dropped}; " + ", ".join(parts)
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        self.writer.join()
+        self.drain()
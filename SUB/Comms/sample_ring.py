@@ -0,0 +1,165 @@
+'''
+sample_ring.py
+
+Single writer, many reader ring buffers of fixed size NumPy records in System V shared memory,
+how sensor_hub.py hands timestamped samples to local consumers.  Readers map the same segment
+and gather only the records they have not seen straight out of it, with no socket, copy through
+the kernel or serialization in between, and no lock the writer could ever wait on.
+
+    header   magic (4s) b"CVSR", version (H), spare (H), slot size (I), capacity (I), head (Q)
+    slots    capacity x (seq (u8) + record), record index i lives in slot i % capacity
+
+The writer marks a slot's seq odd (2i + 1) while it fills it, even (2i + 2) once record i is
+complete, and only then advances head.  A reader copies the slots between its cursor and head
+and keeps those whose seq read 2i + 2 both before and after the copy, anything else was being
+overwritten by a writer that lapped it and is counted as lost.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH contiguous() for senders that number packets by seq
+
+
+####################################################################################
+'''
+import struct
+import numpy as np
+import sysv_ipc
+
+MAGIC = b"CVSR"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIQ")
+HEADER_SIZE = 64          # slots start on a cache line
+HEAD_OFFSET = 16          # head counter inside the header
+
+
+def slot_dtype(record):
+    '''Slot layout for a record dtype, the seq stamp followed by the record's fields.'''
+    return np.dtype([("seq", "<u8")] + np.dtype(record).descr)
+
+
+def contiguous(records):
+    '''Split read() output into runs without gaps in seq, lost records end a run.'''
+    if len(records) == 0:
+        return []
+    return np.split(records, np.flatnonzero(np.diff(records["seq"]) != 1) + 1)
+
+
+class _Ring:
+    def _map(self, capacity):
+        self.capacity = capacity
+        self.slots = np.frombuffer(self.memory, self.slot, capacity, HEADER_SIZE)
+        self.head = np.frombuffer(self.memory, "<u8", 1, HEAD_OFFSET)
+
+    def _header(self):
+        return HEADER.unpack(self.memory.read(HEADER.size))
+
+
+class RingWriter(_Ring):
+    '''Owner side, creates the segment (or takes over the one a previous writer left) and appends.'''
+
+    def __init__(self, key, record, capacity):
+        self.slot = slot_dtype(record)
+        size = HEADER_SIZE + capacity * self.slot.itemsize
+        try:
+            self.memory = sysv_ipc.SharedMemory(key, sysv_ipc.IPC_CREAT, mode=0o644, size=size)
+        except ValueError:
+            # An older segment too small for this layout, readers need to reattach to the new one
+            sysv_ipc.SharedMemory(key).remove()
+            self.memory = sysv_ipc.SharedMemory(key, sysv_ipc.IPC_CREAT, mode=0o644, size=size)
+        magic, version, _, slot_size, old_capacity, head = self._header()
+        self._map(capacity)
+        if (magic, version, slot_size, old_capacity) != (MAGIC, VERSION, self.slot.itemsize, capacity):
+            self.slots["seq"] = 0
+            head = 0
+        # Same layout as the writer before a restart, carry on from its head so readers do not rewind
+        self.memory.write(HEADER.pack(MAGIC, VERSION, 0, self.slot.itemsize, capacity, head))
+        self.written = 0
+
+    def write(self, records):
+        '''Append a record array (fields as the record dtype), oldest first.'''
+        n = len(records)
+        if n == 0:
+            return
+        head = int(self.head[0])
+        if n > self.capacity:
+            head += n - self.capacity   # only the newest capacity records can be kept
+            records = records[n - self.capacity:]
+            n = self.capacity
+        index = np.arange(head, head + n, dtype=np.uint64)
+        where = index % self.capacity
+        self.slots["seq"][where] = 2 * index + 1
+        for name in records.dtype.names:
+            self.slots[name][where] = records[name]
+        self.slots["seq"][where] = 2 * index + 2
+        self.head[0] = head + n
+        self.written += n
+
+
+class RingReader(_Ring):
+    '''Consumer side, raises sysv_ipc.ExistentialError until the writer has created the ring.
+
+    read() returns the records written since the last call, as a copy with "seq" replaced by each
+    record's index in the stream, so gaps show up as jumps in seq.
+    '''
+
+    def __init__(self, key, record, backlog=0):
+        self.slot = slot_dtype(record)
+        self.memory = sysv_ipc.SharedMemory(key)
+        magic, version, _, slot_size, capacity, head = self._header()
+        if magic != MAGIC or version != VERSION or slot_size != self.slot.itemsize:
+            raise ValueError(f"shared memory {key:#x} is not a ring of {self.slot.itemsize} byte slots")
+        self._map(capacity)
+        self.cursor = max(0, head - backlog)   # backlog older records on the first read
+        self.lost = 0
+
+    def read(self, max_records=None):
+        head = int(self.head[0])
+        if head < self.cursor:
+            self.cursor = head   # writer started over with a fresh ring
+        if head - self.cursor > self.capacity:
+            self.lost += head - self.cursor - self.capacity
+            self.cursor = head - self.capacity
+        if max_records is not None:
+            head = min(head, self.cursor + max_records)
+        index = np.arange(self.cursor, head, dtype=np.uint64)
+        where = index % self.capacity
+        records = self.slots[where]   # fancy index, one gather into a private copy
+        done = 2 * index + 2
+        valid = (records["seq"] == done) & (self.slots["seq"][where] == done)
+        self.cursor = head
+        if not valid.all():
+            self.lost += int(len(valid) - valid.sum())
+            records = records[valid]
+            index = index[valid]
+        records["seq"] = index
+        return records
+
+    def latest(self):
+        '''The newest complete record, or None.'''
+        head = int(self.head[0])
+        if head == 0:
+            return None
+        where = (head - 1) % self.capacity
+        record = self.slots[where].copy()
+        if record["seq"] != 2 * head or self.slots["seq"][where] != 2 * head:
+            return None   # being overwritten right now, the caller asks again next time
+        record["seq"] = head - 1
+        return record
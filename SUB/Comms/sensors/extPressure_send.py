@@ -0,0 +1,93 @@
+'''
+extPressure_send.py
+
+Intakes MS5837 output and streams to control over port 5620
+
+Readings come from sensor_hub.py's depth ring, the hub owns the MS5837 and the I2C bus.
+Every reading goes to every connected viewer through fanout.py, as telemetry.py packets with
+the reading's time and sequence number.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2023/01/04 CEH Initial Version
+2026/10/18 CEH Sensor through hal.py and initialized in main(), nothing touches I2C on import
+2026/10/18 CEH Reads the sensor_hub.py depth ring instead of the MS5837
+2026/10/18 CEH Multiple clients through fanout.py, a slow or dropped viewer no longer stalls or kills the server
+2026/10/18 CEH telemetry.py packets replace the bare 'fffff' struct
+2026/10/18 CEH Runs from Comms/sensors beside sensor_hub.py, like intHealth_send.py and imu_send.py
+
+
+####################################################################################
+'''
+#!/usr/bin/python
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import hal  # unit conversions
+import sample_ring
+import sensor_hub  # owns the MS5837, run it first (ROV_HAL=sim for the simulated one)
+import telemetry
+from ctl_config import ConfigWatcher
+from fanout import FanoutServer
+
+def wait_for_depth(depth):
+    # The hub reads the MS5837 at fluid density 1000 kg/m^3
+    while True:
+        sample = depth.latest()
+        if sample is not None:
+            print(("Depth: %.3f m (freshwater)  %.3f m (saltwater)") %
+                  (sample["depth"] * 1000 / hal.DENSITY_FRESHWATER, sample["depth"] * 1000 / hal.DENSITY_SALTWATER))
+            return
+        time.sleep(0.25)
+
+# Spew readings
+def main():
+    config = ConfigWatcher().load()
+    depth = sensor_hub.open_reader("depth", config)
+    wait_for_depth(depth)
+    # Open TCP server on SUB, queue depth and drop policy per viewer from "fanout" in controller.json
+    server = FanoutServer(("192.168.2.3", 5620), **config.get("fanout", {}))  # Change the port as needed
+    print("Reading External Depth/ Pressure and Temperature sending on port 5620")
+
+    try:
+        while True:
+            # Serve viewers until the hub has had time for a new reading, then send what is new
+            server.wait(0.25)
+            for run in sample_ring.contiguous(depth.read()):
+                D_m = run["depth"]
+                P_mbar = run["pressure"]  # mbar
+                P_psi = P_mbar * hal.UNITS_psi
+                TC = run["temperature"]  # degrees C
+                TF = TC * 9 / 5 + 32
+
+                extP_data = telemetry.pack(telemetry.STREAM_DEPTH, t_us=run["t_us"], depth=D_m, pressure_mbar=P_mbar,
+                                           pressure_psi=P_psi, temperature_c=TC, temperature_f=TF)
+                server.publish(telemetry.encode(telemetry.STREAM_DEPTH, int(run["seq"][0]), extP_data))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        server.close()
+        print(f"Depth: {server.summary()}")
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,12 @@ imu_send.py
 
 Intakes imu output and streams to control over port 5610
 
+Samples come from sensor_hub.py's imu ring (the MPU6050 FIFO at the hub's "rate", 100-1000 Hz),
+this script never touches I2C.  Every --batch samples go out as one telemetry.py packet of
+timestamped samples, numbered so the surface sees any it lost.  --legacy keeps the old 1 Hz
+24 byte 'ffffff' stream, no header.  Any number of
+viewers can connect, fanout.py queues frames for each so a slow one never holds up the rest.
+
 Copyright (c) 2023
 Created by Christopher Holm
 holmch@oregonstate.edu
@@ -23,111 +29,93 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Revision History
 #####################################################################################
 2023/01/04 CEH Initial Version
+2026/10/18 CEH I2C through hal.py and MPU_Init() in main(), nothing touches the bus on import
+2026/10/18 CEH One 14 byte block read per sample (mpu6050.py), gyro scaled for the +/- 2000 deg/s range it sets
+2026/10/18 CEH FIFO sampling at 100-1000 Hz sent as batched imu_batch.py frames, --legacy for the 1 Hz stream
+2026/10/18 CEH Reads the sensor_hub.py ring instead of the bus, the FIFO and its sample clock moved there
+2026/10/18 CEH Multiple clients through fanout.py, a slow or dropped viewer no longer stalls or kills the server
+2026/10/18 CEH telemetry.py packets (header with stream id, sequence and sent time) replace imu_batch.py frames
 
 
 ####################################################################################
 '''
 #!/usr/bin/python
-import socket
-import smbus2 as smbus			#import SMBus module of I2C
+import argparse
+import os
 import struct
-import time
-
-#some MPU6050 Registers and their Address
-PWR_MGMT_1   = 0x6B
-SMPLRT_DIV   = 0x19
-CONFIG       = 0x1A
-GYRO_CONFIG  = 0x1B
-INT_ENABLE   = 0x38
-ACCEL_XOUT_H = 0x3B
-ACCEL_YOUT_H = 0x3D
-ACCEL_ZOUT_H = 0x3F
-GYRO_XOUT_H  = 0x43
-GYRO_YOUT_H  = 0x45
-GYRO_ZOUT_H  = 0x47
-
-
-def MPU_Init():
-	#write to sample rate register
-	bus.write_byte_data(Device_Address, SMPLRT_DIV, 7)
-
-	#Write to power management register
-	bus.write_byte_data(Device_Address, PWR_MGMT_1, 1)
-
-	#Write to Configuration register
-	bus.write_byte_data(Device_Address, CONFIG, 0)
-
-	#Write to Gyro configuration register
-	bus.write_byte_data(Device_Address, GYRO_CONFIG, 24)
-
-	#Write to interrupt enable register
-	bus.write_byte_data(Device_Address, INT_ENABLE, 1)
-
-def read_raw_data(addr):
-	#Accelero and Gyro value are 16-bit
-        high = bus.read_byte_data(Device_Address, addr)
-        low = bus.read_byte_data(Device_Address, addr+1)
-
-        #concatenate higher and lower value
-        value = ((high << 8) | low)
-
-        #to get signed value from mpu6050
-        if(value > 32768):
-                value = value - 65536
-        return value
-
-
-bus = smbus.SMBus(1) 	# or bus = smbus.SMBus(0) for older version boards
-Device_Address = 0x68   # MPU6050 device address
-
-MPU_Init()
-
-print (" Reading Data of Gyroscope and Accelerometer")
-
-time.sleep(1)
+import sys
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import sample_ring
+import sensor_hub		#owns the MPU6050, run it first (ROV_HAL=sim for the simulated one)
+from ctl_config import ConfigWatcher
+import telemetry
+from fanout import FanoutServer
+
+
+def send_legacy(reader, server):
+	while True:
+		#Gyroscope and Accelerometer in deg/s and g, the newest sample the hub has
+		sample = reader.latest()
+		if sample is not None:
+			Gx, Gy, Gz = sample["gyro"]
+			Ax, Ay, Az = sample["accel"]
+
+			#message = "Gx=%.2f %s Gy=%.2f %s Gz=%.2f %s Ax=%.2f g\t Ay=%.2f g\t Az=%.2f g\n" % (Gx, u'\u00b0' + "/s ", Gy, u'\u00b0' + "/s ", Gz, u'\u00b0' + "/s ", Ax, Ay, Az)
+
+			server.publish(struct.pack('ffffff', Gx, Gy, Gz, Ax, Ay, Az))
+		server.wait(1)
+
+def publish(server, records):
+	server.publish(telemetry.encode(telemetry.STREAM_IMU, int(records["seq"][0]), telemetry.pack(
+		telemetry.STREAM_IMU, t_us=records["t_us"], gyro=records["gyro"], accel=records["accel"])))
+
+def send_batches(reader, server, batch, rate):
+	pending = reader.read()[:0]
+	while True:
+		# Serve viewers for about one batch, then take everything the hub published since
+		server.wait(batch / rate)
+		for run in sample_ring.contiguous(reader.read()):
+			if len(pending) and run["seq"][0] != pending["seq"][-1] + 1:
+				publish(server, pending)	# samples lost in the ring, a packet never spans the gap
+				pending = pending[:0]
+			pending = np.concatenate((pending, run))
+			while len(pending) >= batch:
+				publish(server, pending[:batch])
+				pending = pending[batch:]
 
 def main():
-	server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-	server_socket.bind(("192.168.2.3",5610))  # Change the port as needed
-	server_socket.listen()
+	parser = argparse.ArgumentParser(description="Stream MPU6050 data to control on port 5610")
+	parser.add_argument("--batch", type=int, default=20, help="samples per network frame")
+	parser.add_argument("--legacy", action="store_true", help="1 Hz 24 byte 'ffffff' stream for old clients")
+	args = parser.parse_args()
 
-	print("TCP server sending imu on port 5610")
-	try:
-		while True:
-			client_socket, _ = server_socket.accept()
-			while True:
-				#Read Accelerometer raw value
-				acc_x = read_raw_data(ACCEL_XOUT_H)
-				acc_y = read_raw_data(ACCEL_YOUT_H)
-				acc_z = read_raw_data(ACCEL_ZOUT_H)
+	config = ConfigWatcher().load()
+	rate = sensor_hub.settings(config)["imu"]["rate"]
+	reader = sensor_hub.open_reader("imu", config)
 
-				#Read Gyroscope raw value
-				gyro_x = read_raw_data(GYRO_XOUT_H)
-				gyro_y = read_raw_data(GYRO_YOUT_H)
-				gyro_z = read_raw_data(GYRO_ZOUT_H)
+	print (" Reading Data of Gyroscope and Accelerometer")
 
-				#Full scale range +/- 250 degree/C as per sensitivity scale factor
-				Ax = acc_x/16384.0
-				Ay = acc_y/16384.0
-				Az = acc_z/16384.0
+	# Queue depth and drop policy per viewer from "fanout" in controller.json
+	server = FanoutServer(("192.168.2.3", 5610), **config.get("fanout", {}))  # Change the port as needed
 
-				Gx = gyro_x/131.0
-				Gy = gyro_y/131.0
-				Gz = gyro_z/131.0
-
-				#message = "Gx=%.2f %s Gy=%.2f %s Gz=%.2f %s Ax=%.2f g\t Ay=%.2f g\t Az=%.2f g\n" % (Gx, u'\u00b0' + "/s ", Gy, u'\u00b0' + "/s ", Gz, u'\u00b0' + "/s ", Ax, Ay, Az)
-
-				data = struct.pack('ffffff', Gx, Gy, Gz, Ax, Ay, Az)
-
-				client_socket.sendall(data)
-				time.sleep(1)
-
-		client_socket.close()
+	if args.legacy:
+		print("TCP server sending imu on port 5610, 1 Hz legacy frames")
+	else:
+		print(f"TCP server sending imu on port 5610, {rate:.0f} Hz in frames of {args.batch}")
+	try:
+		if args.legacy:
+			send_legacy(reader, server)
+		else:
+			send_batches(reader, server, args.batch, rate)
 
+	except KeyboardInterrupt:
+		pass
 	except Exception as e:
 		print(f"Error: {e}")
 	finally:
-		server_socket.close()
+		server.close()
+		print(f"IMU: {server.summary()}\n{reader.lost} samples lost in the ring")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,6 +3,10 @@ intHealth_send.py
 
 Intakes BME680 output and streams to control over port 5630
 
+Readings come from sensor_hub.py's health ring, the hub owns the BME680 and the I2C bus.
+Every reading goes to every connected viewer through fanout.py, as telemetry.py packets with
+the reading's time and sequence number.
+
 Copyright (c) 2023
 Created by Christopher Holm
 holmch@oregonstate.edu
@@ -24,57 +28,57 @@ Revision History
 #####################################################################################
 2024/01/05 CEH Initial Version
 2024/01/30 CEH Commented out seperate serial intake of Battery, this is now handled by control arduino...
+2026/10/18 CEH Sensor through hal.py and opened in main(), nothing touches I2C on import
+2026/10/18 CEH Reads the sensor_hub.py health ring instead of the BME680
+2026/10/18 CEH Multiple clients through fanout.py, a slow or dropped viewer no longer stalls or kills the server
+2026/10/18 CEH telemetry.py packets replace the bare 'fff' struct
 
 ####################################################################################
 '''
 #!/usr/bin/python
-import time
-import socket
-import struct
-import board
-import adafruit_bme680
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import sample_ring
+import sensor_hub  # owns the BME680, run it first (ROV_HAL=sim for the simulated one)
+import telemetry
+from ctl_config import ConfigWatcher
+from fanout import FanoutServer
 #import serial
 
 #Define Battery Monitor Serial Port
 #ser = serial.Serial('dev/ttyACM1', 9600) #will have to change to 115200 if implemented on uno...
 
-# Create sensor object, communicating over the board's default I2C bus
-i2c = board.I2C()  # uses board.SCL and board.SDA
-# i2c = board.STEMMA_I2C()  # For using the built-in STEMMA QT connector on a microcontroller
-bme680 = adafruit_bme680.Adafruit_BME680_I2C(i2c, debug=False)
-
-# change this to match the location's pressure (hPa) at sea level
-bme680.sea_level_pressure = 1012
-
 # You will usually have to add an offset to account for the temperature of
 # the sensor. This is usually around 5 degrees but varies by use. Use a
 # separate temperature sensor to calibrate this one.
 temperature_offset = -5
 # Spew readings
 def main():
-	# Open TCP socket on SUB
-	server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-	server_socket.bind(("192.168.2.3", 5630))  # Change the port as needed
-	server_socket.listen()
+	# BME680 readings from the hub, which has the I2C bus to itself
+	config = ConfigWatcher().load()
+	health = sensor_hub.open_reader("health", config)
+
+	# Open TCP server on SUB, queue depth and drop policy per viewer from "fanout" in controller.json
+	server = FanoutServer(("192.168.2.3", 5630), **config.get("fanout", {}))  # Change the port as needed
 	print("Reading Internal Pressure, Humidity, and Temperature sending on port 5630")
 
 	try:
 		while True:
-			client_socket, _ = server_socket.accept()
-			while True:
-				
-				intTemp = bme680.temperature + temperature_offset
-				intPres = bme680.pressure
-				intHum = bme680.relative_humidity
-				int_data = struct.pack('fff', intTemp, intPres, intHum)
-				client_socket.sendall(int_data)
-				time.sleep(0.25)
-		client_socket.close()
-		ser.close()
+			# Serve viewers until the hub has had time for a new reading, then send what is new
+			server.wait(0.25)
+			for run in sample_ring.contiguous(health.read()):
+				int_data = telemetry.pack(telemetry.STREAM_HEALTH, t_us=run["t_us"],
+					temperature=run["temperature"] + temperature_offset,
+					pressure=run["pressure"], humidity=run["humidity"])
+				server.publish(telemetry.encode(telemetry.STREAM_HEALTH, int(run["seq"][0]), int_data))
+	except KeyboardInterrupt:
+		pass
 	except Exception as e:
 		print(f"Error: {e}")
 	finally:
-		server_socket.close()
+		server.close()
+		print(f"Health: {server.summary()}")
 
 if __name__ == "__main__":
 	main()
@@ -0,0 +1,219 @@
+'''
+mpu6050.py
+
+MPU6050 driver shared by imu_send.py, imu.py and plot_imu_data.py.  A sample is the 14 byte
+ACCEL_XOUT_H..GYRO_ZOUT_L block read in one I2C transfer and unpacked with one struct call,
+instead of two single byte transfers per axis, so the six axes also come from the same sample.
+Scale factors follow the full scale ranges actually set in GYRO_CONFIG and ACCEL_CONFIG.
+
+FIFO mode samples at 8 kHz (or 1 kHz with the DLPF on) / (1 + SMPLRT_DIV) into the part's
+1024 byte FIFO, and read_fifo() drains up to 85 samples per i2c_rdwr() burst into a NumPy array,
+so 100-1000 Hz costs a few transfers per batch instead of one per sample.  Each sample is 12
+bytes, about 108 bus bits, so 1000 Hz needs the Pi's I2C at 400 kHz (dtparam=i2c_arm_baudrate=400000);
+the 100 kHz default overflows the FIFO and read_fifo() counts and recovers from that.
+FifoSampler drains it and gives every sample the time the part took it.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH FIFO acquisition, burst drained into NumPy arrays
+2026/10/18 CEH FifoSampler, the sample clock imu_send.py had, for sensor_hub.py
+
+
+####################################################################################
+'''
+import struct
+import time
+import numpy as np
+
+#some MPU6050 Registers and their Address
+SMPLRT_DIV   = 0x19
+CONFIG       = 0x1A
+GYRO_CONFIG  = 0x1B
+ACCEL_CONFIG = 0x1C
+FIFO_EN      = 0x23
+INT_ENABLE   = 0x38
+INT_STATUS   = 0x3A
+ACCEL_XOUT_H = 0x3B
+USER_CTRL    = 0x6A
+PWR_MGMT_1   = 0x6B
+FIFO_COUNTH  = 0x72
+FIFO_R_W     = 0x74
+
+DEVICE_ADDRESS = 0x68
+
+# accel x y z, temperature, gyro x y z, big endian signed 16 bit
+BLOCK = struct.Struct(">7h")
+
+FIFO_SIZE = 1024
+FIFO_ACCEL_GYRO = 0x78    # ACCEL_FIFO_EN | XG | YG | ZG, no temperature
+FIFO_SAMPLE = 12          # bytes per sample in that layout: accel x y z, gyro x y z
+FIFO_BURST = FIFO_SIZE // FIFO_SAMPLE   # most whole samples the FIFO holds, one burst drains them
+FIFO_USER_EN = 0x40
+FIFO_RESET = 0x04
+FIFO_OFLOW = 0x10         # INT_STATUS and INT_ENABLE bit
+DATA_RDY = 0x01
+RAW = np.dtype(">i2")
+
+# LSB per unit for FS_SEL / AFS_SEL 0..3
+GYRO_LSB = (131.0, 65.5, 32.8, 16.4)          # per deg/s, +/- 250, 500, 1000, 2000
+ACCEL_LSB = (16384.0, 8192.0, 4096.0, 2048.0)  # per g, +/- 2, 4, 8, 16
+
+
+class MPU6050:
+    def __init__(self, bus, address=DEVICE_ADDRESS, sample_div=7, dlpf=0, gyro_range=3, accel_range=0, i2c_msg=None):
+        self.bus = bus
+        self.i2c_msg = i2c_msg   # smbus2.i2c_msg (or hal.i2c_msg()), only FIFO mode needs it
+        self.address = address
+        self.sample_div = sample_div
+        self.dlpf = dlpf
+        self.gyro_range = gyro_range     # 3 is the +/- 2000 deg/s the original scripts wrote as 24
+        self.accel_range = accel_range
+        self.gyro_lsb = GYRO_LSB[gyro_range]
+        self.accel_lsb = ACCEL_LSB[accel_range]
+        self.fifo_samples = 0
+        self.fifo_bursts = 0
+        self.overflows = 0
+
+    def init(self):
+        self.bus.write_byte_data(self.address, SMPLRT_DIV, self.sample_div)
+        self.bus.write_byte_data(self.address, PWR_MGMT_1, 1)   # awake, PLL on gyro X
+        self.bus.write_byte_data(self.address, CONFIG, self.dlpf)
+        self.bus.write_byte_data(self.address, GYRO_CONFIG, self.gyro_range << 3)
+        self.bus.write_byte_data(self.address, ACCEL_CONFIG, self.accel_range << 3)
+        self.bus.write_byte_data(self.address, INT_ENABLE, 1)
+        # Scale from what the part reports, not what we meant to write
+        self.gyro_lsb = GYRO_LSB[(self.bus.read_byte_data(self.address, GYRO_CONFIG) >> 3) & 3]
+        self.accel_lsb = ACCEL_LSB[(self.bus.read_byte_data(self.address, ACCEL_CONFIG) >> 3) & 3]
+
+    def read_raw(self):
+        '''(ax, ay, az, temp, gx, gy, gz) raw counts from one block transfer.'''
+        return BLOCK.unpack(bytes(self.bus.read_i2c_block_data(self.address, ACCEL_XOUT_H, BLOCK.size)))
+
+    def read(self):
+        '''(Gx, Gy, Gz, Ax, Ay, Az) in deg/s and g, the order imu_send.py puts on the wire.'''
+        ax, ay, az, _, gx, gy, gz = self.read_raw()
+        g, a = self.gyro_lsb, self.accel_lsb
+        return gx / g, gy / g, gz / g, ax / a, ay / a, az / a
+
+    @staticmethod
+    def temperature(raw):
+        '''Die temperature in C from the raw count in read_raw()[3].'''
+        return raw / 340.0 + 36.53
+
+    @property
+    def sample_rate(self):
+        base = 8000.0 if self.dlpf in (0, 7) else 1000.0
+        return base / (1 + self.sample_div)
+
+    def start_fifo(self):
+        self.bus.write_byte_data(self.address, FIFO_EN, 0)
+        self.bus.write_byte_data(self.address, USER_CTRL, FIFO_RESET)
+        self.bus.write_byte_data(self.address, USER_CTRL, FIFO_USER_EN)
+        self.bus.write_byte_data(self.address, FIFO_EN, FIFO_ACCEL_GYRO)
+        self.bus.write_byte_data(self.address, INT_ENABLE, FIFO_OFLOW | DATA_RDY)
+        self.bus.read_byte_data(self.address, INT_STATUS)   # clear an old overflow flag
+
+    def fifo_count(self):
+        high, low = self.bus.read_i2c_block_data(self.address, FIFO_COUNTH, 2)
+        return high << 8 | low
+
+    def read_fifo(self, max_samples=FIFO_BURST):
+        '''Drain whole samples from the FIFO in one burst.
+
+        Returns (raw, pending): raw is an (n, 6) int16 array of accel x y z, gyro x y z counts,
+        oldest first, and pending the whole samples still left in the FIFO.  A FIFO that overflowed
+        (before or during the burst) has lost data and its byte stream is no longer aligned on a
+        sample, it is reset and nothing is returned.
+        '''
+        empty = np.empty((0, 6), RAW)
+        count = self.fifo_count()
+        if count >= FIFO_SIZE:
+            return self._overflowed(empty)
+        n = min(count // FIFO_SAMPLE, max_samples)
+        if n == 0:
+            return empty, 0
+        register = self.i2c_msg.write(self.address, [FIFO_R_W])
+        data = self.i2c_msg.read(self.address, n * FIFO_SAMPLE)
+        self.bus.i2c_rdwr(register, data)
+        if self.bus.read_byte_data(self.address, INT_STATUS) & FIFO_OFLOW:
+            return self._overflowed(empty)   # filled up while we were reading, the burst is torn
+        self.fifo_samples += n
+        self.fifo_bursts += 1
+        return np.frombuffer(bytes(data), RAW).reshape(n, 6), count // FIFO_SAMPLE - n
+
+    def _overflowed(self, empty):
+        self.overflows += 1
+        self.start_fifo()
+        return empty, 0
+
+    def scale(self, raw):
+        '''(gyro, accel) float32 arrays in deg/s and g from read_fifo() counts.'''
+        return (raw[:, 3:] / np.float32(self.gyro_lsb)).astype(np.float32), \
+               (raw[:, :3] / np.float32(self.accel_lsb)).astype(np.float32)
+
+
+class FifoSampler:
+    '''Drains the FIFO and times every sample on the MPU6050's own clock.
+
+    The FIFO's newest sample was taken about when its count was read, so a burst's oldest sample
+    is that time less (samples read - 1 + samples left) periods.  Sample times follow the part's
+    clock and are only pulled a sixteenth of the way towards that estimate per burst, so bus and
+    scheduling jitter stays out of them and they never go backwards.
+    '''
+
+    def __init__(self, imu, clock=lambda: time.time_ns() // 1000):
+        self.imu = imu
+        self.clock = clock       # microseconds, telemetry.monotonic_us() in sensor_hub.py
+        self.next_us = None      # time of the next sample out of the FIFO
+        self.overflows = imu.overflows
+
+    def start(self):
+        self.imu.start_fifo()
+        self.next_us = None
+
+    def drain(self):
+        '''(t_us, gyro, accel) for everything in the FIFO, uint64 and (n, 3) float32 arrays.'''
+        period_us = 1e6 / self.imu.sample_rate
+        times, gyros, accels = [], [], []
+        while True:
+            count_us = self.clock()   # read_fifo() reads the FIFO count first, about now
+            raw, left = self.imu.read_fifo()
+            if self.imu.overflows != self.overflows:
+                self.overflows = self.imu.overflows
+                self.next_us = None   # samples were lost, start the clock again
+            if len(raw) == 0:
+                break
+            first_us = count_us - (len(raw) - 1 + left) * period_us
+            if self.next_us is None:
+                self.next_us = first_us
+            else:
+                # Under half a period even when a burst is late, so times never go backwards
+                self.next_us += max(-period_us / 2, (first_us - self.next_us) / 16)
+            times.append((self.next_us + np.arange(len(raw)) * period_us).astype(np.uint64))
+            self.next_us += len(raw) * period_us
+            gyro, accel = self.imu.scale(raw)
+            gyros.append(gyro)
+            accels.append(accel)
+            if left == 0:
+                break
+        if not times:
+            return np.empty(0, np.uint64), np.empty((0, 3), np.float32), np.empty((0, 3), np.float32)
+        return np.concatenate(times), np.concatenate(gyros), np.concatenate(accels)
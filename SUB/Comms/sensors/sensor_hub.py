@@ -0,0 +1,290 @@
+'''
+sensor_hub.py
+
+Sole owner of I2C bus 1.  One thread reads every sensor on a single timeline, so no two
+transfers ever contend for the bus, and publishes timestamped samples into sample_ring.py
+shared memory rings that any number of local consumers (imu_send.py, intHealth_send.py,
+extPressure_send.py, loggers) read without touching I2C themselves.  Sample times are
+telemetry.monotonic_us(), the clock the telemetry headers carry.
+
+    stream   sensor                      default period   record
+    imu      MPU6050 FIFO at rate Hz      0.1 s drain      t_us, gyro[3] deg/s, accel[3] g
+    health   BME680 electronics bottle    0.25 s           t_us, temperature C, pressure hPa, humidity %
+    depth    MS5837 external pressure     0.25 s           t_us, depth m, pressure mbar, temperature C
+    leak     MS8607 hull leak sensor      1.0 s            t_us, temperature C, pressure hPa, humidity %
+
+The IMU samples into its FIFO at its own rate, so the 20-40 ms the BME680 and MS5837 block
+for a conversion only delays a drain and never loses a sample.  Each stream's key, period,
+capacity and enable come from the "sensor_hub" section of controller.json.  A sensor that fails
+to open, for any reason (no device at the address, a missing driver module), is retried every
+10 seconds, and one that fails 5 polls in a row is closed and reopened the same way; the others
+carry on.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH Samples stamped with the monotonic clock, IMU records from telemetry.py
+2026/10/18 CEH Any open failure is retried, a stream reopened after REOPEN_AFTER poll errors in a row
+
+
+####################################################################################
+'''
+#!/usr/bin/python3
+import os
+import signal
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import hal
+import sysv_ipc
+import telemetry
+from ctl_config import ConfigWatcher
+from latency import LatencyRecorder
+from mpu6050 import MPU6050, FifoSampler
+from ring_log import RingLog
+from sample_ring import RingReader, RingWriter
+
+ENVIRONMENT = np.dtype([("t_us", "<u8"), ("temperature", "<f4"), ("pressure", "<f4"), ("humidity", "<f4")])
+
+STREAMS = {
+    "imu": telemetry.RECORDS[telemetry.STREAM_IMU],
+    "health": ENVIRONMENT,
+    "depth": np.dtype([("t_us", "<u8"), ("depth", "<f4"), ("pressure", "<f4"), ("temperature", "<f4")]),
+    "leak": ENVIRONMENT,
+}
+
+DEFAULTS = {
+    "imu": {"key": 1380931075, "period": 0.1, "rate": 200, "capacity": 4096, "enabled": True},
+    "health": {"key": 1380931076, "period": 0.25, "capacity": 1024, "enabled": True},
+    "depth": {"key": 1380931077, "period": 0.25, "capacity": 1024, "enabled": True},
+    "leak": {"key": 1380931078, "period": 1.0, "capacity": 256, "enabled": True},
+}
+RETRY = 10.0
+REOPEN_AFTER = 5   # consecutive poll errors before the sensor is opened again
+
+
+def settings(config):
+    section = config.get("sensor_hub", {})
+    return {name: dict(defaults, **section.get(name, {})) for name, defaults in DEFAULTS.items()}
+
+
+def open_reader(name, config=None, backlog=0):
+    '''RingReader for one stream, waits for sensor_hub.py to create it.'''
+    options = settings(ConfigWatcher().load() if config is None else config)[name]
+    waiting = False
+    while True:
+        try:
+            return RingReader(options["key"], STREAMS[name], backlog)
+        except sysv_ipc.ExistentialError:
+            if not waiting:
+                print(f"Waiting for sensor_hub.py to publish {name}")
+                waiting = True
+            time.sleep(1)
+
+
+def record(dtype, *values):
+    samples = np.empty(1, dtype)
+    samples[0] = (telemetry.monotonic_us(),) + values
+    return samples
+
+
+class Imu:
+    def __init__(self, options):
+        # DLPF 1 (184 Hz) puts the gyro on the accelerometer's 1 kHz clock, SMPLRT_DIV divides that
+        self.sample_div = min(255, max(0, round(1000.0 / options["rate"]) - 1))
+        self.bus = None
+        self.sampler = None
+
+    def open(self):
+        if self.bus is not None:
+            self.bus.close()   # reopened after poll errors
+        self.bus = hal.smbus(1)   # or hal.smbus(0) for older version boards
+        imu = MPU6050(self.bus, sample_div=self.sample_div, dlpf=1, i2c_msg=hal.i2c_msg())
+        imu.init()
+        self.sampler = FifoSampler(imu, telemetry.monotonic_us)
+        self.sampler.start()
+
+    def poll(self):
+        t_us, gyro, accel = self.sampler.drain()
+        return telemetry.pack(telemetry.STREAM_IMU, t_us=t_us, gyro=gyro, accel=accel)
+
+    def summary(self):
+        if self.sampler is None:
+            return "not open"
+        imu = self.sampler.imu
+        return f"{imu.sample_rate:.0f} Hz, {imu.overflows} FIFO overflows, {self.bus.summary(imu.fifo_samples)}"
+
+
+class Bme680:
+    def __init__(self, options):
+        self.sensor = None
+
+    def open(self):
+        self.sensor = hal.bme680()
+        self.sensor.sea_level_pressure = 1012   # hPa at sea level here
+
+    def poll(self):
+        return record(ENVIRONMENT, self.sensor.temperature, self.sensor.pressure, self.sensor.relative_humidity)
+
+
+class Ms5837:
+    def __init__(self, options):
+        self.sensor = None
+
+    def open(self):
+        self.sensor = hal.ms5837()   # MS5837_30BA
+        if not self.sensor.init():
+            raise OSError("MS5837 could not be initialized")
+        self.sensor.setFluidDensity(1000)   # kg/m^3
+
+    def poll(self):
+        if not self.sensor.read():
+            raise OSError("MS5837 read failed")
+        return record(STREAMS["depth"], self.sensor.depth(), self.sensor.pressure(), self.sensor.temperature())
+
+
+class Ms8607:
+    def __init__(self, options):
+        self.sensor = None
+
+    def open(self):
+        self.sensor = hal.ms8607()
+
+    def poll(self):
+        return record(ENVIRONMENT, self.sensor.temperature, self.sensor.pressure, self.sensor.relative_humidity)
+
+
+SENSORS = {"imu": Imu, "health": Bme680, "depth": Ms5837, "leak": Ms8607}
+
+
+class Stream:
+    '''One sensor, its ring and its place on the timeline.'''
+
+    def __init__(self, name, sensor, ring, period):
+        self.name = name
+        self.sensor = sensor
+        self.ring = ring
+        self.period = period
+        self.due = time.monotonic()
+        self.opened = False
+        self.polls = 0
+        self.errors = 0
+        self.failing = 0   # poll errors in a row
+        self.late = 0
+
+    def summary(self):
+        text = (f"{self.name}: {self.ring.written} samples in {self.polls} polls, {self.errors} errors, "
+                f"{self.late} late")
+        if hasattr(self.sensor, "summary"):
+            text += f", {self.sensor.summary()}"
+        return text
+
+
+class SensorHub:
+    def __init__(self, streams, log, latency):
+        self.streams = streams
+        self.log = log
+        self.latency = latency
+        self.running = True
+
+    def poll(self, stream):
+        start = time.monotonic()
+        if not stream.opened:
+            try:
+                stream.sensor.open()
+            except Exception as e:
+                # Board libraries raise ValueError for an absent address, ImportError without the
+                # driver, none of which should take the other sensors down with this one
+                stream.errors += 1
+                self.log.log("sensor", "%s open failed, retry in %.0f s: %s", stream.name, RETRY, e)
+                stream.due = start + RETRY
+                return
+            stream.opened = True
+            stream.failing = 0
+            self.log.log("hub", "%s open", stream.name)
+        try:
+            stream.ring.write(stream.sensor.poll())
+            stream.failing = 0
+        except (OSError, RuntimeError, ValueError) as e:
+            stream.errors += 1
+            stream.failing += 1
+            self.log.log("sensor", "%s: %s", stream.name, e)
+            if stream.failing >= REOPEN_AFTER:
+                self.log.log("sensor", "%s failed %d polls in a row, reopening in %.0f s",
+                             stream.name, stream.failing, RETRY)
+                stream.opened = False
+                stream.due = start + RETRY
+                return
+        stream.polls += 1
+        now = time.monotonic()
+        self.latency.record(stream.name, int((now - start) * 1e6))
+        stream.due += stream.period
+        if stream.due <= now:
+            # Held up past the next slot by another sensor, skip to the next one still ahead
+            missed = int((now - stream.due) / stream.period) + 1
+            stream.late += missed
+            stream.due += missed * stream.period
+
+    def run(self):
+        while self.running:
+            stream = min(self.streams, key=lambda s: s.due)
+            delay = stream.due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+                continue   # a signal may have stopped us, or woken us early
+            self.poll(stream)
+
+    def stop(self):
+        self.running = False
+
+
+def main():
+    config = ConfigWatcher().load()
+    options = settings(config)
+    log = RingLog(rate_limits=config.get("log_rate_limits"))
+    names = [name for name in STREAMS if options[name]["enabled"]]
+    # Time each poll takes in microseconds, per stream
+    latency = LatencyRecorder(names)
+    streams = [Stream(name, SENSORS[name](options[name]),
+                      RingWriter(options[name]["key"], STREAMS[name], options[name]["capacity"]),
+                      options[name]["period"]) for name in names]
+    hub = SensorHub(streams, log, latency)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: hub.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: hub.stop())
+    signal.signal(signal.SIGUSR1, lambda signum, frame: log.log("stats", "Poll time (ms):\n%s", latency.summary()))
+
+    log.log("hub", "Sensor hub publishing %s", ", ".join(names))
+    try:
+        hub.run()
+    finally:
+        for stream in streams:
+            log.log("stats", "%s", stream.summary())
+        log.log("stats", "Poll time (ms):\n%s", latency.summary())
+        try:
+            latency.dump(config.get("sensor_hub", {}).get("latency_log", "sensor_hub_latency.json"))
+        except OSError as e:
+            log.log("stats", "Could not write latency histograms: %s", e)
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
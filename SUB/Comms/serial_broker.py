@@ -0,0 +1,290 @@
+'''
+serial_broker.py
+
+Sole owner of the Arduino serial port (/dev/ttyACM0).  Thruster frames arrive from Controller.py
+on a System V message queue and are written in order, every line the Arduino sends back is parsed
+here and the latest status (battery voltage, counters) is published in a System V shared memory
+block that any number of readers can poll.  The port is opened once at boot, so arming, disarming
+or restarting Controller.py never resets the Uno or leaves a gap in battery data.
+
+    command queue   BrokerClient.write(line) -> "<Q" enqueue time in us + the line
+    status block    StatusReader.read() -> dict, consistent snapshot via a sequence counter
+
+Times shared between processes are CLOCK_MONOTONIC microseconds, the same in every process and
+immune to the Pi setting its wall clock from NTP after boot.  Controller_enable.py reads the
+status block and restarts the broker when the Arduino has gone silent.  Keys, the stale frame
+limit and that silence limit come from the "serial_broker" section of controller.json.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH Battery to the surface through battery_telemetry.py, binary, smoothed, immediate low voltage alert
+2026/10/18 CEH Monotonic queue and status times, bounded StatusReader.read() with the Arduino's silence in age_ms
+2026/10/18 CEH pending_echo shared between the writer and reader threads under echo_lock
+
+
+####################################################################################
+'''
+#!/usr/bin/python3
+import re
+import signal
+import struct
+import threading
+import time
+from collections import deque
+import serial
+import sysv_ipc
+from battery_telemetry import BatteryTelemetry
+from ctl_config import ConfigWatcher
+from latency import LatencyRecorder
+from ring_log import RingLog
+
+DEFAULTS = {"command_key": 1380931073, "status_key": 1380931074, "stale_ms": 500, "silent_s": 5.0}
+
+MSG_FRAME = 1   # thruster line for the serial port
+MSG_STOP = 2    # wakes the writer thread on shutdown
+
+FRAME_HEADER = struct.Struct("<Q")   # enqueue time, monotonic_us()
+
+SEQ = struct.Struct("<I")
+# seq, battery monotonic time us, battery volts, lines read, frames written, stale frames dropped, last echo us
+STATUS = struct.Struct("<IQdQQQI")
+STATUS_FIELDS = ("battery_us", "battery_v", "lines", "frames", "stale", "echo_us")
+
+BATTERY_PATTERN = re.compile(r'Battery Voltage: ([\d.]+)')
+READ_ATTEMPTS = 1000   # a writer is mid publish for microseconds, an odd seq this long means it died
+
+
+def settings(config):
+    return dict(DEFAULTS, **config.get("serial_broker", {}))
+
+
+def monotonic_us():
+    return time.monotonic_ns() // 1000
+
+
+class BrokerClient:
+    '''Stands in for the serial.Serial Controller.py used to write, frames go to the broker's queue.'''
+
+    def __init__(self, key):
+        self.queue = sysv_ipc.MessageQueue(key, sysv_ipc.IPC_CREAT, mode=0o600)
+        self.sent = 0
+        self.full = 0
+
+    def write(self, data):
+        try:
+            self.queue.send(FRAME_HEADER.pack(monotonic_us()) + data, block=False, type=MSG_FRAME)
+            self.sent += 1
+        except sysv_ipc.BusyError:
+            # Broker not draining (not running or stuck), the frame is dropped rather than blocking
+            # the control loop; the Arduino's serialTimeout takes the thrusters to neutral
+            self.full += 1
+        return len(data)
+
+    def summary(self):
+        return f"{self.sent} queued, {self.full} dropped on a full queue"
+
+
+class StatusReader:
+    '''Reader side of the status block.
+
+    read() returns None until the broker has published once, or if it died part way through a
+    publish and left the sequence odd.  age_ms is how long ago the Arduino last sent a battery
+    reading, which it does every loop().
+    '''
+
+    def __init__(self, key):
+        self.memory = sysv_ipc.SharedMemory(key, sysv_ipc.IPC_CREAT, mode=0o600, size=STATUS.size)
+        self.retries = 0
+
+    def read(self):
+        for _ in range(READ_ATTEMPTS):
+            data = self.memory.read(STATUS.size)
+            seq, *values = STATUS.unpack(data)
+            # Odd while the broker is mid write, changed if it wrote during our read
+            if seq % 2 == 0 and STATUS.unpack(self.memory.read(STATUS.size))[0] == seq:
+                break
+            self.retries += 1
+        else:
+            return None
+        if seq == 0:
+            return None
+        status = dict(zip(STATUS_FIELDS, values))
+        status["seq"] = seq
+        status["age_ms"] = (monotonic_us() - status["battery_us"]) / 1000
+        return status
+
+
+class SerialBroker:
+    def __init__(self, ser, command_key, status_key, stale_ms, log, latency, battery_sink=None):
+        self.ser = ser
+        self.commands = sysv_ipc.MessageQueue(command_key, sysv_ipc.IPC_CREAT, mode=0o600)
+        self.memory = sysv_ipc.SharedMemory(status_key, sysv_ipc.IPC_CREAT, mode=0o600, size=STATUS.size)
+        self.stale_us = stale_ms * 1000
+        self.log = log
+        self.latency = latency
+        self.battery_sink = battery_sink   # called with each new voltage and its time
+        self.seq = SEQ.unpack(self.memory.read(SEQ.size))[0] & ~1   # carry on from a previous broker
+        self.battery_us = 0
+        self.battery_v = 0.0
+        self.lines = 0
+        self.frames = 0
+        self.stale = 0
+        self.echo_us = 0
+        self.pending_echo = deque(maxlen=16)   # (line written, write time) waiting for the Arduino echo
+        self.echo_lock = threading.Lock()   # the writer appends while the reader matches and pops
+        self.running = True
+
+    def drain_stale(self):
+        # Anything queued while nothing was writing (boot delay, broker restart) is old news
+        while True:
+            try:
+                self.commands.receive(block=False)
+            except sysv_ipc.BusyError:
+                return
+            self.stale += 1
+
+    def write_loop(self):
+        while self.running:
+            message, kind = self.commands.receive()
+            if kind != MSG_FRAME:
+                continue
+            queued_us = FRAME_HEADER.unpack_from(message)[0]
+            now_us = monotonic_us()
+            if now_us - queued_us > self.stale_us:
+                self.stale += 1
+                self.log.log("stale", "Dropped a thruster frame queued %.1f ms ago", (now_us - queued_us) / 1000)
+                continue
+            line = message[FRAME_HEADER.size:]
+            self.ser.write(line)
+            written_us = monotonic_us()
+            self.latency.record("queue", written_us - queued_us)
+            with self.echo_lock:
+                self.pending_echo.append((line.decode('utf-8').strip(), written_us))
+            self.frames += 1
+
+    def publish(self):
+        # Sequence counter is odd while the fields are being rewritten, readers retry on that
+        self.seq += 1
+        self.memory.write(SEQ.pack(self.seq))
+        self.memory.write(STATUS.pack(self.seq, self.battery_us, self.battery_v, self.lines,
+                                      self.frames, self.stale, self.echo_us)[SEQ.size:], offset=SEQ.size)
+        self.seq += 1
+        self.memory.write(SEQ.pack(self.seq))
+
+    def match_echo(self, line):
+        # ArduThruster echoes every line it receives (twice, once from serialEvent and once from
+        # loop), pair the first echo with the write that sent it and drop anything older
+        with self.echo_lock:
+            for i, (sent, written_us) in enumerate(self.pending_echo):
+                if sent == line:
+                    break
+            else:
+                return
+            # Nothing appends while the lock is held, so i still counts from the left
+            for _ in range(i + 1):
+                self.pending_echo.popleft()
+        self.echo_us = monotonic_us() - written_us
+        self.latency.record("serial_echo", self.echo_us)
+
+    def handle_line(self, line):
+        self.lines += 1
+        self.log.log("serial", "%s", line)
+        if line.startswith("pwm1:"):
+            self.match_echo(line)
+        match = BATTERY_PATTERN.search(line)
+        if match:
+            try:
+                self.battery_v = float(match.group(1))
+            except ValueError:
+                self.log.log("serial", "Failed to parse battery voltage")
+            else:
+                self.battery_us = monotonic_us()
+                if self.battery_sink is not None:
+                    self.battery_sink(self.battery_v)   # stamped with the wall clock the surface shows
+        self.publish()
+
+    def read_loop(self):
+        buffer = bytearray()
+        while self.running:
+            buffer.extend(self.ser.read(self.ser.in_waiting or 1))
+            while True:
+                newline = buffer.find(b"\n")
+                if newline < 0:
+                    break
+                line = buffer[:newline].decode('utf-8', errors='replace').strip()
+                del buffer[:newline + 1]
+                if line:
+                    self.handle_line(line)
+
+    def stop(self):
+        self.running = False
+        try:
+            self.commands.send(b"", block=False, type=MSG_STOP)
+        except sysv_ipc.BusyError:
+            pass   # queue full, the writer is awake anyway
+
+    def summary(self):
+        return (f"{self.lines} lines read, {self.frames} frames written, {self.stale} stale frames dropped, "
+                f"battery {self.battery_v:.2f} V")
+
+
+def main():
+    config = ConfigWatcher().load()
+    options = settings(config)
+    log = RingLog(rate_limits=config.get("log_rate_limits"))
+    # Latency stages in microseconds
+    #   queue          Controller.py queued the frame to it written to the port
+    #   serial_echo    written to the Arduino echoing the same line back
+    latency = LatencyRecorder(["queue", "serial_echo"])
+    ser = serial.Serial(config.get("serial_port", "/dev/ttyACM0"), 115200, timeout=0.1)
+    battery = BatteryTelemetry(**config.get("battery", {"address": ["192.168.2.2", 5650]}))
+    broker = SerialBroker(ser, options["command_key"], options["status_key"], options["stale_ms"], log, latency, battery)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: broker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: broker.stop())
+    signal.signal(signal.SIGUSR1, lambda signum, frame: log.log("stats", "Latency (ms):\n%s", latency.summary()))
+
+    # Opening the port resets the Uno and its setup() holds the ESCs at stop, paid once per boot
+    time.sleep(config.get("arduino_boot_delay", 5))
+    broker.drain_stale()
+    log.log("broker", "Serial port %s open, serving thruster frames", ser.port)
+    writer = threading.Thread(target=broker.write_loop, name="serial_writer", daemon=True)
+    writer.start()
+    try:
+        broker.read_loop()
+    except serial.SerialException as e:
+        log.log("serial", "Serial port error: %s", e)
+        broker.stop()
+    finally:
+        writer.join(1.0)
+        log.log("stats", "Serial broker: %s", broker.summary())
+        log.log("stats", "Battery telemetry: %s", battery.summary())
+        log.log("stats", "Latency (ms):\n%s", latency.summary())
+        try:
+            latency.dump(options.get("latency_log", "serial_broker_latency.json"))
+        except OSError as e:
+            log.log("stats", "Could not write latency histograms: %s", e)
+        ser.close()
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+'''
+supervisor.py
+
+Child process supervision for Controller_enable.py.  Each child gets a pidfd (Linux 5.3+) that
+becomes readable the moment it exits, so it is reaped immediately from the same selector the
+control port uses, its exit status reported, and it is restarted with exponential backoff.
+A child that ran for stable_after seconds restarts at the minimum backoff again.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH Stale pidfd events from an earlier process of the same child are ignored
+2026/10/18 CEH terminate() restarts a child without waiting for it, the pidfd reaps it and run_due kills a late one
+
+
+####################################################################################
+'''
+import os
+import selectors
+import signal
+import subprocess
+import time
+
+
+def describe_exit(returncode):
+    if returncode < 0:
+        try:
+            return f"killed by {signal.Signals(-returncode).name}"
+        except ValueError:
+            return f"killed by signal {-returncode}"
+    return f"exit status {returncode}"
+
+
+class Child:
+    '''One supervised process, its restart state and history.'''
+
+    def __init__(self, name, argv, stdout_path, stderr_path, min_backoff=0.5, max_backoff=30.0, stable_after=10.0):
+        self.name = name
+        self.argv = argv
+        self.stdout_path = stdout_path
+        self.stderr_path = stderr_path
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.backoff = min_backoff
+        self.process = None
+        self.pidfd = None
+        self.started = 0.0
+        self.restart_at = None
+        self.kill_at = None   # terminate() sent SIGTERM, SIGKILL if it is still running then
+        self.restart_now = False
+        self.starts = 0
+        self.last_exit = None
+
+    @property
+    def running(self):
+        return self.pidfd is not None
+
+
+class Supervisor:
+    '''Starts children and keeps them running, driven by the caller's selector.
+
+    The caller's loop is
+        for key, _ in selector.select(supervisor.timeout()):
+            key.data(key.fileobj)
+        supervisor.run_due()
+    so pidfd events arrive as callbacks like any other file the loop waits on.
+    '''
+
+    def __init__(self, selector):
+        self.selector = selector
+        self.children = []
+
+    def add(self, child):
+        self.children.append(child)
+        self.start(child)
+        return child
+
+    def start(self, child):
+        with open(child.stdout_path, "w") as out_file, open(child.stderr_path, "w") as err_file:
+            child.process = subprocess.Popen(child.argv, stdout=out_file, stderr=err_file)
+        child.pidfd = os.pidfd_open(child.process.pid)
+        child.started = time.monotonic()
+        child.restart_at = None
+        child.starts += 1
+        self.selector.register(child.pidfd, selectors.EVENT_READ,
+                               lambda fd, child=child, process=child.process: self._exited(child, process))
+        print(f"{child.name} started, pid {child.process.pid} (start {child.starts})")
+
+    def _exited(self, child, process, restart=True):
+        # pidfd readable means the process is gone, wait() reaps it without blocking.  An event
+        # selected in the same batch as a command that restarted the child belongs to the old
+        # process, and the new pidfd can have the same fd number, so check it is this process.
+        if child.pidfd is None or process is not child.process:
+            return   # already reaped by stop()
+        returncode = child.process.poll()
+        if returncode is None:
+            return   # still running
+        self.selector.unregister(child.pidfd)
+        os.close(child.pidfd)
+        child.pidfd = None
+        child.kill_at = None
+        runtime = time.monotonic() - child.started
+        child.last_exit = describe_exit(returncode)
+        if runtime >= child.stable_after:
+            child.backoff = child.min_backoff
+        if restart and child.restart_now:
+            child.restart_now = False
+            child.restart_at = time.monotonic()
+            print(f"{child.name} (pid {child.process.pid}) {child.last_exit} after {runtime:.1f} s, restarting")
+        elif restart:
+            child.restart_at = time.monotonic() + child.backoff
+            print(f"{child.name} (pid {child.process.pid}) {child.last_exit} after {runtime:.1f} s, "
+                  f"restarting in {child.backoff:.1f} s")
+            child.backoff = min(child.backoff * 2, child.max_backoff)
+        else:
+            print(f"{child.name} (pid {child.process.pid}) {child.last_exit} after {runtime:.1f} s")
+
+    def stop(self, child, restart=False, timeout=2.0):
+        '''Terminate a running child, killing it after timeout seconds, and reap it now.'''
+        if child.running:
+            child.process.terminate()
+            try:
+                child.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                child.process.kill()
+                child.process.wait()
+            self._exited(child, child.process, restart=False)
+        child.restart_at = None
+        child.restart_now = False
+        if restart:
+            self.start(child)
+
+    def terminate(self, child, kill_after=2.0):
+        '''Restart a child without waiting on it: SIGTERM now, started again as soon as its pidfd
+        says it has gone, SIGKILL from run_due() if it is still running after kill_after seconds.'''
+        if not child.running:
+            self.start_now(child)
+            return
+        if child.kill_at is not None:
+            return   # already on its way out
+        child.process.terminate()
+        child.kill_at = time.monotonic() + kill_after
+        child.restart_now = True
+
+    def start_now(self, child):
+        '''Start a child that is waiting out its backoff, an operator asked for it.'''
+        if not child.running:
+            self.start(child)
+
+    def timeout(self):
+        due = [at for child in self.children for at in (child.restart_at, child.kill_at) if at is not None]
+        if not due:
+            return None
+        return max(0.0, min(due) - time.monotonic())
+
+    def run_due(self):
+        now = time.monotonic()
+        for child in self.children:
+            if child.kill_at is not None and child.kill_at <= now:
+                print(f"{child.name} (pid {child.process.pid}) ignored SIGTERM, killing it")
+                child.kill_at = None
+                child.process.kill()
+            if child.restart_at is not None and child.restart_at <= now:
+                self.start(child)
+
+    def stop_all(self):
+        for child in reversed(self.children):
+            self.stop(child)
+
+    def summary(self):
+        return ", ".join(f"{child.name} {'running' if child.running else 'down'} starts {child.starts} "
+                         f"last {child.last_exit or 'n/a'}" for child in self.children)
@@ -0,0 +1,104 @@
+'''
+thrusters.py
+
+Holds the desired duty cycle of all four ArduThruster channels and flushes them to the Arduino
+as a single "pwm1:..,pwm2:..,pwm3:..,pwm4:..\n" frame, no faster than the Uno can take them.
+
+ArduThruster's loop() only gets back to reading serial every 120-130 ms, into a 63 byte receive
+ring, so two ~37 byte frames inside one pass overflow it and the lines that come out are spliced
+from both (pwm4:636 out of pwm4:63 and pwm4:36).  Frames are therefore at least min_interval
+apart whatever the control tick rate, and the one written is always the latest state.
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH Frames paced to min_interval for the Uno's receive buffer, latest value wins
+
+
+####################################################################################
+'''
+import time
+
+NEUTRAL = 50       # 50% duty cycle is 1500 us on the ESC, stopped
+NUM_CHANNELS = 4   # pwm1..pwm4 -> D3, D5, D6, D9 on the Arduino
+
+
+class ThrusterCommand:
+    '''Desired state of pwm1..pwm4 with dirty tracking.
+
+    flush() only writes when a channel changed, or when keepalive seconds have passed since the
+    last write so ArduThruster's 500 ms serialTimeout does not drop a held command to neutral, and
+    never within min_interval of the last write.  A change it holds back stays pending(), the
+    caller flushes again after wait() seconds.
+    '''
+
+    def __init__(self, ser, keepalive=0.25, min_interval=0.13):
+        self.ser = ser
+        self.keepalive = keepalive
+        self.min_interval = min_interval
+        self.duty = [NEUTRAL] * NUM_CHANNELS
+        self.sent = None
+        self.last_write = 0.0
+        self.writes = 0
+        self.skipped = 0
+        self.paced = 0
+        self.bytes_written = 0
+
+    def set(self, channel, duty_cycle):
+        # channel is 1 based to match the pwm1..pwm4 labels
+        self.duty[channel - 1] = int(round(min(max(duty_cycle, 0), 100)))
+
+    def set_all(self, duty_cycles):
+        for channel, duty_cycle in enumerate(duty_cycles, 1):
+            self.set(channel, duty_cycle)
+
+    def neutral(self):
+        self.duty = [NEUTRAL] * NUM_CHANNELS
+
+    def frame(self):
+        d = self.duty
+        return f"pwm1:{d[0]},pwm2:{d[1]},pwm3:{d[2]},pwm4:{d[3]}\n".encode('utf-8')
+
+    def pending(self):
+        return self.duty != self.sent
+
+    def wait(self, now=None):
+        '''Seconds until flush() may write again.'''
+        if now is None:
+            now = time.monotonic()
+        return max(0.0, self.last_write + self.min_interval - now)
+
+    def flush(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        if self.duty == self.sent and now - self.last_write < self.keepalive:
+            self.skipped += 1
+            return False
+        if now - self.last_write < self.min_interval:
+            # The Uno has not read the last frame yet, this state goes out on a later flush
+            self.paced += 1
+            return False
+        data = self.frame()
+        self.ser.write(data)
+        self.sent = list(self.duty)
+        self.last_write = now
+        self.writes += 1
+        self.bytes_written += len(data)
+        return True
@@ -0,0 +1,304 @@
+'''
+ardu_emulator.py
+
+Stands in for the Uno running ArduThruster.ino so Controller.py and Controller_enable.py can be
+run and benchmarked without the sub.  Opens a pty, prints the slave path (and optionally links
+it somewhere like /tmp/ttyACM0), then behaves like the sketch:
+
+    setup()       6 s ESC arming delay from start (the Uno resets when the port opens), bytes
+                  received meanwhile wait in the 64 byte receive buffer
+    serialEvent() runs between loop() passes, echoes the line on newline, does not clear the
+                  buffer so two lines in one pass are joined just like on the Uno
+    loop()        10 ms + 10 ms battery averaging, echo and parse pwm1..4, 500 ms neutral
+                  timeout, map() to 1100..1900 us, Freq/Battery status line, 100 ms delay
+
+Serial timing is modelled at 115200 8N1: received bytes arrive one per 86.8 us into a 63 byte
+ring and anything past that is dropped like HardwareSerial does, and printing blocks once the
+63 byte transmit buffer is full.
+
+Point Controller.py at it with "serial_port" in controller.json (or ROV_CONFIG=test.json).
+kill -USR1 prints counters.
+
+    python3 ardu_emulator.py [--link /tmp/ttyACM0] [--battery 14.8] [--trace]
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+
+
+####################################################################################
+'''
+import argparse
+import os
+import re
+import select
+import signal
+import threading
+import time
+import tty
+from collections import deque
+
+BAUD = 115200
+BYTE_TIME = 10.0 / BAUD           # start + 8 data + stop bits
+RING_SIZE = 63                    # SERIAL_RX/TX_BUFFER_SIZE 64, one slot always empty
+SERIAL_TIMEOUT_MS = 500
+NUM_READINGS = 10
+TOKEN = re.compile(r"([^:]{1,4}):\s*([+-]?\d+)")  # sscanf(token, "%4[^:]:%d", ...)
+
+
+def arduino_map(x, in_min, in_max, out_min, out_max):
+    # Integer math like the AVR map(), C division truncates toward zero
+    num = (x - in_min) * (out_max - out_min)
+    den = in_max - in_min
+    q = abs(num) // abs(den)
+    return (q if (num >= 0) == (den > 0) else -q) + out_min
+
+
+class UartModel:
+    '''Byte timing and ring buffers of the Uno's hardware serial on the master side of a pty.'''
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.lock = threading.Lock()
+        self.wire = deque()            # (arrival time, byte) still in flight toward the Uno
+        self.last_arrival = 0.0
+        self.rx = deque()              # the Uno's receive ring
+        self.tx_busy_until = 0.0
+        self.tx_lines = deque()        # (time the last byte leaves the UART, bytes)
+        self.tx_wake = threading.Event()
+        self.rx_bytes = 0
+        self.rx_dropped = 0
+        self.tx_bytes = 0
+        self.tx_blocked = 0.0
+        self.running = True
+
+    def receive_loop(self):
+        # Bytes written by the host arrive no faster than the baud rate
+        while self.running:
+            ready, _, _ = select.select([self.fd], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.fd, 4096)
+            except OSError:
+                # Nobody has the slave open, the host side closed the port
+                time.sleep(0.05)
+                continue
+            now = time.monotonic()
+            with self.lock:
+                t = max(now, self.last_arrival)
+                for byte in data:
+                    t += BYTE_TIME
+                    self.wire.append((t, byte))
+                self.last_arrival = t
+
+    def _land(self):
+        # Move bytes that have finished arriving into the ring, overflow is lost as on the Uno
+        now = time.monotonic()
+        with self.lock:
+            while self.wire and self.wire[0][0] <= now:
+                _, byte = self.wire.popleft()
+                self.rx_bytes += 1
+                if len(self.rx) < RING_SIZE:
+                    self.rx.append(byte)
+                else:
+                    self.rx_dropped += 1
+
+    def available(self):
+        self._land()
+        return len(self.rx)
+
+    def read(self):
+        return self.rx.popleft()
+
+    def print(self, text):
+        data = text.encode("ascii", errors="replace")
+        now = time.monotonic()
+        start = max(now, self.tx_busy_until)
+        # Serial.print returns once everything but the last RING_SIZE bytes is on the wire
+        done = start + len(data) * BYTE_TIME
+        blocked_until = done - RING_SIZE * BYTE_TIME
+        if blocked_until > now:
+            self.tx_blocked += blocked_until - now
+            time.sleep(blocked_until - now)
+        self.tx_busy_until = done
+        self.tx_bytes += len(data)
+        self.tx_lines.append((done, data))
+        self.tx_wake.set()
+
+    def println(self, text):
+        self.print(f"{text}\r\n")
+
+    def transmit_loop(self):
+        while self.running:
+            if not self.tx_lines:
+                self.tx_wake.wait(0.1)
+                self.tx_wake.clear()
+                continue
+            due, data = self.tx_lines[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.tx_lines.popleft()
+            try:
+                os.write(self.fd, data)
+            except OSError:
+                pass
+
+
+class ArduThruster:
+    def __init__(self, uart, battery_volts=14.8, boot_delay=6.0, trace=False):
+        self.uart = uart
+        self.boot_delay = boot_delay
+        self.trace = trace
+        self.adc = int(round(battery_volts / 3.41 * 1023.0 / 5.0))
+        self.readings = [0] * NUM_READINGS
+        self.total_batt = 0
+        self.read_index = 0
+        self.volt_batt = 0.0
+        self.dc = [50, 50, 50, 50]
+        self.freq = [1500, 1500, 1500, 1500]
+        self.new_data = False
+        self.received = ""
+        self.start = time.monotonic()
+        self.last_serial_time = 0
+        self.loops = 0
+        self.lines = 0
+        self.timeouts = 0
+        self.in_timeout = False
+        self.max_loop_ms = 0.0
+
+    def millis(self):
+        return int((time.monotonic() - self.start) * 1000)
+
+    def serial_event(self):
+        while self.uart.available() > 0:
+            ch = chr(self.uart.read())
+            if ch == "\n":
+                self.new_data = True
+                self.uart.println(self.received)
+            else:
+                self.received += ch
+
+    def parse_serial_data(self, data):
+        for token in data.split(","):
+            if not token:
+                continue   # strtok skips empty fields
+            match = TOKEN.match(token)
+            if match is None:
+                continue
+            label, value = match.group(1), int(match.group(2))
+            if label in ("pwm1", "pwm2", "pwm3", "pwm4"):
+                self.dc[int(label[3]) - 1] = value
+
+    def setup(self):
+        # Servo.attach and writeMicroseconds(1500), then hold the ESCs at stop while they arm
+        time.sleep(self.boot_delay)
+        self.start = time.monotonic() - self.boot_delay
+        self.last_serial_time = self.millis()
+
+    def loop(self):
+        started = time.monotonic()
+        time.sleep(0.010)
+        self.total_batt -= self.readings[self.read_index]
+        self.readings[self.read_index] = self.adc
+        self.total_batt += self.readings[self.read_index]
+        self.read_index = (self.read_index + 1) % NUM_READINGS
+        avg_batt = self.total_batt // NUM_READINGS          # int / int on the AVR
+        self.volt_batt = (avg_batt * (5.0 / 1023.0)) * 3.41
+        time.sleep(0.010)
+        if self.new_data:
+            self.uart.println(self.received)
+            self.parse_serial_data(self.received)
+            self.new_data = False
+            self.received = ""
+            self.last_serial_time = self.millis()
+            self.lines += 1
+            self.in_timeout = False
+        if self.millis() - self.last_serial_time > SERIAL_TIMEOUT_MS:
+            self.dc = [50, 50, 50, 50]
+            if not self.in_timeout:
+                self.in_timeout = True
+                self.timeouts += 1
+        freq = [arduino_map(self.dc[0], 0, 100, 1100, 1900),
+                arduino_map(self.dc[1], 0, 100, 1900, 1100),
+                arduino_map(self.dc[2], 0, 100, 1100, 1900),
+                arduino_map(self.dc[3], 0, 100, 1900, 1100)]
+        if self.trace and freq != self.freq:
+            print(f"{self.millis():9d} ms  dc {self.dc}  freq {freq}", flush=True)
+        self.freq = freq
+        self.uart.println(f"Freq1: {freq[0]}, Freq2: {freq[1]}, Freq3: {freq[2]}, Freq4: {freq[3]}, "
+                          f"Battery Voltage: {self.volt_batt:.2f}")
+        for value, name in zip(freq, ("Starboard Vertical", "Port Vertical", "Starboard Horizontal", "Port Horizontal")):
+            if value < 1100 or value > 1900:
+                self.uart.println(f"{name} not valid")
+        time.sleep(0.100)
+        self.loops += 1
+        self.max_loop_ms = max(self.max_loop_ms, (time.monotonic() - started) * 1000)
+
+    def summary(self):
+        u = self.uart
+        return (f"loops {self.loops} (max {self.max_loop_ms:.1f} ms), lines applied {self.lines}, "
+                f"neutral timeouts {self.timeouts}, rx {u.rx_bytes} bytes ({u.rx_dropped} dropped on overflow), "
+                f"tx {u.tx_bytes} bytes ({u.tx_blocked * 1000:.1f} ms blocked), dc {self.dc}, freq {self.freq}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulate the ArduThruster Uno on a pty")
+    parser.add_argument("--link", help="also symlink the pty here, for example /tmp/ttyACM0")
+    parser.add_argument("--battery", type=float, default=14.8, help="battery voltage to report")
+    parser.add_argument("--boot-delay", type=float, default=6.0, help="setup() ESC arming delay in seconds")
+    parser.add_argument("--trace", action="store_true", help="print every change of thruster output")
+    args = parser.parse_args()
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    path = os.ttyname(slave)
+    if args.link:
+        if os.path.islink(args.link):
+            os.remove(args.link)
+        os.symlink(path, args.link)
+    print(f"ArduThruster emulator on {path}" + (f" ({args.link})" if args.link else ""), flush=True)
+
+    uart = UartModel(master)
+    board = ArduThruster(uart, args.battery, args.boot_delay, args.trace)
+    running = [True]
+
+    def stop(signum, frame):
+        running[0] = False
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: print(board.summary(), flush=True))
+    threading.Thread(target=uart.receive_loop, daemon=True).start()
+    threading.Thread(target=uart.transmit_loop, daemon=True).start()
+
+    board.setup()
+    while running[0]:
+        board.loop()
+        board.serial_event()
+    uart.running = False
+    print(board.summary())
+    if args.link and os.path.islink(args.link):
+        os.remove(args.link)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+'''
+bench_control_path.py
+
+Load test of the whole control path with synthetic gamepad input: the port 5800 server side
+(ControlScheduler and Broadcaster from CONTROL/act) feeds the real Controller.py, which queues
+thruster frames to the real serial_broker.py writing a pty.  Each input rate runs both fresh
+with ROV_HAL=sim, a temporary config and private IPC keys, then reports
+
+    offered    synthetic gamepad events generated
+    merged     axis updates folded into a later value by the latest value wins tick
+    applied    axis events Controller.py set on the mixer while enabled (unmapped codes and
+               disabled events not counted), per second, and frames lost in transit
+    writes     thruster frames written to serial and lines the serial side received
+    cpu        Controller.py user + system time, as a share of one core and per applied event,
+               start up (numpy import, config) included so short runs overstate it
+    latency    event to frame queued for the broker percentiles from its histograms, the broker's
+               queue to serial write time is in the --json output
+
+The serial side is a plain pty sink by default, --emulator puts ardu_emulator.py there instead
+to include the Uno's 115200 baud and 64 byte buffer limits.
+
+    python3 bench_control_path.py [--rates 10 50 100 500 1000 5000] [--duration 5] [--tick 50]
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH Arms the warm Controller.py over its command port before driving it
+2026/10/18 CEH Runs serial_broker.py between Controller.py and the serial side
+2026/10/18 CEH Control frames Controller.py received in the --json results
+2026/10/18 CEH applied is the axis events set on the mixer (Controller.py stats), not every axis log line
+
+
+####################################################################################
+'''
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tty
+import sysv_ipc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COMMS = os.path.join(HERE, "..", "Comms")
+sys.path.insert(0, os.path.join(HERE, "..", "..", "CONTROL", "act"))
+import ctl_frame
+from ctl_broadcast import Broadcaster
+from ctl_scheduler import ControlScheduler
+
+AXES = (ctl_frame.ABS_Y, ctl_frame.ABS_RX, ctl_frame.ABS_RY, ctl_frame.ABS_X)
+
+
+class PtySink:
+    '''Stands in for the Uno when only the Pi side of the path is under test, counts lines.'''
+
+    def __init__(self):
+        self.master, slave = os.openpty()
+        tty.setraw(slave)
+        self.path = os.ttyname(slave)
+        self.slave = slave
+        self.lines = 0
+        self.bytes = 0
+        self.running = True
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        while self.running:
+            try:
+                data = os.read(self.master, 65536)
+            except OSError:
+                break
+            self.bytes += len(data)
+            self.lines += data.count(b"\n")
+
+    def close(self):
+        self.running = False
+        os.close(self.slave)
+        os.close(self.master)
+
+
+def generate(scheduler, rate, stop, counts):
+    # Random walk on the four mixed axes with Poisson arrivals, so events land at every phase of
+    # the control tick; caught up in bursts so 5 kHz works with ms sleeps
+    values = {code: 0 for code in AXES}
+    due = time.monotonic()
+    sent = 0
+    scheduler.update(ctl_frame.EV_BUTTON, ctl_frame.BTN_THUMBL, 1, ctl_frame.timestamp_us())  # enable
+    scheduler.update(ctl_frame.EV_BUTTON, ctl_frame.BTN_THUMBL, 0, ctl_frame.timestamp_us())
+    while not stop.is_set():
+        now = time.monotonic()
+        while due <= now:
+            due += random.expovariate(rate)
+            code = AXES[sent % len(AXES)]
+            values[code] = max(-32768, min(32767, values[code] + random.randint(-2000, 2000)))
+            scheduler.update(ctl_frame.EV_AXIS, code, values[code], ctl_frame.timestamp_us())
+            sent += 1
+        time.sleep(0.001)
+    counts["offered"] = sent
+
+
+def arm(port):
+    # Controller.py comes up disarmed, arm it the way Controller_enable.py does
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(2)
+        sock.sendto(b"arm", ("127.0.0.1", port))
+        state, switch_us = sock.recv(1024).decode().split()
+    if state != "armed":
+        raise RuntimeError(f"Controller.py did not arm: {state}")
+    return int(switch_us)
+
+
+def run_rate(rate, args):
+    workdir = tempfile.mkdtemp(prefix="bench_control_")
+    if args.emulator:
+        link = os.path.join(workdir, "ttyEMU")
+        emulator = subprocess.Popen([sys.executable, os.path.join(HERE, "ardu_emulator.py"), "--link", link, "--boot-delay", "0"],
+                                    stdout=subprocess.DEVNULL)
+        while not os.path.exists(link):
+            time.sleep(0.01)
+        serial_path, sink = link, None
+    else:
+        sink = PtySink()
+        serial_path, emulator = sink.path, None
+
+    with open(os.path.join(COMMS, "controller.json")) as f:
+        config = json.load(f)
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    command = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    command.bind(("127.0.0.1", 0))   # a free port for Controller.py's arm/disarm endpoint
+    command_port = command.getsockname()[1]
+    command.close()
+    config.update({"control_server": ["127.0.0.1", server.getsockname()[1]], "serial_port": serial_path,
+                   "command_port": command_port,
+                   "serial_broker": {"command_key": random.randint(1 << 20, 1 << 30), "status_key": random.randint(1 << 20, 1 << 30),
+                                     "stale_ms": 500, "latency_log": os.path.join(workdir, "broker_latency.json")},
+                   "arduino_boot_delay": 0, "latency_log": os.path.join(workdir, "latency.json"),
+                   "hal": dict(config.get("hal", {}), backend="sim")})
+    config_path = os.path.join(workdir, "controller.json")
+    with open(config_path, "w") as f:
+        json.dump(config, f)
+
+    scheduler = ControlScheduler(args.tick)
+    broadcaster = Broadcaster(scheduler, queue_depth=args.queue_depth)
+    threading.Thread(target=broadcaster.accept_loop, args=(server,), daemon=True).start()
+
+    env = dict(os.environ, ROV_CONFIG=config_path, ROV_HAL="sim")
+    broker = subprocess.Popen([sys.executable, os.path.join(COMMS, "serial_broker.py")], cwd=COMMS, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    out_path = os.path.join(workdir, "stdout.txt")
+    with open(out_path, "w") as out:
+        controller = subprocess.Popen([sys.executable, os.path.join(COMMS, "Controller.py")], cwd=COMMS,
+                                      env=env, stdout=out, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 10
+    while not broadcaster.subscribers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    if not broadcaster.subscribers:
+        controller.kill()
+        raise RuntimeError(f"Controller.py never connected, see {out_path}")
+    arm_us = arm(command_port)
+
+    stop = threading.Event()
+    counts = {}
+    threading.Thread(target=scheduler.run, args=(broadcaster.publish,), daemon=True).start()
+    generator = threading.Thread(target=generate, args=(scheduler, rate, stop, counts))
+    generator.start()
+    time.sleep(args.duration)
+    stop.set()
+    generator.join()
+    time.sleep(0.2)   # last ticks drain
+    controller.send_signal(signal.SIGTERM)
+    _, status, usage = os.wait4(controller.pid, 0)
+    broker.send_signal(signal.SIGTERM)
+    broker.wait()
+    sysv_ipc.remove_message_queue(sysv_ipc.MessageQueue(config["serial_broker"]["command_key"]).id)
+    sysv_ipc.remove_shared_memory(sysv_ipc.SharedMemory(config["serial_broker"]["status_key"]).id)
+    scheduler.stop = True
+    server.close()
+    for subscriber in broadcaster.subscribers:
+        subscriber.close()
+    while broadcaster.subscribers:
+        time.sleep(0.01)
+
+    with open(out_path) as f:
+        output = f.read()
+    frames = re.search(r"Control frames: (\d+) received, (\d+) lost", output)
+    axis_events = re.search(r"Axis events: (\d+) applied", output)
+    writes = re.search(r"Thruster frames: (\d+) written", output)
+    with open(config["latency_log"]) as f:
+        latency = {h["name"]: h for h in json.load(f)}
+    with open(config["serial_broker"]["latency_log"]) as f:
+        latency.update({h["name"]: h for h in json.load(f)})
+    if sink is not None:
+        serial_lines = sink.lines
+        sink.close()
+    else:
+        emulator.send_signal(signal.SIGINT)
+        emulator.wait()
+        serial_lines = None
+
+    received, lost = int(frames.group(1)), int(frames.group(2))
+    applied = int(axis_events.group(1)) if axis_events else 0
+    cpu = usage.ru_utime + usage.ru_stime
+    return {
+        "rate": rate,
+        "offered": counts["offered"],
+        "merged": scheduler.stats.merged,
+        "applied": applied,
+        "applied_per_s": applied / args.duration,
+        "received": received,
+        "lost": lost,
+        "writes": int(writes.group(1)),
+        "serial_lines": serial_lines,
+        "cpu_pct": cpu * 100 / args.duration,
+        "cpu_us_per_event": cpu * 1e6 / max(applied, 1),
+        "write_p50_ms": latency["evdev_to_write"].get("p50_us", 0) / 1000,
+        "write_p99_ms": latency["evdev_to_write"].get("p99_us", 0) / 1000,
+        "write_p999_ms": latency["evdev_to_write"].get("p99.9_us", 0) / 1000,
+        "recv_p99_ms": latency["evdev_to_recv"].get("p99_us", 0) / 1000,
+        "queue_p99_ms": latency["queue"].get("p99_us", 0) / 1000,
+        "arm_us": arm_us,
+        "exit": status,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic load benchmark of the ground to SUB control path")
+    parser.add_argument("--rates", type=float, nargs="+", default=[10, 50, 100, 500, 1000, 5000], help="gamepad events per second")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per rate")
+    parser.add_argument("--tick", type=float, default=50.0, help="control tick rate in Hz")
+    parser.add_argument("--queue-depth", type=int, default=4)
+    parser.add_argument("--emulator", action="store_true", help="ardu_emulator.py on the serial side instead of a plain sink")
+    parser.add_argument("--json", metavar="PATH", help="also write the results here")
+    args = parser.parse_args()
+
+    print(f"{'rate/s':>7s} {'offered':>8s} {'merged':>7s} {'applied':>8s} {'appl/s':>7s} {'lost':>5s} "
+          f"{'writes':>7s} {'serial':>7s} {'cpu %':>6s} {'cpu us/ev':>9s} {'p50 ms':>7s} {'p99 ms':>7s} {'p99.9 ms':>8s}")
+    results = []
+    for rate in args.rates:
+        # Silence the broadcaster's per subscriber printouts, the table has what matters
+        with contextlib.redirect_stdout(io.StringIO()):
+            r = run_rate(rate, args)
+        results.append(r)
+        serial = "-" if r["serial_lines"] is None else str(r["serial_lines"])
+        print(f"{r['rate']:7.0f} {r['offered']:8d} {r['merged']:7d} {r['applied']:8d} {r['applied_per_s']:7.0f} "
+              f"{r['lost']:5d} {r['writes']:7d} {serial:>7s} {r['cpu_pct']:6.1f} {r['cpu_us_per_event']:9.0f} "
+              f"{r['write_p50_ms']:7.2f} {r['write_p99_ms']:7.2f} {r['write_p999_ms']:8.2f}", flush=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+'''
+bench_logging.py
+
+Hot path cost of logging in Controller.py: print() to a file (what Controller_enable.py's stdout
+redirect does) against RingLog.log() with and without a rate limit.  Point the output at the SD
+card on the Pi to see the real difference, it defaults to a temp file.
+
+    python3 bench_logging.py [iterations] [output_file]
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+
+
+####################################################################################
+'''
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Comms"))
+import ctl_frame
+from ring_log import RingLog
+
+
+def per_call_ns(func, iterations):
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.gettempdir(), "bench_logging.txt")
+    frame = ctl_frame.ControlFrame(ctl_frame.EV_AXIS, 1, -32768, 1234, ctl_frame.timestamp_us())
+
+    with open(path, "w", buffering=1) as out:
+        # Line buffered like a redirected stdout that is flushed per line
+        printed = per_call_ns(lambda: print(f"Received: {frame}", file=out), iterations)
+
+        ring = RingLog(stream=out)
+        ring_cost = per_call_ns(lambda: ring.log("frame", "Received: %s", frame), iterations)
+        ring.close()
+
+        limited = RingLog(stream=out, rate_limits={"frame": 1.0})
+        limited_cost = per_call_ns(lambda: limited.log("frame", "Received: %s", frame), iterations)
+        limited.close()
+
+    print(f"print() to file         {printed:9.0f} ns per call")
+    print(f"RingLog.log             {ring_cost:9.0f} ns per call  ({ring.dropped} ring drops)")
+    print(f"RingLog.log rate limit  {limited_cost:9.0f} ns per call  ({limited.stats()})")
+    if len(sys.argv) <= 2:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+'''
+bench_loop_latency.py
+
+Compares input latency and shutdown latency of the last threaded Controller.py design (commit
+0c1cde8: controller_thread decodes every frame of each recv with no sleep, prints it and pings the
+server, 1 s readline timeout, 1 s main loop sleep) against the asyncio design now used by
+Controller.py.  Runs over localhost with no Pi hardware.
+
+    python3 bench_loop_latency.py [rate_hz] [seconds]
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH Threaded side is the real controller_thread loop from 0c1cde8, not a sleep per recv
+
+
+####################################################################################
+'''
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Comms"))
+import ctl_frame
+
+
+def now_us():
+    return time.monotonic_ns() // 1000
+
+
+def start_sender(rate_hz, seconds):
+    '''Localhost stand-in for read_controller.py, frames carry their send time.'''
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+
+    def run():
+        conn, _ = server.accept()
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        encoder = ctl_frame.FrameEncoder()
+        period = 1.0 / rate_hz
+        next_send = time.monotonic()
+        end = next_send + seconds
+        while next_send < end:
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            conn.sendall(encoder.encode(ctl_frame.EV_AXIS, 1, 0, now_us()))
+            next_send += period
+        conn.close()
+        server.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server.getsockname()
+
+
+def report(name, latencies, shutdown):
+    latencies.sort()
+    n = len(latencies)
+    if n == 0:
+        print(f"{name:10s} no frames applied")
+        return
+    p50 = latencies[n // 2] / 1000
+    p99 = latencies[min(n - 1, int(n * 0.99))] / 1000
+    print(f"{name:10s} applied {n:6d}  p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  "
+          f"max {latencies[-1] / 1000:7.2f} ms  shutdown {shutdown * 1000:7.1f} ms")
+
+
+def run_threaded(address, seconds):
+    '''The last threaded Controller.py loop (0c1cde8): every frame of each recv, no sleep.'''
+    latencies = []
+    stop = threading.Event()
+    client = socket.create_connection(address)
+    console = open(os.devnull, "w")   # its print() per frame, formatted but not shown
+
+    def controller_thread():
+        decoder = ctl_frame.FrameDecoder()
+        while not stop.is_set():
+            data = client.recv(4096)
+            if not data:
+                break
+            for frame in decoder.feed(data):
+                latencies.append(now_us() - frame.timestamp)
+                print(f"Received: {frame}", file=console)
+            try:
+                client.sendall(b"PING")   # is_server_alive() after every recv
+            except OSError:
+                break
+
+    def serial_thread():
+        # Stand-in for ser.readline() with timeout=1 on a quiet port
+        while not stop.is_set():
+            time.sleep(1.0)
+
+    threads = [threading.Thread(target=controller_thread), threading.Thread(target=serial_thread)]
+    for t in threads:
+        t.start()
+    # SIGTERM arrives part way through a main loop sleep, it is only seen on the next pass
+    requested = time.monotonic() + seconds
+    while time.monotonic() < requested:
+        time.sleep(1)
+    stop.set()
+    try:
+        client.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass   # the sender closed first and reset it on a PING
+    for t in threads:
+        t.join()
+    client.close()
+    console.close()
+    return latencies, time.monotonic() - requested
+
+
+async def run_asyncio(address, seconds):
+    latencies = []
+    decoder = ctl_frame.FrameDecoder()
+    stop = asyncio.Event()
+
+    class Protocol(asyncio.Protocol):
+        def data_received(self, data):
+            t = now_us()
+            for frame in decoder.feed(data):
+                latencies.append(t - frame.timestamp)
+
+        def connection_lost(self, exc):
+            stop.set()
+
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_connection(Protocol, *address)
+    loop.call_later(seconds, stop.set)
+    await stop.wait()
+    requested = time.monotonic()
+    transport.close()
+    await asyncio.sleep(0)
+    return latencies, time.monotonic() - requested
+
+
+def main():
+    rate_hz = float(sys.argv[1]) if len(sys.argv) > 1 else 200.0
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    sent = int(rate_hz * seconds)
+    print(f"{sent} frames at {rate_hz:.0f} Hz over {seconds:.0f} s")
+
+    latencies, shutdown = run_threaded(start_sender(rate_hz, seconds), seconds + 0.5)
+    report("threaded", latencies, shutdown)
+
+    latencies, shutdown = asyncio.run(run_asyncio(start_sender(rate_hz, seconds), seconds + 0.5))
+    report("asyncio", latencies, shutdown)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+'''
+bench_mixer.py
+
+Microbenchmark of the thruster mixing in SUB/Comms/mixer.py, prints the cost of one control tick
+in microseconds.  Runs anywhere numpy is installed, no Pi hardware needed.
+
+    python3 bench_mixer.py [iterations]
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+
+
+####################################################################################
+'''
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Comms"))
+from mixer import ThrusterMixer
+from thrusters import ThrusterCommand
+
+
+class NullSerial:
+    def write(self, data):
+        return len(data)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    mixer = ThrusterMixer()
+    thrusters = ThrusterCommand(NullSerial(), keepalive=0.0, min_interval=0.0)
+    rng = np.random.default_rng(0)
+    demands = rng.uniform(-1.0, 1.0, size=(1024, 4))
+    state = {"i": 0}
+
+    def mix_only():
+        i = state["i"] = (state["i"] + 1) & 1023
+        mixer.mix(demands[i])
+
+    def full_tick():
+        i = state["i"] = (state["i"] + 1) & 1023
+        thrusters.set_all(mixer.mix(demands[i]))
+        thrusters.flush()
+
+    for name, func in (("mix", mix_only), ("mix + serial frame", full_tick)):
+        best = min(timeit.repeat(func, number=iterations, repeat=5))
+        print(f"{name:20s} {best / iterations * 1e6:8.2f} us per tick")
+    print(f"saturated ticks: {mixer.saturated}")
+
+
+if __name__ == "__main__":
+    main()
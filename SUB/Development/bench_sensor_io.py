@@ -0,0 +1,114 @@
+'''
+bench_sensor_io.py
+
+Per sample I/O cost of each sensor read path as the send scripts do it, through hal.py so it
+runs against the real parts on the Pi or the simulated ones anywhere (ROV_HAL=sim).  The MPU6050
+runs three times, the old two single byte reads per axis, the mpu6050.py block read, and the
+FIFO at 200 Hz drained in bursts (only the time spent reading counts, not the wait for samples).
+
+    ROV_HAL=sim python3 bench_sensor_io.py [samples]
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH MPU6050 block read next to the old byte reads
+2026/10/18 CEH MPU6050 FIFO burst row
+
+
+####################################################################################
+'''
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, "..", "Comms"), os.path.join(HERE, "..", "Comms", "sensors")]
+import hal
+from mpu6050 import MPU6050
+
+MPU_ADDRESS = 0x68
+DATA_REGISTERS = (0x3B, 0x3D, 0x3F, 0x43, 0x45, 0x47)   # accel xyz, gyro xyz high bytes
+
+
+def imu_sample(bus):
+    # imu_send.py before mpu6050.py: two single byte reads per axis
+    for register in DATA_REGISTERS:
+        bus.read_byte_data(MPU_ADDRESS, register)
+        bus.read_byte_data(MPU_ADDRESS, register + 1)
+
+
+def report(name, samples, seconds, cpu, extra=""):
+    print(f"{name:9s} {samples:5d} samples  {seconds * 1e6 / samples:9.0f} us wall  "
+          f"{cpu * 1e6 / samples:7.0f} us cpu per sample  {extra}")
+
+
+def timed(func, samples):
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(samples):
+        func()
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"HAL backend {hal.settings()['backend']}, I2C {hal.settings()['i2c_hz'] / 1000:.0f} kHz")
+
+    bus = hal.smbus(1)
+    bus.write_byte_data(MPU_ADDRESS, 0x6B, 1)   # wake up
+    bus.reset()
+    wall, cpu = timed(lambda: imu_sample(bus), samples)
+    report("mpu6050", samples, wall, cpu, bus.summary(samples))
+
+    imu = MPU6050(bus)
+    imu.init()
+    bus.reset()
+    wall, cpu = timed(imu.read, samples)
+    report("mpu burst", samples, wall, cpu, bus.summary(samples))
+
+    imu = MPU6050(bus, sample_div=4, dlpf=1, i2c_msg=hal.i2c_msg())   # 200 Hz
+    imu.init()
+    imu.start_fifo()
+    bus.reset()
+    wall = cpu = 0.0
+    while imu.fifo_samples < samples:
+        time.sleep(0.1)   # 20 samples, one imu_send.py frame
+        w, c = timed(imu.read_fifo, 1)
+        wall += w
+        cpu += c
+    report("mpu fifo", imu.fifo_samples, wall, cpu,
+           f"{bus.summary(imu.fifo_samples)}, {imu.overflows} overflows")
+
+    bme680 = hal.bme680()
+    wall = cpu = 0.0
+    for _ in range(samples // 10):
+        time.sleep(0.11)   # past the driver's 100 ms refresh so every sample is a fresh reading
+        w, c = timed(lambda: (bme680.temperature, bme680.pressure, bme680.relative_humidity), 1)
+        wall += w
+        cpu += c
+    report("bme680", samples // 10, wall, cpu)
+
+    sensor = hal.ms5837()
+    sensor.init()
+    wall, cpu = timed(sensor.read, samples // 10)
+    report("ms5837", samples // 10, wall, cpu, f"depth {sensor.depth():.2f} m")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+'''
+link_drop_sim.py
+
+Simulated control link drop against heartbeat.py.  Control ticks arrive every 20 ms, then stop
+at a random moment without the socket closing (tether cut, switch hang).  Measures how long the
+SUB takes from the last frame to writing the neutral thruster frame, through the same
+ThrusterCommand pacing Controller.py's command_neutral() uses, and checks it never exceeds
+Controller.neutral_bound_ms(): the heartbeat's detection bound, plus whatever of the pacing the
+silence has not already covered (none while 2 x min_interval <= timeout).
+
+The first pass uses a simulated clock for many trials, the second runs the same watchdog timers
+on a real asyncio loop over a localhost socket pair.
+
+    python3 link_drop_sim.py [trials]
+
+Copyright (c) 2023
+Created by Christopher Holm
+holmch@oregonstate.edu
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Revision History
+#####################################################################################
+2026/10/18 CEH Initial Version
+2026/10/18 CEH Timed to the neutral frame written through the thruster pacing, bound from Controller.py
+
+
+####################################################################################
+'''
+import asyncio
+import os
+import random
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Comms"))
+import ctl_frame
+from heartbeat import Heartbeat
+from thrusters import ThrusterCommand
+
+TICK = 0.02
+PERIOD = 0.1
+TIMEOUT = 0.3
+
+
+class WriteTimes:
+    '''Serial stand in, keeps the time of every frame and the last one written.'''
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.last = None
+        self.at = None
+
+    def write(self, data):
+        self.last = data
+        self.at = self.clock()
+        return len(data)
+
+
+def thrusters_for(clock):
+    serial = WriteTimes(clock)
+    return ThrusterCommand(serial), serial
+
+
+def bound_ms(heartbeat, thrusters):
+    # Same as Controller.neutral_bound_ms(), the module itself opens the serial queue and GPIO
+    return heartbeat.bound_ms + max(0.0, 2 * thrusters.min_interval - heartbeat.timeout) * 1000
+
+
+def simulated_trials(trials):
+    detections = []
+    for _ in range(trials):
+        heartbeat = Heartbeat(PERIOD, TIMEOUT)
+        now = [0.0]
+        thrusters, serial = thrusters_for(lambda: now[0])
+        phase = random.uniform(0, heartbeat.check_interval)
+        # Last frame is the final tick before the drop, the stick moving on every tick until then
+        last_rx = int(random.uniform(1.0, 2.0) / TICK) * TICK
+        tick = 0.0
+        while tick <= last_rx:
+            now[0] = tick
+            thrusters.set_all([random.randint(0, 100) for _ in range(4)])
+            thrusters.flush(tick)
+            tick += TICK
+        heartbeat.received(last_rx)
+        check = last_rx + phase
+        while not heartbeat.check(check):
+            check += heartbeat.check_interval
+        if thrusters.pending():
+            # The change the last ticks had held back, schedule_flush() writes it when it is due
+            now[0] = thrusters.last_write + thrusters.min_interval
+            thrusters.flush(now[0])
+        # command_neutral(): written now, or when the pacing interval is up (schedule_flush)
+        now[0] = check
+        thrusters.neutral()
+        if not thrusters.flush(check):
+            now[0] = check + thrusters.wait(check)
+            thrusters.flush(now[0])
+        detections.append((serial.at - last_rx) * 1000)
+    return detections, bound_ms(heartbeat, thrusters)
+
+
+async def realtime_trial():
+    heartbeat = Heartbeat(PERIOD, TIMEOUT)
+    loop = asyncio.get_running_loop()
+    sub_side, ground_side = socket.socketpair()
+    sub_side.setblocking(False)
+    decoder = ctl_frame.FrameDecoder()
+    thrusters, serial = thrusters_for(time.monotonic)
+    neutral = loop.create_future()
+    last_frame = [time.monotonic()]
+    paced = [None]
+    lost = [False]
+
+    def readable():
+        data = sub_side.recv(4096)
+        heartbeat.received()
+        for frame in decoder.feed(data):
+            if frame.type == ctl_frame.EV_TICK:
+                thrusters.set_all([random.randint(0, 100) for _ in range(4)])
+                write()
+
+    def write():
+        # Controller.write_thrusters(), a change held back is written when the interval is up
+        paced[0] = None
+        if thrusters.flush():
+            if lost[0] and not neutral.done():
+                neutral.set_result(serial.at)
+        elif thrusters.pending() and paced[0] is None:
+            paced[0] = loop.call_later(thrusters.wait(), write)
+
+    def check_link():
+        if heartbeat.check():
+            if paced[0] is not None:
+                paced[0].cancel()
+            lost[0] = True
+            thrusters.neutral()
+            write()
+            return
+        loop.call_later(heartbeat.check_interval, check_link)
+
+    loop.add_reader(sub_side.fileno(), readable)
+    heartbeat.received()
+    check_link()
+    encoder = ctl_frame.FrameEncoder()
+    end = time.monotonic() + random.uniform(0.5, 1.0)
+    while time.monotonic() < end:
+        ground_side.sendall(encoder.encode(ctl_frame.EV_TICK, 0, 0))
+        last_frame[0] = time.monotonic()
+        await asyncio.sleep(TICK)
+    # Link drops here, the socket stays open but nothing more arrives
+    detected = await neutral
+    loop.remove_reader(sub_side.fileno())
+    sub_side.close()
+    ground_side.close()
+    return (detected - last_frame[0]) * 1000, bound_ms(heartbeat, thrusters)
+
+
+def report(name, detections, bound):
+    detections.sort()
+    worst = detections[-1]
+    verdict = "PASS" if worst <= bound else "FAIL"
+    print(f"{name:10s} trials {len(detections):5d}  min {detections[0]:6.1f} ms  "
+          f"median {detections[len(detections) // 2]:6.1f} ms  max {worst:6.1f} ms  "
+          f"bound {bound:6.1f} ms  {verdict}")
+    return worst <= bound
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    ok = report("simulated", *simulated_trials(trials))
+    results = [asyncio.run(realtime_trial()) for _ in range(10)]
+    ok &= report("realtime", [r[0] for r in results], results[0][1])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
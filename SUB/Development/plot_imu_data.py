@@ -23,39 +23,32 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Revision History
 #####################################################################################
 2023/12/05 CEH Initial Version
+2026/10/18 CEH MPU6050 through hal.py and the block read driver (Comms/sensors/mpu6050.py)
 
 
 ####################################################################################
 '''
+import os
+import sys
 import time
-import smbus2 as smbus
 import matplotlib.pyplot as plt
 from flask import Flask, render_template
 from io import BytesIO
 from flask_sockets import Sockets
 import threading
 import base64
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, "..", "Comms"), os.path.join(HERE, "..", "Comms", "sensors")]
+import hal  # smbus2 on the Pi, simulated MPU6050 with ROV_HAL=sim
+from mpu6050 import MPU6050
 
 app = Flask(__name__)
 sockets = Sockets(app)
 
 plot_data = ""
 
-# some MPU6050 Registers and their Address
-PWR_MGMT_1 = 0x6B
-SMPLRT_DIV = 0x19
-CONFIG = 0x1A
-GYRO_CONFIG = 0x1B
-INT_ENABLE = 0x38
-ACCEL_XOUT_H = 0x3B
-ACCEL_YOUT_H = 0x3D
-ACCEL_ZOUT_H = 0x3F
-GYRO_XOUT_H = 0x43
-GYRO_YOUT_H = 0x45
-GYRO_ZOUT_H = 0x47
-
-bus = smbus.SMBus(1)  # or bus = smbus.SMBus(0) for older version boards
-Device_Address = 0x68  # MPU6050 device address
+bus = hal.smbus(1)  # or hal.smbus(0) for older version boards
+imu = MPU6050(bus)  # MPU6050 at 0x68, +/- 2000 deg/s and +/- 2 g
 
 num_readings = 30  # number of readings to display on the plot
 
@@ -78,38 +71,7 @@ table_data = [['Timestamp', 'Ax', 'Ay', 'Az', 'Gx', 'Gy', 'Gz']]
 table = ax_table.table(cellText=table_data, loc='center', colWidths=[0.15] * 7)
 
 
-def MPU_Init():
-    # write to sample rate register
-    bus.write_byte_data(Device_Address, SMPLRT_DIV, 7)
-
-    # Write to power management register
-    bus.write_byte_data(Device_Address, PWR_MGMT_1, 1)
-
-    # Write to Configuration register
-    bus.write_byte_data(Device_Address, CONFIG, 0)
-
-    # Write to Gyro configuration register
-    bus.write_byte_data(Device_Address, GYRO_CONFIG, 24)
-
-    # Write to interrupt enable register
-    bus.write_byte_data(Device_Address, INT_ENABLE, 1)
-
-
-def read_raw_data(addr):
-    # Accelero and Gyro value are 16-bit
-    high = bus.read_byte_data(Device_Address, addr)
-    low = bus.read_byte_data(Device_Address, addr + 1)
-
-    # concatenate higher and lower value
-    value = ((high << 8) | low)
-
-    # to get signed value from mpu6050
-    if value > 32768:
-        value = value - 65536
-    return value
-
-
-MPU_Init()
+imu.init()
 
 
 @sockets.route('/echo')
@@ -124,23 +86,8 @@ def generate_plot():
     while True:
         global timestamps, Ax_data, Ay_data, Az_data, Gx_data, Gy_data, Gz_data
 
-        # Read Accelerometer raw value
-        acc_x = read_raw_data(ACCEL_XOUT_H)
-        acc_y = read_raw_data(ACCEL_YOUT_H)
-        acc_z = read_raw_data(ACCEL_ZOUT_H)
-
-        # Read Gyroscope raw value
-        gyro_x = read_raw_data(GYRO_XOUT_H)
-        gyro_y = read_raw_data(GYRO_YOUT_H)
-        gyro_z = read_raw_data(GYRO_ZOUT_H)
-
-        # Full scale range +/- 250 degree/C as per sensitivity scale factor
-        Ax = acc_x / 16384.0
-        Ay = acc_y / 16384.0
-        Az = acc_z / 16384.0
-        Gx = gyro_x / 131.0
-        Gy = gyro_y / 131.0
-        Gz = gyro_z / 131.0
+        # Gyroscope and Accelerometer in deg/s and g from one block read
+        Gx, Gy, Gz, Ax, Ay, Az = imu.read()
         current_time = time.time()
 
         # Record Data to list